@@ -0,0 +1,323 @@
+"""
+Audio preprocessing before transcription: mono downmix, resampling to the
+transcription engine's preferred rate, and energy-based silence removal.
+
+Shorter, mono, 16 kHz audio means fewer bytes uploaded and fewer seconds
+billed. A TimestampMap records where every kept region came from, so segment
+times reported on the processed audio can be mapped back to the original.
+
+Only uncompressed PCM WAV input is supported (no decoder or network needed).
+"""
+
+import logging
+import os
+import tempfile
+import wave
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Amazon Transcribe recommends 16 kHz for general (non-telephony) speech
+TARGET_SAMPLE_RATE = 16000
+READ_BLOCK_SECONDS = 10
+FILTER_TAPS = 101
+
+DEFAULT_FRAME_MS = 30
+DEFAULT_PADDING_MS = 250
+DEFAULT_MIN_SILENCE_MS = 600
+DEFAULT_MIN_SPEECH_MS = 120
+# Frames must be this far above the estimated noise floor to count as speech,
+# but never need to be within this much of the loudest frame
+NOISE_MARGIN_DB = 10.0
+PEAK_MARGIN_DB = 30.0
+ABSOLUTE_FLOOR_DB = -60.0
+
+
+@dataclass
+class TimestampMap:
+    """
+    Piecewise mapping from processed-audio time to original-audio time.
+
+    segments holds (processed_start, original_start, duration) in seconds,
+    one entry per kept region, in order.
+    """
+    segments: List[Tuple[float, float, float]] = field(default_factory=list)
+
+    def to_original(self, seconds: float) -> float:
+        """Original-audio time of a point in the processed audio."""
+        if not self.segments:
+            return seconds
+        index = max(0, bisect_right([start for start, _, _ in self.segments], seconds) - 1)
+        processed_start, original_start, duration = self.segments[index]
+        return original_start + min(max(seconds - processed_start, 0.0), duration)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'segments': [[round(value, 4) for value in segment] for segment in self.segments]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TimestampMap':
+        return cls([tuple(segment) for segment in data.get('segments', [])])
+
+
+@dataclass
+class PreprocessResult:
+    """Output file and statistics of one preprocessing run."""
+    path: str
+    timestamp_map: TimestampMap
+    original_duration: float
+    processed_duration: float
+    original_sample_rate: int
+    original_channels: int
+    sample_rate: int
+    original_bytes: int
+    processed_bytes: int
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'original_duration': round(self.original_duration, 3),
+            'processed_duration': round(self.processed_duration, 3),
+            'removed_seconds': round(self.original_duration - self.processed_duration, 3),
+            'original_sample_rate': self.original_sample_rate,
+            'original_channels': self.original_channels,
+            'sample_rate': self.sample_rate,
+            'original_bytes': self.original_bytes,
+            'processed_bytes': self.processed_bytes,
+            'timestamp_map': self.timestamp_map.to_dict(),
+        }
+
+
+def is_wav(path: str) -> bool:
+    """True if path starts with a RIFF/WAVE header."""
+    try:
+        with open(path, 'rb') as handle:
+            header = handle.read(12)
+    except OSError:
+        return False
+    return header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+
+def _decode(frames: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """PCM bytes to float32 mono samples in [-1, 1]."""
+    if sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = ((packed << 8) >> 8).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _lowpass_filter(cutoff: float, taps: int = FILTER_TAPS) -> np.ndarray:
+    """Hamming-windowed sinc low-pass; cutoff in cycles per sample (< 0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def _filtered(blocks: Iterator[np.ndarray], kernel: np.ndarray) -> Iterator[np.ndarray]:
+    """Apply an FIR filter across blocks, compensating its delay so output aligns with input."""
+    history = np.zeros(len(kernel) - 1, dtype=np.float32)
+    delay = (len(kernel) - 1) // 2
+    skip = delay
+
+    def padded():
+        yield from blocks
+        yield np.zeros(delay, dtype=np.float32)
+
+    for block in padded():
+        data = np.concatenate([history, block])
+        output = np.convolve(data, kernel, mode='valid')
+        history = data[len(data) - len(history):]
+        if skip:
+            dropped = min(skip, len(output))
+            output = output[dropped:]
+            skip -= dropped
+        if len(output):
+            yield output
+
+
+def _resampled(blocks: Iterator[np.ndarray], source_rate: int, target_rate: int) -> Iterator[np.ndarray]:
+    """Linear-interpolation resampling of a block stream (band-limit first when downsampling)."""
+    if source_rate == target_rate:
+        yield from blocks
+        return
+    if target_rate < source_rate:
+        blocks = _filtered(blocks, _lowpass_filter(0.5 * target_rate / source_rate * 0.95))
+
+    step = source_rate / target_rate
+    carry = np.zeros(0, dtype=np.float32)
+    offset = 0
+    next_index = 0
+    for block in blocks:
+        buffer = np.concatenate([carry, block])
+        last = offset + len(buffer) - 1
+        end_index = int(np.ceil(last / step))
+        if end_index > next_index:
+            positions = np.arange(next_index, end_index) * step
+            base = np.floor(positions)
+            fraction = (positions - base).astype(np.float32)
+            index = base.astype(np.int64) - offset
+            yield buffer[index] * (1 - fraction) + buffer[index + 1] * fraction
+            next_index = end_index
+        carry = buffer[-1:]
+        offset = last
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int, frame_ms: int = DEFAULT_FRAME_MS,
+                  padding_ms: int = DEFAULT_PADDING_MS, min_silence_ms: int = DEFAULT_MIN_SILENCE_MS,
+                  min_speech_ms: int = DEFAULT_MIN_SPEECH_MS) -> List[Tuple[int, int]]:
+    """
+    Find speech regions by frame energy.
+
+    A frame is speech when its RMS level clears an adaptive threshold (noise
+    floor plus a margin). Bursts shorter than min_speech_ms are dropped,
+    regions are padded by padding_ms, and gaps shorter than min_silence_ms
+    are bridged.
+
+    Args:
+        samples (np.ndarray): Mono float samples
+        sample_rate (int): Samples per second
+
+    Returns:
+        List of (start_sample, end_sample) regions, in order
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = samples[:count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+    level = 20 * np.log10(rms + 1e-10)
+
+    noise_floor = np.percentile(level, 10)
+    threshold = max(ABSOLUTE_FLOOR_DB, min(noise_floor + NOISE_MARGIN_DB, level.max() - PEAK_MARGIN_DB))
+    speech = level > threshold
+
+    def runs(mask):
+        edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+        return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+    # Drop clicks and other bursts too short to be speech
+    starts, ends = runs(speech)
+    min_speech = max(1, -(-min_speech_ms // frame_ms))
+    for start, end in zip(starts, ends):
+        if end - start < min_speech:
+            speech[start:end] = False
+
+    # Pad each region, then bridge short pauses
+    padding = padding_ms // frame_ms
+    if padding:
+        speech = np.convolve(speech, np.ones(2 * padding + 1), mode='same') > 0
+    starts, ends = runs(speech)
+    min_silence = max(1, min_silence_ms // frame_ms)
+
+    regions: List[Tuple[int, int]] = []
+    for start, end in zip(starts, ends):
+        if regions and start - regions[-1][1] < min_silence:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    return [(int(start * frame), int(min(len(samples), end * frame))) for start, end in regions]
+
+
+def preprocess_audio(input_path: str, output_path: Optional[str] = None,
+                     target_rate: int = TARGET_SAMPLE_RATE, trim_silence: bool = True,
+                     **vad_options: Any) -> PreprocessResult:
+    """
+    Downmix a WAV file to mono, resample it and cut silence.
+
+    The input is read in blocks, so memory holds only the processed mono
+    audio. Audio is never upsampled: input below target_rate keeps its rate.
+
+    Args:
+        input_path (str): PCM WAV file
+        output_path (str, optional): Destination WAV (default: a new temp file)
+        target_rate (int): Output sample rate
+        trim_silence (bool): Remove non-speech regions
+        **vad_options: frame_ms, padding_ms, min_silence_ms, min_speech_ms for detect_speech
+
+    Returns:
+        PreprocessResult with the output path and timestamp map
+
+    Raises:
+        ValueError: If the input is not a supported PCM WAV file
+    """
+    try:
+        reader = wave.open(input_path, 'rb')
+    except (wave.Error, EOFError) as e:
+        raise ValueError(f"Unsupported audio (PCM WAV required): {input_path}: {e}")
+
+    with reader:
+        channels = reader.getnchannels()
+        sample_width = reader.getsampwidth()
+        source_rate = reader.getframerate()
+        total_frames = reader.getnframes()
+        rate = min(target_rate, source_rate)
+        block_frames = source_rate * READ_BLOCK_SECONDS
+
+        def blocks():
+            while True:
+                frames = reader.readframes(block_frames)
+                if not frames:
+                    return
+                yield _decode(frames, sample_width, channels)
+
+        parts = list(_resampled(blocks(), source_rate, rate))
+
+    samples = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    original_duration = total_frames / source_rate if source_rate else 0.0
+
+    if trim_silence and len(samples):
+        regions = detect_speech(samples, rate, **vad_options)
+        if not regions:
+            logger.warning(f"No speech detected in {input_path}; keeping all audio")
+            regions = [(0, len(samples))]
+    else:
+        regions = [(0, len(samples))] if len(samples) else []
+
+    segments = []
+    processed_start = 0
+    for start, end in regions:
+        segments.append((processed_start / rate, start / rate, (end - start) / rate))
+        processed_start += end - start
+    kept = np.concatenate([samples[start:end] for start, end in regions]) if regions else samples
+
+    if output_path is None:
+        fd, output_path = tempfile.mkstemp(suffix='.wav', prefix='preprocessed-')
+        os.close(fd)
+    pcm = np.clip(np.round(kept * 32767), -32768, 32767).astype('<i2')
+    with wave.open(output_path, 'wb') as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+
+    result = PreprocessResult(
+        path=output_path,
+        timestamp_map=TimestampMap(segments),
+        original_duration=original_duration,
+        processed_duration=len(kept) / rate if rate else 0.0,
+        original_sample_rate=source_rate,
+        original_channels=channels,
+        sample_rate=rate,
+        original_bytes=os.path.getsize(input_path),
+        processed_bytes=os.path.getsize(output_path),
+    )
+    logger.info(f"Preprocessed {input_path}: {result.original_duration:.1f}s -> "
+                f"{result.processed_duration:.1f}s, {result.original_bytes} -> {result.processed_bytes} bytes")
+    return result
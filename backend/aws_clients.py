@@ -0,0 +1,134 @@
+"""
+Process-wide registry of lazily created, shared boto3 clients.
+
+Creating a boto3 client resolves credentials, loads service models and opens
+a new connection pool, which costs more than many of our small requests.
+Every service in the pipeline takes its clients from here instead, so each
+process pays that cost once per (service, region, config).
+
+boto3 itself is only imported when the first client is created, so commands
+that never call AWS start without it.
+"""
+
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import instrument_client
+
+logger = logging.getLogger(__name__)
+
+ENV_FILE = '.env'
+
+DEFAULT_REGION = 'us-east-1'
+DEFAULT_CLIENT_SETTINGS = {
+    'max_pool_connections': 32,
+    'connect_timeout': 5,
+    'read_timeout': 60,
+    'tcp_keepalive': True,
+}
+# Every call to these services goes through rate_limit.call_with_limits, which
+# retries with its own backoff; botocore retrying underneath would multiply the attempts
+LIMITED_SERVICES = ('translate', 'comprehend', 'polly', 'bedrock-runtime')
+NO_RETRIES = {'mode': 'standard', 'total_max_attempts': 1}
+
+
+class ClientRegistry:
+    """
+    Thread-safe cache of boto3 clients keyed by service, region and config.
+    """
+
+    def __init__(self, instrument: bool = True, **settings: Any):
+        """
+        Args:
+            instrument (bool): Record call metrics for every client (see metrics.instrument_client)
+            **settings: botocore Config options applied to every client
+                (defaults: DEFAULT_CLIENT_SETTINGS)
+        """
+        self.instrument = instrument
+        self.settings = dict(DEFAULT_CLIENT_SETTINGS, **settings)
+        self._clients: Dict[Tuple, Any] = {}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def get_client(self, service_name: str, region_name: Optional[str] = None, **overrides: Any):
+        """
+        Return the shared client for a service, creating it on first use.
+
+        Args:
+            service_name (str): boto3 service name (e.g. 'translate', 's3')
+            region_name (str, optional): AWS region; defaults to the configured region or us-east-1
+            **overrides: botocore Config options for this client only
+
+        Returns:
+            boto3 client (safe to share between threads)
+        """
+        key = (service_name, region_name, tuple(sorted(overrides.items())))
+
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                # boto3 sessions are not thread-safe, so clients are only built under the lock
+                if self._session is None:
+                    load_environment()
+                    self._session = boto3.session.Session()
+                region = region_name or self._session.region_name or DEFAULT_REGION
+                settings = dict(self.settings)
+                if service_name in LIMITED_SERVICES:
+                    settings['retries'] = NO_RETRIES
+                config = Config(**dict(settings, **overrides))
+                client = self._session.client(service_name, region_name=region, config=config)
+                if self.instrument:
+                    instrument_client(client)
+                self._clients[key] = client
+                logger.info(f"Created shared {service_name} client in {region}")
+            return client
+
+    def configure(self, **settings: Any) -> None:
+        """Change the default client settings; existing clients are dropped."""
+        with self._lock:
+            self.settings.update(settings)
+            self._clients.clear()
+
+    def reset(self) -> None:
+        """Forget every client and the session (e.g. after fork)."""
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._session = None
+
+
+_registry = ClientRegistry()
+
+# Clients hold sockets and locks that must not be shared with a forked child
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_registry.reset)
+
+
+_environment_loaded = False
+
+
+def load_environment() -> None:
+    """Load AWS settings and credentials from .env into the environment, once per process."""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv(ENV_FILE)
+        _environment_loaded = True
+
+
+def get_registry() -> ClientRegistry:
+    """Return the process-wide client registry."""
+    return _registry
+
+
+def get_client(service_name: str, region_name: Optional[str] = None, **overrides: Any):
+    """Return the shared client for a service from the process-wide registry."""
+    return _registry.get_client(service_name, region_name, **overrides)
@@ -0,0 +1,385 @@
+"""
+In-process stand-ins for the AWS clients used by the pipeline.
+
+They implement the subset of the boto3 client API that this backend calls,
+and inject configurable latency, throttling and error rates, so the whole
+pipeline can be exercised and benchmarked without network access.
+"""
+
+import io
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from language_detection import LocalLanguageDetector
+from rate_limit import get_rate_limiters
+
+
+class FaultInjector:
+    """
+    Simulated service behaviour shared by the fake clients.
+
+    Args:
+        latency (float): Base seconds per call
+        jitter (float): Uniform +/- seconds added to each call
+        per_kb (float): Extra seconds per KB of payload
+        throttle_rate (float): Probability of a ThrottlingException per call
+        error_rate (float): Probability of a 500 InternalServerError per call
+        seed (int, optional): Seed for reproducible runs
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, per_kb: float = 0.0,
+                 throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_kb = per_kb
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.faults = Counter()
+
+    def call(self, operation: str, payload_bytes: int = 0) -> None:
+        """Sleep for the simulated latency, then maybe raise a throttle or server error."""
+        with self._lock:
+            self.calls[operation] += 1
+            roll = self._random.random()
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+
+        delay = max(0.0, self.latency + offset + self.per_kb * payload_bytes / 1024)
+        if delay:
+            time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.faults['ThrottlingException'] += 1
+            raise _client_error(operation, 'ThrottlingException', 'Rate exceeded', 400)
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.faults['InternalServerException'] += 1
+            raise _client_error(operation, 'InternalServerException', 'Simulated failure', 500)
+
+
+def _client_error(operation: str, code: str, message: str, status: int) -> ClientError:
+    return ClientError(
+        {
+            'Error': {'Code': code, 'Message': message},
+            'ResponseMetadata': {'HTTPStatusCode': status, 'RetryAttempts': 0}
+        },
+        operation
+    )
+
+
+class FakeTranslateClient:
+    """Stand-in for boto3.client('translate'); 'translates' by tagging the text."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+
+    def translate_text(self, Text: str, SourceLanguageCode: str, TargetLanguageCode: str, **kwargs) -> Dict[str, Any]:
+        size = len(Text.encode('utf-8'))
+        if size > 10000:
+            raise _client_error('TranslateText', 'TextSizeLimitExceededException',
+                                'Input text size exceeds limit', 400)
+        self.faults.call('TranslateText', size)
+        return {
+            'TranslatedText': f"[{TargetLanguageCode}] {Text}",
+            'SourceLanguageCode': SourceLanguageCode,
+            'TargetLanguageCode': TargetLanguageCode
+        }
+
+
+class FakeComprehendClient:
+    """Stand-in for boto3.client('comprehend') backed by the local detector."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None, default_language: str = 'en'):
+        self.faults = faults or FaultInjector()
+        self.default_language = default_language
+        self._detector = LocalLanguageDetector(confidence_threshold=0.0)
+
+    def _languages(self, text: str) -> List[Dict[str, Any]]:
+        code, confidence = self._detector.score(text)
+        return [{'LanguageCode': code or self.default_language, 'Score': max(confidence, 0.5)}]
+
+    def detect_dominant_language(self, Text: str, **kwargs) -> Dict[str, Any]:
+        self.faults.call('DetectDominantLanguage', len(Text.encode('utf-8')))
+        return {'Languages': self._languages(Text)}
+
+    def batch_detect_dominant_language(self, TextList: List[str], **kwargs) -> Dict[str, Any]:
+        self.faults.call('BatchDetectDominantLanguage', sum(len(t.encode('utf-8')) for t in TextList))
+        return {
+            'ResultList': [
+                {'Index': index, 'Languages': self._languages(text)}
+                for index, text in enumerate(TextList)
+            ],
+            'ErrorList': []
+        }
+
+
+class FakePollyClient:
+    """Stand-in for boto3.client('polly'); the "audio" is a tagged copy of the text."""
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+
+    def synthesize_speech(self, Text: str, VoiceId: str, OutputFormat: str, **kwargs) -> Dict[str, Any]:
+        if len(Text) > 3000:
+            raise _client_error('SynthesizeSpeech', 'TextLengthExceededException',
+                                'Maximum text length has been exceeded', 400)
+        self.faults.call('SynthesizeSpeech', len(Text.encode('utf-8')))
+        audio = f"[{VoiceId}] {Text}\n".encode('utf-8')
+        return {
+            'AudioStream': _FakeBody(audio),
+            'ContentType': 'audio/mpeg' if OutputFormat == 'mp3' else 'application/octet-stream',
+            'RequestCharacters': len(Text)
+        }
+
+
+class FakeBedrockRuntimeClient:
+    """
+    Stand-in for boto3.client('bedrock-runtime') serving the Anthropic messages
+    format; the "summary" is the first sentence of each paragraph of the
+    tagged text, cut to the token budget.
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+
+    def invoke_model(self, modelId: str, body: Any, **kwargs) -> Dict[str, Any]:
+        request = json.loads(body)
+        prompt = request['messages'][0]['content']
+        self.faults.call('InvokeModel', len(prompt.encode('utf-8')))
+        match = re.search(r'<(transcript|summaries)>\n(.*)\n</\1>', prompt, re.DOTALL)
+        text = match.group(2) if match else prompt
+        firsts = [re.split(r'(?<=[.!?])\s+', paragraph.strip())[0]
+                  for paragraph in text.split('\n\n') if paragraph.strip()]
+        summary = ' '.join(firsts)[:request.get('max_tokens', 400) * 4]
+        payload = {'content': [{'type': 'text', 'text': summary}], 'stop_reason': 'end_turn'}
+        return {'body': _FakeBody(json.dumps(payload).encode('utf-8')), 'contentType': 'application/json'}
+
+
+class _FakeBody:
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def read(self, amount: Optional[int] = None) -> bytes:
+        return self._stream.read(amount)
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        while True:
+            chunk = self._stream.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _FakePaginator:
+    def __init__(self, client: 'FakeS3Client'):
+        self._client = client
+
+    def paginate(self, Bucket: str, Prefix: str = '', PaginationConfig: Optional[Dict] = None, **kwargs):
+        page_size = (PaginationConfig or {}).get('PageSize', 1000)
+        keys = sorted(key for key in self._client._bucket(Bucket, 'ListObjectsV2') if key.startswith(Prefix))
+        for start in range(0, len(keys), page_size):
+            self._client._call('ListObjectsV2')
+            objects = self._client._bucket(Bucket, 'ListObjectsV2')
+            yield {
+                'Contents': [
+                    {'Key': key, 'Size': len(objects[key]['Body']), 'LastModified': objects[key]['LastModified']}
+                    for key in keys[start:start + page_size] if key in objects
+                ],
+                'KeyCount': min(page_size, len(keys) - start)
+            }
+
+
+class FakeS3Client:
+    """
+    In-memory stand-in for boto3.client('s3').
+
+    S3 clients keep botocore's own retries (rate_limit makes a single attempt
+    for S3), so injected throttles and 5xx errors are retried here the same way
+    before they reach the caller.
+
+    Args:
+        faults (FaultInjector, optional): Simulated latency and errors
+        max_attempts (int): Attempts per call, as botocore's default retry mode
+        retry_delay (float): Base of the exponential backoff between attempts
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None, max_attempts: int = 5, retry_delay: float = 0.01):
+        self.faults = faults or FaultInjector()
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.buckets: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str, payload_bytes: int = 0) -> None:
+        """Inject faults for one call, retrying throttles and server errors like botocore."""
+        for attempt in range(self.max_attempts):
+            try:
+                return self.faults.call(operation, payload_bytes)
+            except ClientError as error:
+                retryable = (error.response['Error']['Code'] == 'ThrottlingException'
+                             or error.response['ResponseMetadata']['HTTPStatusCode'] >= 500)
+                if not retryable or attempt + 1 == self.max_attempts:
+                    error.response['ResponseMetadata']['RetryAttempts'] = attempt
+                    raise
+            time.sleep(self.retry_delay * 2 ** attempt)
+
+    def _bucket(self, name: str, operation: str) -> Dict[str, Dict[str, Any]]:
+        if name not in self.buckets:
+            raise _client_error(operation, 'NoSuchBucket', 'The specified bucket does not exist', 404)
+        return self.buckets[name]
+
+    def head_bucket(self, Bucket: str, **kwargs) -> Dict[str, Any]:
+        self._call('HeadBucket')
+        self._bucket(Bucket, 'HeadBucket')
+        return {}
+
+    def create_bucket(self, Bucket: str, **kwargs) -> Dict[str, Any]:
+        self._call('CreateBucket')
+        with self._lock:
+            self.buckets.setdefault(Bucket, {})
+        return {}
+
+    def delete_bucket(self, Bucket: str, **kwargs) -> Dict[str, Any]:
+        self._call('DeleteBucket')
+        with self._lock:
+            self.buckets.pop(Bucket, None)
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any = b'', **kwargs) -> Dict[str, Any]:
+        data = Body.read() if hasattr(Body, 'read') else bytes(Body)
+        self._call('PutObject', len(data))
+        self._store(Bucket, Key, data, kwargs, 'PutObject')
+        return {'ETag': f'"{hash(data) & 0xffffffff:08x}"'}
+
+    def upload_fileobj(self, Fileobj, Bucket: str, Key: str, ExtraArgs: Optional[Dict] = None, **kwargs) -> None:
+        data = Fileobj.read()
+        self._call('PutObject', len(data))
+        self._store(Bucket, Key, data, ExtraArgs or {}, 'PutObject')
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: Optional[Dict] = None, **kwargs) -> None:
+        with open(Filename, 'rb') as handle:
+            self.upload_fileobj(handle, Bucket, Key, ExtraArgs)
+
+    def _store(self, bucket: str, key: str, data: bytes, extra: Dict[str, Any], operation: str) -> None:
+        with self._lock:
+            self._bucket(bucket, operation)[key] = {
+                'Body': data,
+                'LastModified': datetime.now(timezone.utc),
+                **{name: value for name, value in extra.items() if name.startswith('Content') or name == 'Metadata'}
+            }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._call('HeadObject')
+        obj = self._bucket(Bucket, 'HeadObject').get(Key)
+        if obj is None:
+            raise _client_error('HeadObject', '404', 'Not Found', 404)
+        return {'ContentLength': len(obj['Body']), **{k: v for k, v in obj.items() if k != 'Body'}}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        obj = self._bucket(Bucket, 'GetObject').get(Key)
+        if obj is None:
+            self._call('GetObject')
+            raise _client_error('GetObject', 'NoSuchKey', 'The specified key does not exist.', 404)
+        data = obj['Body']
+        if Range:
+            start, _, end = Range.replace('bytes=', '').partition('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        self._call('GetObject', len(data))
+        return {
+            'Body': _FakeBody(data),
+            'ContentLength': len(data),
+            **{k: v for k, v in obj.items() if k != 'Body'}
+        }
+
+    def download_fileobj(self, Bucket: str, Key: str, Fileobj, **kwargs) -> None:
+        Fileobj.write(self.get_object(Bucket=Bucket, Key=Key)['Body'].read())
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs) -> None:
+        with open(Filename, 'wb') as handle:
+            self.download_fileobj(Bucket, Key, handle)
+
+    def get_paginator(self, operation_name: str) -> _FakePaginator:
+        if operation_name != 'list_objects_v2':
+            raise NotImplementedError(operation_name)
+        return _FakePaginator(self)
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = '', **kwargs) -> Dict[str, Any]:
+        pages = list(self.get_paginator('list_objects_v2').paginate(Bucket=Bucket, Prefix=Prefix))
+        return pages[0] if pages else {'KeyCount': 0}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:
+        self._call('DeleteObject')
+        with self._lock:
+            self._bucket(Bucket, 'DeleteObject').pop(Key, None)
+        return {}
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self._call('DeleteObjects')
+        with self._lock:
+            objects = self._bucket(Bucket, 'DeleteObjects')
+            for item in Delete['Objects']:
+                objects.pop(item['Key'], None)
+        return {'Errors': []}
+
+
+class FakeTranscriptionService:
+    """
+    Stand-in for TranscriptionService: returns a fixed transcript after a
+    simulated delay (transcription is usually the slowest stage).
+    """
+
+    def __init__(self, transcript: str, faults: Optional[FaultInjector] = None):
+        self.transcript = transcript
+        self.faults = faults or FaultInjector()
+
+    def transcribe(self, audio_file_path: str) -> str:
+        self.faults.call('StartTranscriptionJob')
+        return self.transcript
+
+
+_SAMPLE_SENTENCES = [
+    "Please describe your symptoms and when they started.",
+    "I have had a headache and a mild fever since yesterday morning.",
+    "Are you currently taking any medication or supplements?",
+    "The pain gets worse at night and when I walk up the stairs.",
+    "We will take your blood pressure and do a quick blood test.",
+    "Do you have any allergies to antibiotics or painkillers?",
+    "Take one tablet twice a day with food for the next seven days.",
+    "Please come back next week so we can check your progress.",
+]
+
+
+def sample_transcript(words: int, seed: int = 0) -> str:
+    """Build a clinic-style transcript of roughly the given number of words."""
+    generator = random.Random(seed)
+    sentences = []
+    count = 0
+    while count < words:
+        sentence = generator.choice(_SAMPLE_SENTENCES)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return ' '.join(sentences)
+
+
+def disable_rate_limit_pacing() -> None:
+    """
+    Stop pacing calls to the AWS quotas in this process. The fakes have no
+    quotas, so pacing would only measure the limiter; retries and circuit
+    breakers stay on to handle injected faults.
+    """
+    get_rate_limiters().configure(pacing=False)
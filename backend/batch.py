@@ -0,0 +1,219 @@
+"""
+Batch processing of many recordings with a worker pool and a resumable
+checkpoint journal.
+"""
+
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+AUDIO_EXTENSIONS = {".m4a", ".mp3", ".mp4", ".wav", ".flac", ".ogg", ".amr", ".webm"}
+MANIFEST_EXTENSIONS = {".txt", ".lst", ".manifest"}
+DEFAULT_CHECKPOINT = "batch_checkpoint.jsonl"
+
+
+def is_batch_source(source):
+    """Return True if source names a directory, glob pattern or manifest rather than one file"""
+    if glob.has_magic(source):
+        return True
+    if os.path.isdir(source):
+        return True
+    return os.path.splitext(source)[1].lower() in MANIFEST_EXTENSIONS
+
+
+def collect_audio_files(source):
+    """
+    Expand a batch source into an ordered list of audio file paths
+
+    Args:
+        source (str): Directory (searched recursively), glob pattern, or
+            manifest file with one path per line (relative to the manifest,
+            blank lines and '#' comments ignored)
+
+    Returns:
+        list: Absolute paths, de-duplicated, in a stable order
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    paths.append(os.path.join(root, name))
+    elif glob.has_magic(source):
+        paths = sorted(p for p in glob.glob(source, recursive=True) if os.path.isfile(p))
+    elif os.path.splitext(source)[1].lower() in MANIFEST_EXTENSIONS:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        paths = []
+        with open(source, encoding="utf-8") as manifest:
+            for line in manifest:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(base_dir, line))
+    else:
+        paths = [source]
+
+    return list(dict.fromkeys(os.path.abspath(p) for p in paths))
+
+
+class CheckpointJournal:
+    """
+    Append-only JSON-lines journal of finished files
+
+    Every record is flushed and fsynced as soon as a file finishes, so an
+    interrupted run loses at most the files that were still in flight.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._completed = set()
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write
+                        continue
+                    if record.get("status") == "done":
+                        self._completed.add(record["file"])
+
+        self._handle = open(path, "a", encoding="utf-8")
+
+    def is_done(self, path):
+        return path in self._completed
+
+    def record(self, path, status, **details):
+        """Append a record for path ('done' or 'failed')"""
+        entry = {"file": path, "status": status, "timestamp": datetime.now().isoformat()}
+        entry.update(details)
+        self._handle.write(json.dumps(entry) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+        if status == "done":
+            self._completed.add(path)
+
+    def close(self):
+        self._handle.close()
+
+
+def _init_worker(workers):
+    """Give each worker process an equal share of the AWS rate limits"""
+    from rate_limit import get_rate_limiters
+
+    get_rate_limiters().configure(share=1 / workers)
+
+
+def _process_one(path, options, drain_metrics=False):
+    """
+    Worker entry point: run the single-file pipeline and summarise the outcome.
+    With drain_metrics the worker's metrics travel back in the summary, so a
+    pool's parent process can report them (see MetricsRegistry.merge).
+    """
+    if drain_metrics:
+        summary = _process_one(path, options)
+        from metrics import get_metrics
+
+        summary["metrics"] = get_metrics().drain()
+        return summary
+
+    # Imported here so worker processes don't need main.py at unpickling time
+    from main import process_audio_file
+
+    start = time.perf_counter()
+    try:
+        results = process_audio_file(path, **options)
+    except Exception as e:
+        return {"ok": False, "error": str(e), "elapsed": time.perf_counter() - start}
+
+    summary = {
+        "ok": True,
+        "elapsed": time.perf_counter() - start,
+        "characters": results["metadata"]["character_count"],
+        "translations": sorted(results.get("translations", {})),
+    }
+    if "storage" in results:
+        summary["bundle_url"] = results["storage"]["bundle_url"]
+    return summary
+
+
+def run_batch(files, workers=None, checkpoint_path=DEFAULT_CHECKPOINT, **options):
+    """
+    Run process_audio_file over many files on a process pool
+
+    Args:
+        files (list): Audio file paths
+        workers (int): Worker processes (default: CPU count; 1 runs in-process)
+        checkpoint_path (str): Journal used to skip files finished by earlier runs
+        **options: Keyword arguments passed to process_audio_file (must be picklable)
+
+    Returns:
+        dict: Throughput summary
+    """
+    # multiprocessing is only imported once a batch actually runs
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    from metrics import get_metrics
+
+    journal = CheckpointJournal(checkpoint_path)
+    pending = [path for path in files if not journal.is_done(path)]
+    skipped = len(files) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} files already completed in {checkpoint_path}")
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    succeeded = failed = characters = 0
+    busy_seconds = 0.0
+    start = time.perf_counter()
+
+    def handle(path, outcome):
+        nonlocal succeeded, failed, characters, busy_seconds
+        busy_seconds += outcome["elapsed"]
+        if "metrics" in outcome:
+            get_metrics().merge(outcome.pop("metrics"))
+        if outcome.pop("ok"):
+            succeeded += 1
+            characters += outcome["characters"]
+            journal.record(path, "done", **outcome)
+        else:
+            failed += 1
+            journal.record(path, "failed", **outcome)
+            print(f"Failed: {path}: {outcome['error']}")
+        print(f"[{succeeded + failed}/{len(pending)}] {path} ({outcome['elapsed']:.1f}s)")
+
+    try:
+        if workers == 1:
+            for path in pending:
+                handle(path, _process_one(path, options))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(workers,)
+            ) as executor:
+                futures = {executor.submit(_process_one, path, options, True): path for path in pending}
+                for future in as_completed(futures):
+                    handle(futures[future], future.result())
+    finally:
+        journal.close()
+
+    wall_seconds = time.perf_counter() - start
+    summary = {
+        "files_total": len(files),
+        "files_skipped": skipped,
+        "files_succeeded": succeeded,
+        "files_failed": failed,
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "files_per_minute": round((succeeded + failed) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "characters_per_second": round(characters / wall_seconds, 1) if wall_seconds else 0.0,
+        "mean_seconds_per_file": round(busy_seconds / (succeeded + failed), 3) if succeeded + failed else 0.0,
+    }
+
+    print("\nBatch summary")
+    print(f"  Files: {succeeded} succeeded, {failed} failed, {skipped} skipped of {len(files)}")
+    print(f"  Wall time: {summary['wall_seconds']:.1f}s with {workers} workers")
+    print(f"  Throughput: {summary['files_per_minute']:.1f} files/min, "
+          f"{summary['characters_per_second']:.0f} transcript chars/s")
+    return summary
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite - runs the pipeline against in-process AWS stand-ins
+
+Sweeps transcript length, number of target languages and concurrency, with
+configurable simulated latency, throttling and error rates, and reports
+throughput and p50/p95/p99 latency as JSON.
+
+Examples:
+    python benchmark.py
+    python benchmark.py --target translation --words 200 2000 --languages 1 8 --concurrency 1 8
+    python benchmark.py --latency 0.08 --throttle-rate 0.05 --output bench.json
+    python benchmark.py --rate-limits aws   # pace calls to the real AWS quotas
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from aws_fakes import (
+    FakeComprehendClient,
+    FakeS3Client,
+    FakeTranscriptionService,
+    FakeTranslateClient,
+    FaultInjector,
+    disable_rate_limit_pacing,
+    sample_transcript,
+)
+from rate_limit import get_rate_limiters, parse_rates
+from s3_storage import S3Storage
+from translation import AWSTranslationService
+from translation_cache import TranslationCache
+
+LANGUAGE_POOL = ["es", "fr", "de", "pt", "it", "zh", "ar", "hi", "ko", "ja", "ru", "vi", "tr", "pl", "uk", "fa"]
+TARGETS = ("pipeline", "translation", "s3")
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a list of numbers (q in 0..100)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _fault_injector(args, seed):
+    return FaultInjector(
+        latency=args.latency,
+        jitter=args.jitter,
+        per_kb=args.per_kb,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        seed=seed,
+    )
+
+
+def _run_pipeline(transcript, languages, concurrency, faults, transcribe_faults):
+    from main import process_audio_file
+
+    storage = S3Storage("benchmark-bucket", s3_client=FakeS3Client(faults))
+    translator = AWSTranslationService(
+        cache=TranslationCache(),
+        chunk_workers=concurrency,
+        translate_client=FakeTranslateClient(faults),
+        comprehend_client=FakeComprehendClient(faults),
+    )
+    results = process_audio_file(
+        "benchmark.wav",
+        save_to_s3=True,
+        translate_languages=languages,
+        max_workers=concurrency,
+        transcription_service=FakeTranscriptionService(transcript, transcribe_faults),
+        translator=translator,
+        storage=storage,
+    )
+    return len(languages) - len(results["translations"])
+
+
+def _run_translation(transcript, languages, concurrency, faults, transcribe_faults):
+    translator = AWSTranslationService(
+        cache=TranslationCache(),
+        chunk_workers=concurrency,
+        translate_client=FakeTranslateClient(faults),
+        comprehend_client=FakeComprehendClient(faults),
+    )
+    results = translator.translate_to_multiple_languages(
+        transcript, languages, source_language="en", max_workers=concurrency
+    )
+    return sum(1 for result in results.values() if "error" in result)
+
+
+def _run_s3(transcript, languages, concurrency, faults, transcribe_faults):
+    storage = S3Storage("benchmark-bucket", s3_client=FakeS3Client(faults))
+    items = [{"key": "transcripts/run.txt", "text": transcript}]
+    items += [{"key": f"translations/run_{lang}.txt", "text": transcript} for lang in languages]
+    items.append({"key": "transcripts/run.json", "json": {"transcript": transcript}})
+    try:
+        storage.upload_many(items, max_workers=concurrency)
+    except Exception:
+        return 1
+    return 0
+
+
+RUNNERS = {"pipeline": _run_pipeline, "translation": _run_translation, "s3": _run_s3}
+
+
+def _attempt(runner, *runner_args):
+    """Run one iteration quietly; return its failure count (1 if it raised)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            return runner(*runner_args)
+        except Exception:
+            return 1
+
+
+def run_case(target, words, language_count, concurrency, args):
+    """Run one sweep point args.runs times and summarise the latencies"""
+    transcript = sample_transcript(words, seed=words)
+    languages = LANGUAGE_POOL[:language_count]
+    runner = RUNNERS[target]
+
+    latencies = []
+    failures = 0
+    faults = _fault_injector(args, seed=args.seed)
+    transcribe_faults = FaultInjector(latency=args.transcribe_latency, seed=args.seed)
+    runner_args = (transcript, languages, concurrency, faults, transcribe_faults)
+
+    # Warmup failures (e.g. injected faults) are counted, not fatal
+    warmup_failures = sum(_attempt(runner, *runner_args) for _ in range(args.warmup))
+
+    faults.calls.clear()
+    faults.faults.clear()
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        run_start = time.perf_counter()
+        failures += _attempt(runner, *runner_args)
+        latencies.append(time.perf_counter() - run_start)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "target": target,
+        "words": words,
+        "characters": len(transcript),
+        "languages": language_count,
+        "concurrency": concurrency,
+        "runs": args.runs,
+        "failures": failures,
+        "warmup_failures": warmup_failures,
+        "throughput_runs_per_s": round(args.runs / elapsed, 3) if elapsed else 0.0,
+        "throughput_chars_per_s": round(args.runs * len(transcript) * max(1, language_count) / elapsed, 1)
+        if elapsed
+        else 0.0,
+        "latency_s": {
+            "mean": round(sum(latencies) / len(latencies), 6),
+            "p50": round(percentile(latencies, 50), 6),
+            "p95": round(percentile(latencies, 95), 6),
+            "p99": round(percentile(latencies, 99), 6),
+            "max": round(max(latencies), 6),
+        },
+        "aws_calls": dict(faults.calls),
+        "injected_faults": dict(faults.faults),
+    }
+
+
+def main():
+    """Benchmark entry point with argument parsing"""
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks with simulated AWS")
+    parser.add_argument("--target", nargs="+", choices=TARGETS, default=list(TARGETS), help="What to benchmark")
+    parser.add_argument("--words", nargs="+", type=int, default=[100, 1000, 5000], help="Transcript lengths")
+    parser.add_argument("--languages", nargs="+", type=int, default=[1, 4, 8], help="Target language counts")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8], help="Concurrency limits")
+    parser.add_argument("--runs", type=int, default=10, help="Measured runs per sweep point")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs per sweep point")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per AWS call")
+    parser.add_argument("--jitter", type=float, default=0.005, help="Uniform +/- seconds per call")
+    parser.add_argument("--per-kb", type=float, default=0.001, help="Extra simulated seconds per KB")
+    parser.add_argument("--transcribe-latency", type=float, default=0.05, help="Simulated transcription time")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of ThrottlingException")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 500 error")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for reproducible runs")
+    parser.add_argument(
+        "--rate-limits",
+        default="off",
+        help="Client-side pacing: off (default), aws for the real quotas, or service.Operation=rate,...",
+    )
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if args.rate_limits == "off":
+        disable_rate_limit_pacing()
+    elif args.rate_limits != "aws":
+        get_rate_limiters().configure(rates=parse_rates(args.rate_limits))
+
+    cases = []
+    for target, words, language_count, concurrency in itertools.product(
+        args.target, args.words, args.languages, args.concurrency
+    ):
+        case = run_case(target, words, language_count, concurrency, args)
+        cases.append(case)
+        print(
+            f"{target:<12} words={words:<6} langs={language_count:<3} conc={concurrency:<3} "
+            f"p50={case['latency_s']['p50'] * 1000:8.1f}ms p95={case['latency_s']['p95'] * 1000:8.1f}ms "
+            f"p99={case['latency_s']['p99'] * 1000:8.1f}ms {case['throughput_runs_per_s']:7.2f} runs/s "
+            f"failures={case['failures']}",
+            file=sys.stderr,
+        )
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            name: getattr(args, name)
+            for name in (
+                "latency",
+                "jitter",
+                "per_kb",
+                "transcribe_latency",
+                "throttle_rate",
+                "error_rate",
+                "runs",
+                "seed",
+                "rate_limits",
+            )
+        },
+        "cases": cases,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+        print(f"Wrote {len(cases)} cases to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
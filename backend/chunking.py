@@ -0,0 +1,149 @@
+"""
+Sentence-aware text chunking under a UTF-8 byte budget.
+
+Used to split long transcripts into pieces that fit a single AWS request
+while keeping each piece tied to its offsets in the source text.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List
+
+# AWS Translate rejects TranslateText requests over 10,000 bytes of UTF-8
+MAX_TRANSLATE_BYTES = 10000
+DEFAULT_CHUNK_BYTES = 9000
+
+# Sentence terminators followed by whitespace, or CJK full stops which are
+# usually not followed by a space
+_SENTENCE_END = re.compile(r'(?<=[.!?;:…])\s+|(?<=[。！？؟।])\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@dataclass
+class TextChunk:
+    """A slice of the source text: text == source[start:end]."""
+    text: str
+    start: int
+    end: int
+
+    @property
+    def byte_length(self) -> int:
+        return len(self.text.encode('utf-8'))
+
+
+def split_sentences(text: str) -> List[TextChunk]:
+    """
+    Split text into sentences, trimming surrounding whitespace.
+
+    Args:
+        text (str): Source text
+
+    Returns:
+        List of sentence chunks with offsets into text
+    """
+    sentences = []
+    position = 0
+    for match in _SENTENCE_END.finditer(text):
+        if match.end() == position:
+            continue
+        _append_trimmed(sentences, text, position, match.start())
+        position = match.end()
+    _append_trimmed(sentences, text, position, len(text))
+    return sentences
+
+
+def chunk_text(text: str, max_bytes: int = DEFAULT_CHUNK_BYTES) -> List[TextChunk]:
+    """
+    Pack whole sentences into chunks of at most max_bytes UTF-8 bytes.
+
+    Sentences longer than the budget are split on whitespace and, failing
+    that, on character boundaries.
+
+    Args:
+        text (str): Source text
+        max_bytes (int): Byte budget per chunk
+
+    Returns:
+        Ordered list of chunks covering every non-whitespace character of text
+    """
+    if max_bytes < 4:
+        raise ValueError("max_bytes must allow at least one UTF-8 character")
+
+    pieces = []
+    for sentence in split_sentences(text):
+        if sentence.byte_length <= max_bytes:
+            pieces.append(sentence)
+        else:
+            pieces.extend(_split_oversized(text, sentence, max_bytes))
+
+    chunks = []
+    current = None
+    for piece in pieces:
+        if current is not None:
+            merged = TextChunk(text[current.start:piece.end], current.start, piece.end)
+            if merged.byte_length <= max_bytes:
+                current = merged
+                continue
+            chunks.append(current)
+        current = piece
+    if current is not None:
+        chunks.append(current)
+    return chunks
+
+
+def join_chunks(source: str, chunks: List[TextChunk], translated: List[str]) -> str:
+    """
+    Reassemble translated chunks, keeping the whitespace that separated
+    the source chunks (so paragraph breaks survive translation).
+
+    Args:
+        source (str): Original text the chunks were cut from
+        chunks (List[TextChunk]): Source chunks in order
+        translated (List[str]): Translated text for each chunk
+
+    Returns:
+        The combined translation
+    """
+    parts = []
+    for index, (chunk, text) in enumerate(zip(chunks, translated)):
+        if index:
+            separator = source[chunks[index - 1].end:chunk.start]
+            parts.append(separator or ' ')
+        parts.append(text)
+    return ''.join(parts)
+
+
+def _append_trimmed(chunks: List[TextChunk], text: str, start: int, end: int) -> None:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        chunks.append(TextChunk(text[start:end], start, end))
+
+
+def _split_oversized(text: str, sentence: TextChunk, max_bytes: int) -> List[TextChunk]:
+    words = []
+    position = sentence.start
+    for match in _WHITESPACE.finditer(sentence.text):
+        _append_trimmed(words, text, position, sentence.start + match.start())
+        position = sentence.start + match.end()
+    _append_trimmed(words, text, position, sentence.end)
+
+    pieces = []
+    for word in words:
+        if word.byte_length <= max_bytes:
+            pieces.append(word)
+            continue
+        # A single "word" over budget (e.g. unspaced CJK text): cut on characters
+        start = word.start
+        size = 0
+        for offset in range(word.start, word.end):
+            char_size = len(text[offset].encode('utf-8'))
+            if size + char_size > max_bytes:
+                pieces.append(TextChunk(text[start:offset], start, offset))
+                start = offset
+                size = 0
+            size += char_size
+        pieces.append(TextChunk(text[start:word.end], start, word.end))
+    return pieces
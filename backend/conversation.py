@@ -0,0 +1,288 @@
+"""
+Speaker-aware conversation sessions.
+
+A conversation is an ordered log of turns, each spoken by one participant.
+Every participant declares the language they need; a turn is translated only
+into the languages of the other participants, and never into the language it
+was spoken in. In a doctor-patient consultation each turn is translated once,
+instead of once per language of the session.
+
+Turns come from speaker-labelled transcript segments or from one recording
+per participant, merged by start time. Diarization itself is not done here:
+a single recording of several participants needs a transcription service
+whose transcribe_stream yields segments with speaker labels, and per-speaker
+recordings need segments with timestamps. Transcripts without them are
+rejected rather than attributed to the wrong speaker.
+"""
+
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from streaming import TranscriptSegment
+from translation import DEFAULT_MAX_WORKERS
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_LANGUAGE = 'und'
+
+
+@dataclass
+class Participant:
+    """A person in the conversation and the language they listen in."""
+    name: str
+    language: str
+
+
+@dataclass
+class Turn:
+    """One uninterrupted stretch of speech by one participant."""
+    speaker: str
+    text: str
+    start_time: float = 0.0
+    end_time: float = 0.0
+    language: Optional[str] = None
+    confidence: float = 0.0
+    translations: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self, index: int) -> Dict[str, Any]:
+        return {
+            'index': index,
+            'speaker': self.speaker,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'language': self.language,
+            'confidence': self.confidence,
+            'text': self.text,
+            'translations': self.translations,
+            'errors': self.errors,
+        }
+
+
+def _base(language: Optional[str]) -> str:
+    return (language or UNKNOWN_LANGUAGE).split('-')[0].lower()
+
+
+def parse_participants(specs: Iterable[Any]) -> List[Participant]:
+    """
+    Parse NAME=LANG specifications, e.g. ['doctor=en', 'patient=es'];
+    Participant objects are passed through.
+
+    Raises:
+        ValueError: For a malformed specification or a repeated name
+    """
+    participants = []
+    for spec in specs:
+        if isinstance(spec, Participant):
+            participants.append(spec)
+            continue
+        name, separator, language = spec.partition('=')
+        if not separator or not name.strip() or not language.strip():
+            raise ValueError(f"Expected NAME=LANG, got: {spec}")
+        participants.append(Participant(name.strip(), language.strip()))
+    names = [participant.name for participant in participants]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Participant names must be unique: {', '.join(names)}")
+    return participants
+
+
+def turns_from_segments(segments: Iterable[TranscriptSegment], participants: List[Participant],
+                        speaker: Optional[str] = None) -> List[Turn]:
+    """
+    Merge final transcript segments into turns.
+
+    Consecutive segments by the same speaker form one turn. Segment speaker
+    labels that are participant names are kept; other labels (such as the
+    spk_0, spk_1 of diarization) are assigned to the participants in order
+    of first appearance.
+
+    Args:
+        segments: Iterable of TranscriptSegment
+        participants (List[Participant]): Conversation participants
+        speaker (str, optional): Attribute every segment to this participant
+            (for per-speaker recordings); each segment is then its own turn,
+            for merge_turns to interleave
+
+    Returns:
+        Turns in order
+
+    Raises:
+        ValueError: When several participants share the segments but none
+            of them carries a speaker label
+    """
+    names = [participant.name for participant in participants]
+    labels: Dict[Optional[str], str] = {}
+
+    def resolve(label):
+        if label in names:
+            return label
+        if label not in labels:
+            unused = [name for name in names if name not in labels.values()]
+            labels[label] = unused[0] if unused else (label or names[0])
+        return labels[label]
+
+    turns: List[Turn] = []
+    labelled = False
+    for segment in segments:
+        text = segment.text.strip()
+        if not segment.is_final or not text:
+            continue
+        labelled = labelled or segment.speaker is not None
+        name = speaker or resolve(segment.speaker)
+        if speaker is None and turns and turns[-1].speaker == name:
+            turns[-1].text = f"{turns[-1].text} {text}"
+            turns[-1].end_time = segment.end_time
+        else:
+            turns.append(Turn(name, text, segment.start_time, segment.end_time))
+    if speaker is None and turns and not labelled and len(participants) > 1:
+        raise ValueError("The transcript has no speaker labels, so its turns cannot be attributed to "
+                         f"{len(participants)} participants; use a transcription service that yields "
+                         "speaker-labelled segments, or one recording per participant")
+    return turns
+
+
+def merge_turns(turn_lists: Iterable[List[Turn]]) -> List[Turn]:
+    """
+    Interleave the turns of per-speaker recordings by start time, joining
+    consecutive turns by the same speaker.
+
+    Raises:
+        ValueError: When several recordings have turns but one of them has
+            no timestamps, so the order of turns is unknown
+    """
+    turn_lists = [turns for turns in turn_lists if turns]
+    if len(turn_lists) > 1:
+        untimed = [turns[0].speaker for turns in turn_lists if not any(turn.end_time for turn in turns)]
+        if untimed:
+            raise ValueError("Per-speaker recordings cannot be interleaved without timestamps (missing for "
+                             f"{', '.join(untimed)}); use a transcription service that yields timed segments")
+
+    merged: List[Turn] = []
+    for turn in sorted((turn for turns in turn_lists for turn in turns), key=lambda turn: turn.start_time):
+        if merged and merged[-1].speaker == turn.speaker:
+            merged[-1].text = f"{merged[-1].text} {turn.text}"
+            merged[-1].end_time = max(merged[-1].end_time, turn.end_time)
+        else:
+            merged.append(turn)
+    return merged
+
+
+class ConversationSession:
+    """
+    Detects the language of each turn and translates it for the other participants.
+    """
+
+    def __init__(self, participants: List[Participant], translator, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            participants (List[Participant]): At least one participant, with unique names
+            translator (AWSTranslationService): Translator used for every turn
+            max_workers (int): Maximum concurrent turn translations
+        """
+        if not participants:
+            raise ValueError("A conversation needs at least one participant")
+        self.participants = list(participants)
+        self.languages = {participant.name: participant.language for participant in participants}
+        self.translator = translator
+        self.max_workers = max_workers
+
+    def target_languages(self, speaker: str, source_language: str) -> List[str]:
+        """Languages the other participants need that differ from the turn's language."""
+        return list(dict.fromkeys(
+            participant.language for participant in self.participants
+            if participant.name != speaker and _base(participant.language) != _base(source_language)
+        ))
+
+    def detect(self, turns: List[Turn]) -> None:
+        """
+        Set each turn's language, falling back to the speaker's declared
+        language when a turn is too short or ambiguous to detect.
+        """
+        pending = [turn for turn in turns if turn.language is None]
+        if not pending:
+            return
+        results = self.translator.batch_detect_language([turn.text for turn in pending])
+        for turn, result in zip(pending, results):
+            if result['language_code'] == UNKNOWN_LANGUAGE:
+                turn.language = self.languages.get(turn.speaker, self.participants[0].language)
+            else:
+                turn.language = result['language_code']
+                turn.confidence = result['confidence']
+
+    def translate(self, turns: List[Turn]) -> Dict[str, int]:
+        """
+        Translate every turn into its listeners' languages.
+
+        Returns:
+            dict: 'requests' and 'characters' sent for translation
+        """
+        jobs = [(turn, language) for turn in turns for language in self.target_languages(turn.speaker, turn.language)]
+
+        def run(job):
+            turn, language = job
+            try:
+                return self.translator.translate_text(turn.text, language, turn.language)['translated_text']
+            except Exception as e:
+                logger.error(f"Failed to translate turn by {turn.speaker} to {language}: {str(e)}")
+                turn.errors[language] = str(e)
+                return None
+
+        workers = max(1, min(self.max_workers or 1, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='conversation') as executor:
+            for (turn, language), text in zip(jobs, executor.map(run, jobs)):
+                if text is not None:
+                    turn.translations[language] = text
+
+        return {'requests': len(jobs), 'characters': sum(len(turn.text) for turn, _ in jobs)}
+
+    def run(self, turns: List[Turn]) -> Dict[str, Any]:
+        """
+        Detect, translate and assemble results for a list of turns.
+
+        Returns:
+            dict: Results in the shape of process_audio_file results: 'transcript'
+            and 'translations' hold one "speaker: text" line per turn (each
+            participant language as seen by its listeners), 'conversation'
+            holds the participants and the ordered turn log
+        """
+        self.detect(turns)
+        sent = self.translate(turns)
+
+        # What translating the whole conversation into every language would have sent
+        session_languages = list(dict.fromkeys(participant.language for participant in self.participants))
+        naive_requests = sum(1 for turn in turns for language in session_languages
+                             if _base(language) != _base(turn.language))
+        naive_characters = sum(len(turn.text) for turn in turns for language in session_languages
+                               if _base(language) != _base(turn.language))
+
+        translations = {}
+        for language in session_languages:
+            lines = []
+            for turn in turns:
+                text = turn.text if _base(turn.language) == _base(language) else turn.translations.get(language)
+                lines.append(f"{turn.speaker}: {text if text is not None else turn.text}")
+            translations[language] = '\n'.join(lines)
+
+        counts = Counter(turn.language for turn in turns)
+        dominant = counts.most_common(1)[0] if counts else None
+        logger.info(f"Translated {len(turns)} turns with {sent['requests']} requests "
+                    f"(translating every turn into every language: {naive_requests})")
+        return {
+            'transcript': '\n'.join(f"{turn.speaker}: {turn.text}" for turn in turns),
+            'translations': translations,
+            'detected_language': {'code': dominant[0], 'confidence': dominant[1] / len(turns)} if dominant else None,
+            'conversation': {
+                'participants': [{'name': participant.name, 'language': participant.language}
+                                 for participant in self.participants],
+                'turns': [turn.to_dict(index) for index, turn in enumerate(turns)],
+            },
+            'translation_stats': {
+                'requests': sent['requests'],
+                'characters': sent['characters'],
+                'all_languages_requests': naive_requests,
+                'all_languages_characters': naive_characters,
+            },
+        }
@@ -0,0 +1,320 @@
+"""
+Local language detection used as a fast path in front of AWS Comprehend.
+
+Non-Latin scripts are identified from their Unicode blocks. Latin-script
+languages are scored by cosine similarity of character trigram profiles.
+Only a few Latin-script languages have a profile, so text that resembles an
+unprofiled relative (Norwegian for German, Afrikaans for Dutch, Romanian for
+Spanish) is left to Comprehend. The detector only answers when it is
+confident; otherwise the caller should fall back to Comprehend.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CONFIDENCE_THRESHOLD = 0.9
+
+# Below this many letters the trigram statistics are too noisy to trust
+MIN_LATIN_LETTERS = 40
+# Below this cosine similarity to the best profile the text is probably in a
+# language without a profile, however clearly that profile beats the others
+MIN_LATIN_SIMILARITY = 0.28
+
+# Scripts used by a single supported language (or a clear majority language)
+_SCRIPT_LANGUAGES = [
+    ('HANGUL', 'ko', 0.99),
+    ('HIRAGANA', 'ja', 0.99),
+    ('KATAKANA', 'ja', 0.99),
+    ('CJK', 'zh', 0.95),
+    ('THAI', 'th', 0.99),
+    ('GREEK', 'el', 0.99),
+    ('HEBREW', 'he', 0.98),
+    ('BENGALI', 'bn', 0.97),
+    ('TAMIL', 'ta', 0.99),
+    ('TELUGU', 'te', 0.99),
+    ('GUJARATI', 'gu', 0.99),
+    ('GURMUKHI', 'pa', 0.99),
+    ('KANNADA', 'kn', 0.99),
+    ('MALAYALAM', 'ml', 0.99),
+    ('SINHALA', 'si', 0.99),
+    ('GEORGIAN', 'ka', 0.99),
+    ('ARMENIAN', 'hy', 0.99),
+    ('ETHIOPIC', 'am', 0.95),
+    # Shared scripts: only confident when a distinctive letter settles it
+    ('DEVANAGARI', 'hi', 0.85),
+    ('ARABIC', 'ar', 0.9),
+    ('CYRILLIC', 'ru', 0.85),
+]
+
+DISTINCTIVE_LETTER_CONFIDENCE = 0.95
+
+# Letters each language adds to a shared script
+_EXTRA_LETTERS = {
+    'ARABIC': [
+        ('fa', 'پچژگکی'),
+        ('ur', 'پچژگکیٹڈڑںےھ'),
+        ('ps', 'پچژټډړږښځڅګڼۍې'),
+    ],
+    'CYRILLIC': [
+        ('uk', 'іїєґ'),
+        ('be', 'іў'),
+        ('sr', 'јљњћђџ'),
+        ('mk', 'јљњѓќѕџ'),
+        ('kk', 'әғқңөұүһі'),
+        ('ky', 'ңөү'),
+        ('mn', 'өү'),
+        ('uz', 'ўқғҳ'),
+        ('tg', 'ғӣқӯҳҷ'),
+    ],
+}
+
+# Letters used by only one language of a shared script
+_DISTINCTIVE_LETTERS = {
+    script: [
+        (code, set(letters).difference(*(other for other_code, other in languages if other_code != code)))
+        for code, letters in languages
+    ]
+    for script, languages in _EXTRA_LETTERS.items()
+}
+
+# Small reference samples; trigram profiles are built from them at import time
+_LATIN_SAMPLES = {
+    'en': (
+        "The patient says the pain started three days ago and it is getting worse at night. "
+        "Please describe your symptoms and tell me if you have any allergies to medication. "
+        "We will take your blood pressure and then the doctor will see you. Do you have "
+        "a fever, a cough or any trouble breathing? Take one tablet with water after each meal "
+        "and come back next week if you do not feel better. What is the name of the medicine "
+        "that you are taking now, and how often do you take it?"
+    ),
+    'es': (
+        "El paciente dice que el dolor empezó hace tres días y que está empeorando por la noche. "
+        "Por favor describa sus síntomas y dígame si tiene alguna alergia a los medicamentos. "
+        "Vamos a tomarle la presión arterial y luego el médico le atenderá. ¿Tiene fiebre, tos "
+        "o dificultad para respirar? Tome una pastilla con agua después de cada comida y vuelva "
+        "la próxima semana si no se siente mejor. ¿Cómo se llama el medicamento que está tomando "
+        "ahora y con qué frecuencia lo toma?"
+    ),
+    'fr': (
+        "Le patient dit que la douleur a commencé il y a trois jours et qu'elle s'aggrave la nuit. "
+        "Veuillez décrire vos symptômes et dites-moi si vous avez des allergies aux médicaments. "
+        "Nous allons prendre votre tension artérielle puis le médecin va vous recevoir. Avez-vous "
+        "de la fièvre, de la toux ou des difficultés à respirer? Prenez un comprimé avec de l'eau "
+        "après chaque repas et revenez la semaine prochaine si vous ne vous sentez pas mieux. "
+        "Quel est le nom du médicament que vous prenez maintenant et à quelle fréquence?"
+    ),
+    'de': (
+        "Der Patient sagt, dass die Schmerzen vor drei Tagen angefangen haben und nachts schlimmer "
+        "werden. Bitte beschreiben Sie Ihre Symptome und sagen Sie mir, ob Sie Allergien gegen "
+        "Medikamente haben. Wir messen jetzt Ihren Blutdruck und dann wird der Arzt Sie sehen. "
+        "Haben Sie Fieber, Husten oder Atembeschwerden? Nehmen Sie nach jeder Mahlzeit eine "
+        "Tablette mit Wasser und kommen Sie nächste Woche wieder, wenn es Ihnen nicht besser geht. "
+        "Wie heißt das Medikament, das Sie gerade nehmen, und wie oft nehmen Sie es?"
+    ),
+    'pt': (
+        "O paciente diz que a dor começou há três dias e que está piorando durante a noite. "
+        "Por favor descreva os seus sintomas e diga-me se tem alguma alergia a medicamentos. "
+        "Vamos medir a sua pressão arterial e depois o médico vai atendê-lo. Você tem febre, "
+        "tosse ou dificuldade para respirar? Tome um comprimido com água depois de cada refeição "
+        "e volte na próxima semana se não se sentir melhor. Qual é o nome do remédio que você "
+        "está tomando agora e com que frequência você o toma?"
+    ),
+    'it': (
+        "Il paziente dice che il dolore è iniziato tre giorni fa e che peggiora durante la notte. "
+        "Per favore descriva i suoi sintomi e mi dica se ha allergie ai farmaci. Adesso "
+        "misuriamo la sua pressione e poi il medico la visiterà. Ha febbre, tosse o difficoltà "
+        "a respirare? Prenda una compressa con acqua dopo ogni pasto e torni la settimana "
+        "prossima se non si sente meglio. Come si chiama il farmaco che sta prendendo adesso "
+        "e quante volte al giorno lo prende?"
+    ),
+    'nl': (
+        "De patiënt zegt dat de pijn drie dagen geleden is begonnen en dat het 's nachts erger "
+        "wordt. Beschrijft u alstublieft uw klachten en vertel me of u allergisch bent voor "
+        "medicijnen. We gaan nu uw bloeddruk meten en daarna komt de dokter bij u. Heeft u "
+        "koorts, hoest of moeite met ademhalen? Neem na elke maaltijd een tablet met water en "
+        "kom volgende week terug als u zich niet beter voelt. Hoe heet het medicijn dat u nu "
+        "gebruikt en hoe vaak neemt u het in?"
+    ),
+    'ca': (
+        "El pacient diu que el dolor va començar fa tres dies i que empitjora durant la nit. "
+        "Si us plau, descrigui els seus símptomes i digui'm si té al·lèrgia a algun medicament. "
+        "Ara li prendrem la pressió arterial i després el metge l'atendrà. Té febre, tos o "
+        "dificultat per respirar? Prengui una pastilla amb aigua després de cada àpat i torni "
+        "la setmana vinent si no es troba millor. Com es diu el medicament que pren ara i cada "
+        "quant el pren?"
+    ),
+}
+
+# Letters each profiled language uses beyond a-z
+_LATIN_LETTERS = {
+    'en': '',
+    'es': 'áéíóúñü',
+    'fr': 'àâæçéèêëîïôœùûüÿ',
+    'de': 'äöüß',
+    'pt': 'áâãàçéêíóôõú',
+    'it': 'àèéìíòóù',
+    'nl': 'áéèëïóú',
+    'ca': 'àçéèíïòóúü',
+}
+
+# Unprofiled languages that score close to each profile
+_LATIN_RELATIVES = {
+    'de': ['no', 'da', 'sv', 'lb', 'af'],
+    'nl': ['af', 'no', 'da', 'sv', 'lb'],
+    'es': ['gl', 'ro'],
+    'pt': ['gl', 'ro'],
+    'it': ['ro'],
+    'ca': ['ro'],
+    'fr': ['ht', 'ro'],
+}
+
+# Letters and common words of those relatives that their profiled neighbour does not use
+_RELATIVE_MARKERS = {
+    'no': ('æøå', {'jeg', 'ikke', 'og', 'hva', 'hvorfor', 'hvordan', 'skal', 'meg'}),
+    'da': ('æøå', {'jeg', 'ikke', 'og', 'hvad', 'hvorfor', 'hvordan', 'skal', 'mig'}),
+    'sv': ('åäö', {'jag', 'inte', 'och', 'vad', 'varför', 'hur', 'ska', 'mig'}),
+    'lb': ('ëé', {'ech', 'hunn', 'ass', 'sinn', 'zënter'}),
+    'af': ('êôû', {'nie', 'ek', 'jy', 'julle', 'hulle', 'baie', 'vir', 'sê'}),
+    'ro': ('ăâîșşțţ', {'și', 'sunt', 'pentru', 'trebuie', 'foarte', 'acum', 'mea', 'meu', 'doare'}),
+    'gl': ('', {'unha', 'teño', 'xa', 'moi', 'onte', 'tamén', 'cos', 'coa', 'non'}),
+    'ht': ('ò', {'mwen', 'nou', 'yo', 'nan', 'pou', 'ak', 'gen', 'kisa', 'epi'}),
+}
+
+_NON_LETTERS = re.compile(r"[^\w']+|[\d_]+")
+
+
+def _trigram_profile(text: str) -> Dict[str, float]:
+    counts = Counter()
+    for word in _NON_LETTERS.sub(' ', text.lower()).split():
+        padded = f' {word} '
+        for index in range(len(padded) - 2):
+            counts[padded[index:index + 3]] += 1
+    norm = math.sqrt(sum(value * value for value in counts.values())) or 1.0
+    return {gram: value / norm for gram, value in counts.items()}
+
+
+_LATIN_PROFILES = {code: _trigram_profile(sample) for code, sample in _LATIN_SAMPLES.items()}
+
+
+class LocalLanguageDetector:
+    """
+    Character n-gram / Unicode script language detector with no network calls.
+    """
+
+    def __init__(self, confidence_threshold: float = DEFAULT_CONFIDENCE_THRESHOLD):
+        """
+        Args:
+            confidence_threshold (float): Minimum confidence for detect() to answer
+        """
+        self.confidence_threshold = confidence_threshold
+
+    def detect(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Detect the language of text if confident enough.
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            Dict shaped like AWSTranslationService.detect_language results,
+            or None when the caller should fall back to Comprehend
+        """
+        code, confidence = self.score(text)
+        if code is None or confidence < self.confidence_threshold:
+            return None
+        return {
+            'language_code': code,
+            'confidence': confidence,
+            'all_languages': [{'LanguageCode': code, 'Score': confidence}],
+            'source': 'local'
+        }
+
+    def score(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Return the best guess and its confidence, regardless of the threshold.
+        """
+        scripts = Counter()
+        letters = []
+        for char in text:
+            if not char.isalpha():
+                continue
+            script = _script_of(char)
+            scripts[script] += 1
+            if script == 'LATIN':
+                letters.append(char)
+
+        total = sum(scripts.values())
+        if not total:
+            return None, 0.0
+
+        script, count = scripts.most_common(1)[0]
+
+        # Japanese mixes kanji with kana; any kana at all means Japanese
+        kana = scripts['HIRAGANA'] + scripts['KATAKANA']
+        if script in ('CJK', 'HIRAGANA', 'KATAKANA') and kana:
+            script = 'HIRAGANA'
+            count = kana + scripts['CJK']
+        share = count / total
+
+        if script == 'LATIN':
+            if len(letters) < MIN_LATIN_LETTERS:
+                return None, 0.0
+            code, confidence = self._score_latin(text)
+            return code, confidence * share
+
+        for name, code, confidence in _SCRIPT_LANGUAGES:
+            if name == script and script in _EXTRA_LETTERS:
+                present = set(text.lower())
+                found = {distinct_code for distinct_code, distinct_letters in _DISTINCTIVE_LETTERS[script]
+                         if present & distinct_letters}
+                if len(found) == 1:
+                    return found.pop(), max(confidence, DISTINCTIVE_LETTER_CONFIDENCE) * share
+                # Letters of several languages, or only letters they share: leave it to Comprehend
+                if found or any(present.intersection(letters) for _, letters in _EXTRA_LETTERS[script]):
+                    return None, 0.0
+                return code, confidence * share
+            if name == script:
+                return code, confidence * share
+
+        return None, 0.0
+
+    @staticmethod
+    def _score_latin(text: str) -> Tuple[Optional[str], float]:
+        profile = _trigram_profile(text)
+        scores = sorted(
+            (
+                (sum(weight * reference.get(gram, 0.0) for gram, weight in profile.items()), code)
+                for code, reference in _LATIN_PROFILES.items()
+            ),
+            reverse=True
+        )
+        best_score, best_code = scores[0]
+        runner_up = scores[1][0]
+        if best_score < MIN_LATIN_SIMILARITY or _resembles_relative(text, best_code):
+            return None, 0.0
+        # Confidence grows with how clearly the best profile beats the runner-up
+        margin = (best_score - runner_up) / best_score
+        return best_code, min(1.0, 0.5 + margin * 2.5)
+
+
+def _resembles_relative(text: str, code: str) -> bool:
+    """Whether text has letters or words of an unprofiled language close to code."""
+    lowered = text.lower()
+    letters = set(lowered).difference(_LATIN_LETTERS[code])
+    words = set(_NON_LETTERS.sub(' ', lowered).split())
+    return any(letters.intersection(_RELATIVE_MARKERS[relative][0]) or words & _RELATIVE_MARKERS[relative][1]
+               for relative in _LATIN_RELATIVES.get(code, []))
+
+
+def _script_of(char: str) -> str:
+    try:
+        name = unicodedata.name(char)
+    except ValueError:
+        return 'UNKNOWN'
+    if name.startswith('CJK'):
+        return 'CJK'
+    return name.split(' ', 1)[0]
+
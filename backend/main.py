@@ -5,14 +5,222 @@ Main application - Audio transcription and storage workflow with translation sup
 
 import os
 import sys
+import time
 import argparse
+from dataclasses import replace
 from datetime import datetime
-from transcription import TranscriptionService
-from s3_storage import S3Storage
-from translation import AWSTranslationService
+from functools import lru_cache
+from aws_clients import load_environment
+from batch import DEFAULT_CHECKPOINT, collect_audio_files, is_batch_source, run_batch
+from translation import (
+    AWSTranslationService,
+    DEFAULT_MAX_WORKERS,
+    SUPPORTED_LANGUAGES,
+    source_language_from,
+)
+from translation_cache import TranslationCache, get_default_cache
+from streaming import process_segments, segments_from_service
+from conversation import ConversationSession, merge_turns, parse_participants, turns_from_segments
+from pipeline import StageError, StageGraph
+from metrics import delta, get_metrics
+from speech import SpeechSynthesizer
+from summarization import TranscriptSummarizer
+from result_index import LocalResultIndex, S3ResultIndex, file_sha256
+from search_index import SearchIndex
+from result_bundle import (
+    BUNDLE_EXTENSION,
+    CONTENT_ENCODING as BUNDLE_CONTENT_ENCODING,
+    CONTENT_TYPE as BUNDLE_CONTENT_TYPE,
+    build_bundle,
+)
+
+RESULTS_BUCKET = "hackthechange-transcripts"
+
+
+@lru_cache(maxsize=None)
+def _default_storage():
+    """Results bucket storage shared by every run in this process (bucket checked once)"""
+    # boto3's S3 transfer machinery is only loaded when results are saved
+    from s3_storage import S3Storage
+
+    return S3Storage(RESULTS_BUCKET)
+
+
+def _transcription_service():
+    """Default AWS transcription service, imported only when no service is injected"""
+    from transcription import TranscriptionService
+
+    return TranscriptionService()
+
+
+def _preprocess(audio_file_path):
+    """
+    Downmix, resample and trim silence from a WAV file before transcription
+
+    Returns:
+        PreprocessResult, or None when the input is not a supported WAV file
+    """
+    # NumPy is only needed when preprocessing is requested
+    from audio_preprocessing import is_wav, preprocess_audio
+
+    if not is_wav(audio_file_path):
+        print(f"Preprocessing skipped (WAV input required): {audio_file_path}")
+        return None
+    try:
+        prepared = preprocess_audio(audio_file_path)
+    except ValueError as e:
+        print(f"Preprocessing skipped: {e}")
+        return None
+    print(
+        f"Preprocessed audio: {prepared.original_duration:.1f}s -> {prepared.processed_duration:.1f}s, "
+        f"{prepared.original_bytes} -> {prepared.processed_bytes} bytes"
+    )
+    return prepared
+
+
+@lru_cache(maxsize=None)
+def _local_index(path):
+    """Local result index shared by every run in this process that uses path"""
+    return LocalResultIndex(path)
+
+
+@lru_cache(maxsize=None)
+def _search_index(path):
+    """Search index shared by every run in this process that uses path"""
+    return SearchIndex(path)
+
+
+def _configured_search_index(search_index_path):
+    path = search_index_path or os.environ.get("SEARCH_INDEX_PATH")
+    return _search_index(path) if path else None
+
+
+def result_keys(audio_file_path, content_hash=None):
+    """
+    S3 keys for one run's result bundle, legacy per-language objects and speech
+
+    Keys are content-addressed when the audio's hash is known, so the same
+    recording always maps to the same objects; otherwise they are named
+    after the file and the current time.
+    """
+    if content_hash:
+        name = content_hash
+    else:
+        base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
+        name = f"{base_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return {
+        "bundle": f"transcripts/{name}{BUNDLE_EXTENSION}",
+        "text": f"transcripts/{name}.txt",
+        "json": f"transcripts/{name}.json",
+        "translation": lambda lang_code: f"translations/{name}_{lang_code}.txt",
+        "speech": lambda lang_code, extension: f"speech/{name}_{lang_code}.{extension}",
+    }
+
+
+def _cache_stats(translator, cache):
+    """Stats of the cache translations went through; an injected translator brings its own"""
+    used = getattr(translator, "cache", None)
+    return (used if used is not None else cache).stats()
+
+
+def find_previous_results(content_hash, indexes):
+    """First index entry for content_hash, or None"""
+    for index in indexes:
+        entry = index.lookup(content_hash)
+        if entry is not None:
+            return entry
+    return None
+
+
+def merge_with_previous(results, earlier):
+    """
+    Results to store for audio whose bundle already exists: everything the
+    earlier run stored (summary, speech, metadata, ...) overlaid with this
+    run's results. Translations and speech are merged per language, so
+    languages produced only by earlier runs are kept.
+    """
+    merged = dict(earlier, **results)
+    for field in ("translations", "speech"):
+        if field in earlier or field in results:
+            merged[field] = dict(earlier.get(field) or {}, **(results.get(field) or {}))
+    return merged
+
+
+def upload_bundle(results, storage, s3_key):
+    """Upload results as a single gzip result bundle (see result_bundle)"""
+    return storage.upload_file(
+        build_bundle(results), s3_key, content_type=BUNDLE_CONTENT_TYPE, content_encoding=BUNDLE_CONTENT_ENCODING
+    )
+
+
+def save_results(results, audio_file_path, storage, legacy_objects=False, search_index=None):
+    """
+    Upload the results to S3 as one result bundle
+
+    With legacy_objects, the transcript, each translation and the full JSON
+    results are also written as separate objects, for older readers.
+    Adds a "storage" entry with the object URLs to results, and indexes the
+    stored bundle in search_index when given.
+
+    Keys are named after the file and time rather than the audio's content
+    hash: streamed and conversation results have their own shape and must not
+    replace (or be reused as) the content-addressed bundle of a file run.
+    """
+    transcript = results["transcript"]
+    translations = results["translations"]
+    keys = result_keys(audio_file_path)
+
+    uploads = [
+        {
+            "key": keys["bundle"],
+            "file": build_bundle(results),
+            "content_type": BUNDLE_CONTENT_TYPE,
+            "content_encoding": BUNDLE_CONTENT_ENCODING,
+        }
+    ]
+    if legacy_objects:
+        uploads.append({"key": keys["text"], "text": transcript})
+        for lang_code, translated_text in translations.items():
+            uploads.append({"key": keys["translation"](lang_code), "text": translated_text})
+        uploads.append({"key": keys["json"], "json": results})
+
+    # All objects go up in one concurrent batch
+    urls = storage.upload_many(uploads)
+    results["storage"] = {"bundle_url": urls[0]}
+    if legacy_objects:
+        results["storage"].update(
+            {
+                "text_url": urls[1],
+                "json_url": urls[-1],
+                "translation_urls": dict(zip(translations, urls[2:-1])),
+            }
+        )
+
+    print(f"Saved to S3: {urls[0]}")
+    if search_index is not None:
+        search_index.add_results(keys["bundle"], results)
+    return results
 
 
-def process_audio_file(audio_file_path, save_to_s3=True, translate_languages=None):
+def process_audio_file(
+    audio_file_path,
+    save_to_s3=True,
+    translate_languages=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    transcription_service=None,
+    translator=None,
+    storage=None,
+    synthesize_speech=False,
+    synthesizer=None,
+    preprocess=False,
+    legacy_objects=False,
+    reuse_results=True,
+    index_path=None,
+    search_index_path=None,
+    summarize=False,
+    summarizer=None,
+):
     """
     Complete workflow: transcribe audio, translate if requested, and optionally save to S3
 
@@ -20,6 +228,28 @@ def process_audio_file(audio_file_path, save_to_s3=True, translate_languages=Non
         audio_file_path (str): Path to audio file
         save_to_s3 (bool): Whether to save results to S3
         translate_languages (list): List of language codes to translate to
+        max_workers (int): Maximum number of languages translated concurrently
+        cache (TranslationCache): Translation/detection cache (defaults to the shared process cache)
+        transcription_service (TranscriptionService): Injected transcription service
+        translator (AWSTranslationService): Injected translator (its own cache is used)
+        storage (S3Storage): Injected result storage (defaults to the shared results bucket)
+        synthesize_speech (bool): Speak each translation with Polly (to S3, or to local
+            files next to the audio when save_to_s3 is False)
+        synthesizer (SpeechSynthesizer): Injected speech synthesizer
+        preprocess (bool): Downmix, resample and trim silence from WAV input before
+            transcription (segment times map back through metadata["preprocessing"])
+        legacy_objects (bool): Besides the result bundle, also write the transcript, each
+            translation and the JSON results as separate S3 objects
+        reuse_results (bool): Reuse the transcript and translations of a byte-identical
+            recording processed before, translating only the missing languages. When False
+            the audio is not hashed and results are stored under a new timestamped key,
+            leaving the earlier content-addressed results in place
+        index_path (str): SQLite result index checked before the S3 bundles
+            (default: $RESULT_INDEX_PATH; none when unset)
+        search_index_path (str): Search index updated with the stored results
+            (default: $SEARCH_INDEX_PATH; none when unset)
+        summarize (bool): Summarize the transcript with Bedrock (see summarization)
+        summarizer (TranscriptSummarizer): Injected summarizer
 
     Returns:
         dict: Results with transcript, translations, and metadata
@@ -27,104 +257,561 @@ def process_audio_file(audio_file_path, save_to_s3=True, translate_languages=Non
 
     print(f"Processing: {audio_file_path}")
 
-    # Step 1: Transcribe audio using AWS
-    service = TranscriptionService()
-    transcript = service.transcribe(audio_file_path)
-
-    # Step 2: Translate if requested
-    translations = {}
-    detected_language = None
+    if cache is None:
+        cache = get_default_cache()
+    translate_languages = list(dict.fromkeys(translate_languages or []))
 
-    if translate_languages:
+    # A service that cannot be created (credentials, region) only fails the stages
+    # that need it, as a failed call would; the transcript is still returned
+    service_errors = {}
+    if translate_languages and translator is None:
+        try:
+            translator = AWSTranslationService(cache=cache)
+        except Exception as e:
+            print(f"Translation error: {e}")
+            service_errors["translation"] = str(e)
+    if save_to_s3 and storage is None:
         try:
-            translator = AWSTranslationService()
+            storage = _default_storage()
+        except Exception as e:
+            print(f"Storage error, results will not be saved: {e}")
+            service_errors["storage"] = str(e)
+            save_to_s3 = False
+    if synthesize_speech and synthesizer is None:
+        try:
+            synthesizer = SpeechSynthesizer()
+        except Exception as e:
+            print(f"Speech synthesis error: {e}")
+            service_errors["speech"] = str(e)
+    if summarize and summarizer is None:
+        try:
+            summarizer = TranscriptSummarizer(cache=cache)
+        except Exception as e:
+            print(f"Summarization error: {e}")
+            service_errors["summary"] = str(e)
+    metrics = get_metrics()
+    metrics_before = metrics.snapshot()
+
+    # Identify the recording by content; identical audio reuses earlier results
+    lookup_start = time.perf_counter()
+    content_hash = file_sha256(audio_file_path) if reuse_results and os.path.isfile(audio_file_path) else None
+    index_path = index_path or os.environ.get("RESULT_INDEX_PATH")
+    local_index = _local_index(index_path) if index_path and content_hash else None
+    indexes = [index for index in (local_index, S3ResultIndex(storage) if save_to_s3 else None) if index]
+    previous = find_previous_results(content_hash, indexes) if content_hash else None
+    lookup_seconds = time.perf_counter() - lookup_start
+    keys = result_keys(audio_file_path, content_hash)
+    search_index = _configured_search_index(search_index_path) if save_to_s3 else None
+    if previous:
+        reused = [lang_code for lang_code in translate_languages if lang_code in previous["translations"]]
+        print(f"Reusing results for identical audio {content_hash[:12]} ({len(reused)} translations reused)")
+
+    # Stage functions; each receives its dependencies' results by stage name
+    def preprocess_stage(_):
+        return _preprocess(audio_file_path)
+
+    def transcribe(inputs):
+        if previous:
+            return previous["transcript"]
+        service = transcription_service or _transcription_service()
+        prepared = inputs.get("preprocess")
+        if prepared is None:
+            return service.transcribe(audio_file_path)
+        try:
+            return service.transcribe(prepared.path)
+        finally:
+            os.remove(prepared.path)
+
+    def detect(inputs):
+        if previous and previous.get("detected_language"):
+            return {
+                "language_code": previous["detected_language"]["code"],
+                "confidence": previous["detected_language"]["confidence"],
+            }
+        if translator is None:
+            return None
+        try:
+            detection_result = translator.detect_language(inputs["transcribe"])
+        except Exception as e:
+            print(f"Translation error: {e}")
+            return None
+        print(
+            f"Detected language: {detection_result['language_code']} (confidence: {detection_result['confidence']:.2f})"
+        )
+        print(f"Translating to {len(translate_languages)} languages...")
+        return detection_result
+
+    def translate(lang_code):
+        def run(inputs):
+            if previous and lang_code in previous["translations"]:
+                return previous["translations"][lang_code]
+            if inputs["detect"] is None or translator is None:
+                return None
+            try:
+                result = translator.translate_text(
+                    inputs["transcribe"], lang_code, source_language_from(inputs["detect"])
+                )
+            except Exception as e:
+                # One language failing must not affect the others
+                print(f"Translation to {lang_code} failed: {e}")
+                return None
+            print(f"Translated to {lang_code}: {result['translated_text'][:100]}...")
+            return result["translated_text"]
+
+        return run
+
+    def upload_transcript(inputs):
+        return storage.upload_text(inputs["transcribe"], keys["text"])
+
+    def upload_translation(lang_code):
+        def run(inputs):
+            translated_text = inputs[f"translate:{lang_code}"]
+            if translated_text is None:
+                return None
+            url = storage.upload_text(translated_text, keys["translation"](lang_code))
+            print(f"Saved {lang_code} translation to S3: {url}")
+            return url
+
+        return run
+
+    def speak(lang_code):
+        def run(inputs):
+            translated_text = inputs[f"translate:{lang_code}"]
+            if translated_text is None or synthesizer is None:
+                return None
+            try:
+                if save_to_s3:
+                    location = synthesizer.synthesize_to_s3(
+                        translated_text,
+                        lang_code,
+                        storage,
+                        keys["speech"](lang_code, synthesizer.file_extension),
+                    )
+                else:
+                    base_path = os.path.splitext(audio_file_path)[0]
+                    location = synthesizer.synthesize_to_file(
+                        translated_text, lang_code, f"{base_path}_{lang_code}.{synthesizer.file_extension}"
+                    )
+            except Exception as e:
+                print(f"Speech synthesis for {lang_code} failed: {e}")
+                return None
+            print(f"Synthesized {lang_code} speech: {location}")
+            return location
+
+        return run
 
-            # Detect source language
-            detection_result = translator.detect_language(transcript)
-            detected_language = {
+    def summarize_stage(inputs):
+        if summarizer is None:
+            return None
+        try:
+            summary = summarizer.summarize(inputs["transcribe"])
+        except Exception as e:
+            print(f"Summarization failed: {e}")
+            return None
+        print(f"Summary: {summary['summary']}")
+        return summary
+
+    def assemble(inputs):
+        transcript = inputs["transcribe"]
+        detection_result = inputs.get("detect")
+        prepared = inputs.get("preprocess")
+        translations = {}
+        for lang_code in translate_languages:
+            if inputs[f"translate:{lang_code}"] is not None:
+                translations[lang_code] = inputs[f"translate:{lang_code}"]
+        results = {
+            "transcript": transcript,
+            "translations": translations,
+            "detected_language": {
                 "code": detection_result["language_code"],
                 "confidence": detection_result["confidence"],
             }
-            print(
-                f"Detected language: {detected_language['code']} (confidence: {detected_language['confidence']:.2f})"
-            )
+            if detection_result
+            else None,
+            "metadata": {
+                "original_file": audio_file_path,
+                "transcription_method": "aws",
+                "translation_languages": translate_languages,
+                "timestamp": datetime.now().isoformat(),
+                "word_count": len(transcript.split()),
+                "character_count": len(transcript),
+                "cache": _cache_stats(translator, cache),
+                "preprocessing": prepared.summary() if prepared else None,
+                "content_hash": content_hash,
+                "reused_results": bool(previous),
+            },
+        }
+        if service_errors:
+            results["metadata"]["service_errors"] = service_errors
+        if synthesize_speech:
+            results["speech"] = {
+                lang_code: inputs[f"speak:{lang_code}"]
+                for lang_code in translate_languages
+                if inputs[f"speak:{lang_code}"] is not None
+            }
+        if summarize:
+            results["summary"] = inputs["summarize"]
+        return results
+
+    merged_bundle = []
+
+    def bundled(results):
+        if not previous:
+            return results
+        # Keep everything earlier runs stored in the bundle; the index stage runs
+        # after the upload, so the merge (and any S3 read it needs) happens once
+        if not merged_bundle:
+            section = previous.get("results")
+            if section is None:
+                # A local index hit only holds the transcript and translations
+                section = (S3ResultIndex(storage).lookup(content_hash) or {}).get("results", {})
+            earlier = dict(section, transcript=previous["transcript"], translations=previous["translations"])
+            merged_bundle.append(merge_with_previous(results, earlier))
+        return merged_bundle[0]
+
+    def upload_results(inputs):
+        results = inputs["assemble"]
+        if previous:
+            new_languages = set(results["translations"]) - set(previous["translations"])
+            if previous.get("stored") and not new_languages and not (synthesize_speech or summarize):
+                # The bundle for this audio already holds everything
+                return f"https://{storage.bucket_name}.s3.amazonaws.com/{keys['bundle']}"
+        url = upload_bundle(bundled(results), storage, keys["bundle"])
+        print(f"Saved to S3: {url}")
+        return url
+
+    def index_results(inputs):
+        return search_index.add_results(keys["bundle"], bundled(inputs["assemble"]))
+
+    def upload_json(inputs):
+        return storage.upload_json(inputs["assemble"], keys["json"])
+
+    # Transcribe -> detect -> translate each language; uploads start as soon as
+    # their input exists, overlapping with the translations still in flight
+    graph = StageGraph()
+    if preprocess and not previous:
+        graph.add("preprocess", preprocess_stage)
+        graph.add("transcribe", transcribe, ["preprocess"])
+        assemble_deps = ["preprocess", "transcribe"]
+    else:
+        graph.add("transcribe", transcribe)
+        assemble_deps = ["transcribe"]
+    if translate_languages:
+        graph.add("detect", detect, ["transcribe"])
+        assemble_deps.append("detect")
+        for lang_code in translate_languages:
+            graph.add(f"translate:{lang_code}", translate(lang_code), ["transcribe", "detect"])
+            assemble_deps.append(f"translate:{lang_code}")
+    if synthesize_speech:
+        # Speech only needs its own translation, so it overlaps the other languages
+        for lang_code in translate_languages:
+            graph.add(f"speak:{lang_code}", speak(lang_code), [f"translate:{lang_code}"])
+            assemble_deps.append(f"speak:{lang_code}")
+    if summarize:
+        # Runs alongside detection and translation; it only needs the transcript
+        graph.add("summarize", summarize_stage, ["transcribe"])
+        assemble_deps.append("summarize")
+    graph.add("assemble", assemble, assemble_deps)
+    if save_to_s3:
+        # One bundle object per run; per-language objects only for older readers
+        graph.add("upload_bundle", upload_results, ["assemble"])
+        if legacy_objects:
+            graph.add("upload_transcript", upload_transcript, ["transcribe"])
+            for lang_code in translate_languages:
+                graph.add(f"upload:{lang_code}", upload_translation(lang_code), [f"translate:{lang_code}"])
+            graph.add("upload_json", upload_json, ["assemble"])
+        if search_index is not None:
+            graph.add("index", index_results, ["assemble", "upload_bundle"])
+
+    run_start = time.perf_counter()
+    try:
+        stage_results = graph.run(max_workers=max(1, max_workers or 1) + 2)
+    except StageError as e:
+        raise e.error
+
+    results = stage_results["assemble"]
+    if local_index is not None:
+        local_index.record(content_hash, results)
+    results["metadata"]["stage_timings"] = dict(
+        {"lookup": round(lookup_seconds, 4)},
+        **{name: round(seconds, 4) for name, seconds in graph.timings.items()},
+    )
+    for name, seconds in graph.timings.items():
+        stage, _, language = name.partition(":")
+        metrics.observe("pipeline_stage_seconds", seconds, stage=stage, language=language or "-")
+    metrics.observe("pipeline_stage_seconds", lookup_seconds, stage="lookup", language="-")
+    metrics.observe("pipeline_run_seconds", time.perf_counter() - run_start + lookup_seconds)
+    # AWS calls, retries, throttles and bytes uploaded during this run (process-wide
+    # counters, so overlapping runs in the same process are included)
+    results["metadata"]["metrics"] = delta(metrics_before, metrics.snapshot())
 
-            # Perform translations
-            print(f"Translating to {len(translate_languages)} languages...")
-            multi_translations = translator.translate_to_multiple_languages(
-                transcript, translate_languages
+    if save_to_s3:
+        results["storage"] = {"bundle_url": stage_results["upload_bundle"]}
+        if legacy_objects:
+            results["storage"].update(
+                {
+                    "text_url": stage_results["upload_transcript"],
+                    "json_url": stage_results["upload_json"],
+                    "translation_urls": {
+                        lang_code: stage_results[f"upload:{lang_code}"]
+                        for lang_code in translate_languages
+                        if stage_results[f"upload:{lang_code}"] is not None
+                    },
+                }
             )
 
-            for lang_code, translation_result in multi_translations.items():
-                if "error" not in translation_result:
-                    translations[lang_code] = translation_result["translated_text"]
-                    print(
-                        f"Translated to {lang_code}: {translation_result['translated_text'][:100]}..."
-                    )
-                else:
-                    print(
-                        f"Translation to {lang_code} failed: {translation_result['error']}"
-                    )
+    print(f"Transcript: {results['transcript']}")
+    return results
+
 
+def process_audio_stream(
+    audio_file_path,
+    save_to_s3=True,
+    translate_languages=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    transcription_service=None,
+    translator=None,
+    storage=None,
+    segments=None,
+    preprocess=False,
+    legacy_objects=False,
+    search_index_path=None,
+):
+    """
+    Real-time workflow: translate each finalized transcript segment as soon as it arrives
+
+    Takes the same arguments as process_audio_file, plus:
+        segments (iterable): Segment source to use instead of the transcription
+            service (e.g. streaming.fake_segment_source for local testing)
+        preprocess (bool): Preprocess WAV input; segment times are mapped back to
+            the original recording
+        legacy_objects (bool): Also write per-language objects (see save_results)
+        search_index_path (str): Search index updated with the stored results
+
+    Returns:
+        dict: Results with transcript, translations, per-segment detail and metadata
+    """
+    print(f"Streaming: {audio_file_path}")
+    metrics = get_metrics()
+    metrics_before = metrics.snapshot()
+    run_start = time.perf_counter()
+
+    prepared = None
+    if segments is None:
+        service = transcription_service or _transcription_service()
+        if preprocess:
+            with metrics.time_stage("preprocess"):
+                prepared = _preprocess(audio_file_path)
+        if prepared is None:
+            segments = segments_from_service(service, audio_file_path)
+        else:
+            timestamp_map = prepared.timestamp_map
+            segments = (
+                replace(
+                    segment,
+                    start_time=timestamp_map.to_original(segment.start_time),
+                    end_time=timestamp_map.to_original(segment.end_time),
+                )
+                for segment in segments_from_service(service, prepared.path)
+            )
+    if cache is None:
+        cache = get_default_cache()
+
+    # As in process_audio_file, a service that cannot be created does not cost the transcript
+    service_errors = {}
+    if translator is None and translate_languages:
+        try:
+            translator = AWSTranslationService(cache=cache)
         except Exception as e:
             print(f"Translation error: {e}")
+            service_errors["translation"] = str(e)
+    if save_to_s3 and storage is None:
+        try:
+            storage = _default_storage()
+        except Exception as e:
+            print(f"Storage error, results will not be saved: {e}")
+            service_errors["storage"] = str(e)
+            save_to_s3 = False
+
+    def show(event):
+        if event["type"] == "final":
+            segment = event["segment"]
+            print(f"[{segment.start_time:6.1f}s] {segment.text}")
+        elif event["type"] == "translation":
+            print(f"    {event['language']}: {event['text']} ({event['latency']:.2f}s)")
+        elif event["type"] == "error":
+            print(f"    Translation to {event['language']} failed: {event['error']}")
 
-    # Step 3: Prepare results
-    results = {
-        "transcript": transcript,
-        "translations": translations,
-        "detected_language": detected_language,
-        "metadata": {
-            "original_file": audio_file_path,
-            "transcription_method": "aws",
-            "translation_languages": translate_languages or [],
-            "timestamp": datetime.now().isoformat(),
-            "word_count": len(transcript.split()),
-            "character_count": len(transcript),
-        },
+    try:
+        # Transcription and translation overlap, so the stream is timed as one stage
+        with metrics.time_stage("stream"):
+            results = process_segments(
+                segments,
+                translator,
+                (translate_languages or []) if translator is not None else [],
+                on_event=show,
+                max_workers=max_workers,
+            )
+    finally:
+        if prepared is not None:
+            os.remove(prepared.path)
+    transcript = results["transcript"]
+    results["metadata"] = {
+        "original_file": audio_file_path,
+        "transcription_method": "aws-streaming",
+        "translation_languages": translate_languages or [],
+        "timestamp": datetime.now().isoformat(),
+        "word_count": len(transcript.split()),
+        "character_count": len(transcript),
+        "segment_count": len(results["segments"]),
+        "cache": _cache_stats(translator, cache),
+        "preprocessing": prepared.summary() if prepared else None,
     }
+    if service_errors:
+        results["metadata"]["service_errors"] = service_errors
 
-    # Step 4: Save to S3 if requested
     if save_to_s3:
-        storage = S3Storage("hackthechange-transcripts")
+        with metrics.time_stage("save"):
+            save_results(
+                results,
+                audio_file_path,
+                storage,
+                legacy_objects=legacy_objects,
+                search_index=_configured_search_index(search_index_path),
+            )
+    metrics.observe("pipeline_run_seconds", time.perf_counter() - run_start)
+    results["metadata"]["metrics"] = delta(metrics_before, metrics.snapshot())
 
-        base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return results
 
-        # Save transcript as text
-        txt_key = f"transcripts/{base_name}_{timestamp}.txt"
-        txt_url = storage.upload_text(transcript, txt_key)
 
-        # Save translations as separate files
-        translation_urls = {}
-        for lang_code, translated_text in translations.items():
-            trans_key = f"translations/{base_name}_{timestamp}_{lang_code}.txt"
-            trans_url = storage.upload_text(translated_text, trans_key)
-            translation_urls[lang_code] = trans_url
-            print(f"Saved {lang_code} translation to S3: {trans_url}")
-
-        # Save full results as JSON
-        json_key = f"transcripts/{base_name}_{timestamp}.json"
-        json_url = storage.upload_json(results, json_key)
-
-        results["storage"] = {
-            "text_url": txt_url,
-            "json_url": json_url,
-            "translation_urls": translation_urls,
-        }
+def process_conversation(
+    audio_file_path,
+    participants,
+    recordings=None,
+    save_to_s3=True,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    transcription_service=None,
+    translator=None,
+    storage=None,
+    segments=None,
+    legacy_objects=False,
+    search_index_path=None,
+):
+    """
+    Conversation workflow: translate each speaker turn only into the other participants' languages
+
+    Args:
+        audio_file_path (str): Recording of the whole conversation, split into turns by
+            the transcription service's speaker labels (None with recordings). Diarization
+            is up to the service: its transcribe_stream must yield speaker-labelled segments,
+            otherwise a ValueError is raised for two or more participants
+        participants (list): Participant objects or NAME=LANG strings, in order of first
+            speaking when speaker labels are not participant names
+        recordings (dict): Participant name -> that participant's own recording, used
+            instead of audio_file_path; turns are interleaved by start time, so the
+            service must yield timed segments
+        segments (iterable): Speaker-labelled segment source to use instead of the
+            transcription service (for local testing)
+
+        The other arguments are as for process_audio_file.
+
+    Returns:
+        dict: Results with "speaker: text" transcript and per-language translations,
+        the ordered turn log under "conversation", and metadata
+    """
+    participants = parse_participants(participants)
+    source_path = audio_file_path or next(iter((recordings or {}).values()), "conversation")
+    print(f"Conversation: {source_path} ({', '.join(f'{p.name}={p.language}' for p in participants)})")
+
+    if cache is None:
+        cache = get_default_cache()
+    if translator is None:
+        translator = AWSTranslationService(cache=cache)
+    if save_to_s3 and storage is None:
+        storage = _default_storage()
+
+    start = time.perf_counter()
+    if segments is not None:
+        turns = turns_from_segments(segments, participants)
+    else:
+        service = transcription_service or _transcription_service()
+        if recordings:
+            turns = merge_turns(
+                turns_from_segments(segments_from_service(service, path), participants, speaker=name)
+                for name, path in recordings.items()
+            )
+        else:
+            turns = turns_from_segments(segments_from_service(service, audio_file_path), participants)
+
+    session = ConversationSession(participants, translator, max_workers=max_workers)
+    results = session.run(turns)
+    stats = results.pop("translation_stats")
+    results["metadata"] = {
+        "original_file": source_path,
+        "recordings": recordings,
+        "transcription_method": "aws-conversation",
+        "translation_languages": list(results["translations"]),
+        "timestamp": datetime.now().isoformat(),
+        "turn_count": len(turns),
+        "word_count": sum(len(turn.text.split()) for turn in turns),
+        "character_count": sum(len(turn.text) for turn in turns),
+        "translation": stats,
+        "cache": _cache_stats(translator, cache),
+        "elapsed_seconds": round(time.perf_counter() - start, 4),
+    }
+
+    for turn in turns:
+        print(f"[{turn.start_time:6.1f}s] {turn.speaker} ({turn.language}): {turn.text}")
+        for lang_code, text in turn.translations.items():
+            print(f"    {lang_code}: {text}")
+    print(
+        f"Translation requests: {stats['requests']} "
+        f"(every turn into every language: {stats['all_languages_requests']})"
+    )
 
-        print(f"Saved to S3: {txt_url}")
+    if save_to_s3:
+        save_results(
+            results,
+            source_path,
+            storage,
+            legacy_objects=legacy_objects,
+            search_index=_configured_search_index(search_index_path),
+        )
 
-    print(f"Transcript: {transcript}")
     return results
 
 
+def _named_paths(specs):
+    """Parse NAME=PATH arguments into a dict"""
+    paths = {}
+    for spec in specs or []:
+        name, separator, path = spec.partition("=")
+        if not separator or not name or not path:
+            raise ValueError(f"Expected NAME=PATH, got: {spec}")
+        paths[name] = path
+    return paths
+
+
+def _write_metrics(path):
+    """Write the process's metrics in Prometheus format if --metrics-file was given"""
+    if path:
+        get_metrics().write_prometheus(path)
+        print(f"Metrics written to {path}")
+
+
 def main():
     """Main entry point with argument parsing"""
     parser = argparse.ArgumentParser(
         description="Audio transcription and translation service"
     )
-    parser.add_argument("audio_file", help="Path to audio file")
+    parser.add_argument(
+        "audio_file",
+        nargs="?",
+        help="Path to audio file, or a directory, glob pattern or manifest for batch mode",
+    )
     parser.add_argument("--no-s3", action="store_true", help="Skip saving to S3")
     parser.add_argument(
         "--translate",
@@ -132,6 +819,90 @@ def main():
         metavar="LANG",
         help="Translate to specified languages (e.g., --translate es fr de)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        metavar="N",
+        help=f"Maximum concurrent translations (default: {DEFAULT_MAX_WORKERS}, 1 = sequential)",
+    )
+    parser.add_argument(
+        "--cache-path",
+        metavar="PATH",
+        help="SQLite file for a persistent translation cache",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Translate transcript segments as they are finalized (real-time mode)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Batch mode: number of worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default=DEFAULT_CHECKPOINT,
+        metavar="PATH",
+        help=f"Batch mode: checkpoint journal for resuming (default: {DEFAULT_CHECKPOINT})",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        metavar="PATH",
+        help="Write Prometheus-format metrics for the run to this file",
+    )
+    parser.add_argument(
+        "--preprocess",
+        action="store_true",
+        help="Trim silence, downmix and resample WAV input to 16 kHz before transcription",
+    )
+    parser.add_argument(
+        "--speech",
+        action="store_true",
+        help="Synthesize speech for each translation with Amazon Polly (not with --stream)",
+    )
+    parser.add_argument(
+        "--summarize",
+        action="store_true",
+        help="Summarize the transcript with Amazon Bedrock (not with --stream)",
+    )
+    parser.add_argument(
+        "--legacy-objects",
+        action="store_true",
+        help="Also save the transcript, each translation and the JSON results as separate S3 objects",
+    )
+    parser.add_argument(
+        "--index-path",
+        metavar="PATH",
+        help="SQLite index of processed recordings, checked before S3 (default: $RESULT_INDEX_PATH)",
+    )
+    parser.add_argument(
+        "--reprocess",
+        action="store_true",
+        help="Transcribe and translate again even if identical audio was processed before "
+        "(stored as a new run; earlier results are kept)",
+    )
+    parser.add_argument(
+        "--search-index",
+        metavar="PATH",
+        help="Add stored results to this search index (default: $SEARCH_INDEX_PATH; see search_index.py)",
+    )
+    parser.add_argument(
+        "--participants",
+        nargs="+",
+        metavar="NAME=LANG",
+        help="Conversation mode: translate each speaker's turns only into the other "
+        "participants' languages (e.g. --participants doctor=en patient=es). A single audio_file "
+        "needs a transcription service that labels speakers; otherwise use --speaker-audio",
+    )
+    parser.add_argument(
+        "--speaker-audio",
+        nargs="+",
+        metavar="NAME=PATH",
+        help="Conversation mode: one recording per participant instead of a single diarized file",
+    )
     parser.add_argument(
         "--list-languages",
         action="store_true",
@@ -140,17 +911,68 @@ def main():
 
     args = parser.parse_args()
 
-    # List supported languages
+    # List supported languages (a static list: no AWS clients needed)
     if args.list_languages:
+        print("Supported translation languages:")
+        print(", ".join(SUPPORTED_LANGUAGES))
+        return
+    # Before any setting is read from the environment (e.g. RESULT_INDEX_PATH)
+    load_environment()
+    if args.speaker_audio and not args.participants:
+        parser.error("--speaker-audio requires --participants")
+    if not args.audio_file and not args.speaker_audio:
+        parser.error("the following arguments are required: audio_file")
+
+    # Conversation mode: per-turn routing between participants
+    if args.participants:
         try:
-            translator = AWSTranslationService()
-            supported = translator.get_supported_languages()
-            print("Supported translation languages:")
-            print(", ".join(supported["source_languages"]))
-            return
+            recordings = _named_paths(args.speaker_audio)
+            missing = [path for path in [args.audio_file, *recordings.values()] if path and not os.path.exists(path)]
+            if missing:
+                print(f"File not found: {', '.join(missing)}")
+                return
+            process_conversation(
+                None if recordings else args.audio_file,
+                args.participants,
+                recordings=recordings or None,
+                save_to_s3=not args.no_s3,
+                max_workers=args.concurrency,
+                cache=TranslationCache(sqlite_path=args.cache_path) if args.cache_path else None,
+                legacy_objects=args.legacy_objects,
+                search_index_path=args.search_index,
+            )
+            print("Processing complete")
         except Exception as e:
-            print(f"Error retrieving supported languages: {e}")
+            print(f"Error: {e}")
+        _write_metrics(args.metrics_file)
+        return
+
+    # Batch mode: directory, glob or manifest
+    if is_batch_source(args.audio_file):
+        files = collect_audio_files(args.audio_file)
+        if not files:
+            print(f"No audio files found for: {args.audio_file}")
             return
+        if args.cache_path:
+            # Worker processes open the shared on-disk cache themselves
+            os.environ["TRANSLATION_CACHE_PATH"] = args.cache_path
+        run_batch(
+            files,
+            workers=args.workers,
+            checkpoint_path=args.checkpoint,
+            save_to_s3=not args.no_s3,
+            translate_languages=args.translate,
+            max_workers=args.concurrency,
+            synthesize_speech=args.speech,
+            summarize=args.summarize,
+            preprocess=args.preprocess,
+            legacy_objects=args.legacy_objects,
+            reuse_results=not args.reprocess,
+            index_path=args.index_path,
+            search_index_path=args.search_index,
+        )
+        _write_metrics(args.metrics_file)
+        return
 
     # Validate audio file
     if not os.path.exists(args.audio_file):
@@ -158,11 +980,26 @@ def main():
         return
 
     try:
-        results = process_audio_file(
-            args.audio_file,
-            save_to_s3=not args.no_s3,
-            translate_languages=args.translate,
-        )
+        options = {
+            "save_to_s3": not args.no_s3,
+            "translate_languages": args.translate,
+            "max_workers": args.concurrency,
+            "cache": TranslationCache(sqlite_path=args.cache_path) if args.cache_path else None,
+            "preprocess": args.preprocess,
+            "legacy_objects": args.legacy_objects,
+            "search_index_path": args.search_index,
+        }
+        if args.stream:
+            results = process_audio_stream(args.audio_file, **options)
+        else:
+            results = process_audio_file(
+                args.audio_file,
+                synthesize_speech=args.speech,
+                summarize=args.summarize,
+                reuse_results=not args.reprocess,
+                index_path=args.index_path,
+                **options,
+            )
         print("Processing complete")
 
         # Print summary
@@ -174,6 +1011,8 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
 
+    _write_metrics(args.metrics_file)
+
 
 if __name__ == "__main__":
     main()
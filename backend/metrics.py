@@ -0,0 +1,302 @@
+"""
+Pipeline instrumentation: counters and latency histograms for pipeline
+stages and AWS calls, exported as JSON or Prometheus text.
+
+AWS calls are captured through botocore event hooks registered on each
+client (see instrument_client), so every service sharing a client is
+measured without touching call sites.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+    'RequestThrottled',
+    'SlowDown',
+    'ProvisionedThroughputExceededException',
+}
+
+# Operations whose request body is object data
+_UPLOAD_OPERATIONS = {'PutObject', 'UploadPart'}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'p99': round(self.quantile(0.99), 6),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe store of labelled counters and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def time_stage(self, stage: str, language: str = '-') -> Iterator[None]:
+        """
+        Record the wall time of a block as pipeline_stage_seconds{stage=...,language=...}.
+        Every stage carries the language label ('-' when it has none), so the
+        metric keeps one label set.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('pipeline_stage_seconds', time.perf_counter() - start, stage=stage, language=language)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return every metric as JSON-friendly data:
+        {metric: {"label=value,...": number or histogram summary}}
+        """
+        with self._lock:
+            data: Dict[str, Dict[str, Any]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                data.setdefault(name, {})[_label_string(labels)] = value
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                data.setdefault(name, {})[_label_string(labels)] = histogram.to_dict()
+            return data
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{_prometheus_labels(labels)} {_number(value)}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    bucket_labels = labels + (('le', _number(bound)),)
+                    lines.append(f"{name}_bucket{_prometheus_labels(bucket_labels)} {cumulative}")
+                bucket_labels = labels + (('le', '+Inf'),)
+                lines.append(f"{name}_bucket{_prometheus_labels(bucket_labels)} {histogram.count}")
+                lines.append(f"{name}_sum{_prometheus_labels(labels)} {_number(histogram.sum)}")
+                lines.append(f"{name}_count{_prometheus_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the Prometheus text to a file (e.g. for node_exporter's textfile collector)."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            handle.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Return the raw counters and histogram buckets and reset the registry,
+        e.g. to ship a worker process's metrics to its parent (see merge).
+        """
+        with self._lock:
+            state = {
+                'counters': list(self._counters.items()),
+                'histograms': [
+                    (key, histogram.buckets, histogram.counts, histogram.count, histogram.sum)
+                    for key, histogram in self._histograms.items()
+                ],
+            }
+            self._counters = {}
+            self._histograms = {}
+        return state
+
+    def merge(self, state: Dict[str, Any]) -> None:
+        """Add metrics drained from another registry into this one."""
+        with self._lock:
+            for key, value in state['counters']:
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, buckets, counts, count, total in state['histograms']:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.counts = [mine + theirs for mine, theirs in zip(histogram.counts, counts)]
+                histogram.count += count
+                histogram.sum += total
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def delta(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Difference of two snapshots, e.g. the AWS calls made during one run.
+    Histogram entries keep only count and sum (quantiles do not subtract).
+    """
+    result: Dict[str, Dict[str, Any]] = {}
+    for name, series in after.items():
+        for labels, value in series.items():
+            previous = before.get(name, {}).get(labels)
+            if isinstance(value, dict):
+                count = value['count'] - (previous['count'] if previous else 0)
+                if count:
+                    total = value['sum'] - (previous['sum'] if previous else 0.0)
+                    result.setdefault(name, {})[labels] = {'count': count, 'sum': round(total, 6)}
+            else:
+                change = value - (previous or 0)
+                if change:
+                    result.setdefault(name, {})[labels] = change
+    return result
+
+
+def instrument_client(client, registry: Optional[MetricsRegistry] = None):
+    """
+    Register botocore event hooks that record, per service and operation:
+    aws_calls_total, aws_call_seconds, aws_errors_total, aws_throttles_total,
+    aws_retries_total and (for S3 uploads) aws_bytes_uploaded_total.
+
+    Returns:
+        The same client, for chaining
+    """
+    registry = registry or get_metrics()
+    service = client.meta.service_model.service_name
+    events = client.meta.events
+
+    def before_call(model, context, **kwargs):
+        context['metrics_start'] = time.perf_counter()
+
+    def after_call(http_response, parsed, model, context, **kwargs):
+        labels = {'service': service, 'operation': model.name}
+        start = context.get('metrics_start')
+        if start is not None:
+            registry.observe('aws_call_seconds', time.perf_counter() - start, **labels)
+        registry.inc('aws_calls_total', **labels)
+
+        retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        if retries:
+            registry.inc('aws_retries_total', retries, **labels)
+
+        error_code = parsed.get('Error', {}).get('Code')
+        if error_code:
+            registry.inc('aws_errors_total', code=error_code, **labels)
+            if error_code in THROTTLING_ERROR_CODES:
+                registry.inc('aws_throttles_total', **labels)
+
+    def after_call_error(exception, model, context, **kwargs):
+        labels = {'service': service, 'operation': model.name}
+        registry.inc('aws_calls_total', **labels)
+        registry.inc('aws_errors_total', code=type(exception).__name__, **labels)
+
+    def needs_retry(response, event_name, **kwargs):
+        # Counts throttled attempts that botocore retries internally
+        if response is None:
+            return None
+        parsed = response[1] if isinstance(response, tuple) else {}
+        error_code = (parsed or {}).get('Error', {}).get('Code')
+        if error_code in THROTTLING_ERROR_CODES:
+            operation = event_name.rsplit('.', 1)[-1]
+            registry.inc('aws_throttled_attempts_total', service=service, operation=operation)
+        return None
+
+    def before_send(request, event_name, **kwargs):
+        operation = event_name.rsplit('.', 1)[-1]
+        if operation in _UPLOAD_OPERATIONS:
+            length = request.headers.get('Content-Length')
+            if length:
+                registry.inc('aws_bytes_uploaded_total', int(length), service=service, operation=operation)
+
+    events.register('before-call', before_call)
+    events.register('after-call', after_call)
+    events.register('after-call-error', after_call_error)
+    events.register_first('needs-retry', needs_retry)
+    events.register('before-send', before_send)
+    return client
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _label_string(labels: Labels) -> str:
+    return ','.join(f"{key}={value}" for key, value in labels)
+
+
+def _prometheus_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        '{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _metrics
@@ -0,0 +1,417 @@
+"""
+Process-wide adaptive rate limiting for AWS calls.
+
+Every (service, operation) pair gets a token bucket, a retry policy and a
+circuit breaker, shared by all threads in the process:
+
+- The bucket starts at the operation's quota and adapts to throttling with
+  AIMD: each throttle cuts the rate multiplicatively, each success adds a
+  little back, so sustained throughput settles just under the real limit.
+- Throttles, 5xx responses and connection errors are retried with full-jitter
+  exponential backoff.
+- After too many consecutive failures the breaker opens and calls fail fast
+  with CircuitOpenError until a trial call succeeds.
+
+Quotas can be changed without code through the environment:
+
+    AWS_RATE_LIMITS=translate.TranslateText=50,bedrock-runtime.InvokeModel=inf
+    AWS_RATE_LIMITS=off            # no pacing at all (retries and breakers stay)
+    AWS_RATE_LIMIT_SHARE=0.25      # fraction of every quota this process may use
+"""
+
+import logging
+import math
+import os
+import random
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import THROTTLING_ERROR_CODES, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Default per-account quotas in requests per second (us-east-1)
+DEFAULT_RATES = {
+    ('translate', 'TranslateText'): 20.0,
+    ('comprehend', 'DetectDominantLanguage'): 20.0,
+    ('comprehend', 'BatchDetectDominantLanguage'): 10.0,
+    ('polly', 'SynthesizeSpeech'): 8.0,
+    ('bedrock-runtime', 'InvokeModel'): 4.0,
+    ('s3', 'PutObject'): 3500.0,
+    ('s3', 'GetObject'): 5500.0,
+    ('s3', 'DeleteObjects'): 3500.0,
+}
+DEFAULT_RATE = 50.0
+
+# S3 clients keep botocore's retries, which retry multipart transfers part by
+# part; retrying the whole transfer here as well would multiply the attempts
+DEFAULT_OPERATION_SETTINGS = {
+    ('s3', 'PutObject'): {'max_attempts': 1},
+    ('s3', 'GetObject'): {'max_attempts': 1},
+    ('s3', 'DeleteObjects'): {'max_attempts': 1},
+}
+
+DEFAULT_SETTINGS = {
+    'min_rate': 0.5,
+    'decrease_factor': 0.7,
+    'increase_fraction': 0.02,
+    'max_attempts': 6,
+    'base_delay': 0.1,
+    'max_delay': 5.0,
+    'failure_threshold': 10,
+    'reset_timeout': 30.0,
+}
+
+
+@lru_cache(maxsize=None)
+def _botocore_errors() -> Tuple[type, Tuple[type, ...]]:
+    """ClientError and the connection errors worth retrying; botocore is imported on first use."""
+    from botocore.exceptions import ClientError, ConnectionClosedError, EndpointConnectionError, ReadTimeoutError
+    return ClientError, (EndpointConnectionError, ConnectionClosedError, ReadTimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling AWS while a circuit breaker is open."""
+
+
+def is_throttle(error: BaseException) -> bool:
+    client_error, _ = _botocore_errors()
+    return isinstance(error, client_error) and error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Throttles, 5xx responses and dropped connections are worth retrying."""
+    client_error, connection_errors = _botocore_errors()
+    if isinstance(error, connection_errors):
+        return True
+    if not isinstance(error, client_error):
+        return False
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return is_throttle(error) or status >= 500
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose refill rate can change at runtime.
+
+    Callers reserve a token and sleep until it is due, so waiting threads
+    are served in arrival order without busy-waiting.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Take tokens, sleeping until they are available. Returns the seconds waited."""
+        if math.isinf(self.rate):
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def set_rate(self, rate: float) -> None:
+        if math.isinf(rate) and math.isinf(self.rate):
+            return
+        with self._lock:
+            now = time.monotonic()
+            if math.isinf(self.rate):
+                self._tokens = max(1.0, rate)
+            else:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; in half-open state only one trial call at a time."""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened (or re-opened) the circuit."""
+        with self._lock:
+            self.failures += 1
+            trial = self._trial_running
+            self._trial_running = False
+            if trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class AdaptiveRateLimiter:
+    """Token bucket, retry policy and circuit breaker for one AWS operation."""
+
+    def __init__(self, service: str, operation: str, max_rate: float, **settings: Any):
+        self.service = service
+        self.operation = operation
+        self.max_rate = max_rate
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self.bucket = TokenBucket(max_rate)
+        self.breaker = CircuitBreaker(self.settings['failure_threshold'], self.settings['reset_timeout'])
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call func(*args, **kwargs) under the rate limit, retrying retryable errors.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            The last error once retries are exhausted, or any non-retryable error at once
+        """
+        return self.call_weighted(1, func, *args, **kwargs)
+
+    def call_weighted(self, weight: float, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Like call(), for a call that makes weight requests (e.g. the parts of a multipart upload).
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            The last error once retries are exhausted, or any non-retryable error at once
+        """
+        metrics = get_metrics()
+        labels = {'service': self.service, 'operation': self.operation}
+        max_attempts = self.settings['max_attempts']
+
+        for attempt in range(max_attempts):
+            if not self.breaker.allow():
+                metrics.inc('rate_limit_rejected_total', **labels)
+                raise CircuitOpenError(f"Circuit open for {self.service}.{self.operation}; "
+                                       f"retry in {self.settings['reset_timeout']:g}s")
+
+            waited = self.bucket.acquire(weight)
+            if waited:
+                metrics.observe('rate_limit_wait_seconds', waited, **labels)
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The service answered; a bad request says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self._on_failure(e, labels)
+                if attempt + 1 == max_attempts:
+                    raise
+                delay = self._backoff(attempt)
+                metrics.inc('rate_limit_retries_total', **labels)
+                logger.warning(f"{self.service}.{self.operation} failed ({_error_code(e)}), "
+                               f"retrying in {delay:.2f}s (attempt {attempt + 2}/{max_attempts})")
+                time.sleep(delay)
+            else:
+                self._on_success()
+                return result
+
+    def _on_success(self) -> None:
+        self.breaker.record_success()
+        with self._lock:
+            rate = self.bucket.rate
+            if rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, rate + self.max_rate * self.settings['increase_fraction']))
+
+    def _on_failure(self, error: BaseException, labels: Dict[str, str]) -> None:
+        metrics = get_metrics()
+        if is_throttle(error):
+            metrics.inc('rate_limit_throttles_total', **labels)
+            with self._lock:
+                rate = max(self.settings['min_rate'], self.bucket.rate * self.settings['decrease_factor'])
+                self.bucket.set_rate(rate)
+            logger.info(f"Throttled on {self.service}.{self.operation}; rate now {rate:.2f}/s")
+        if self.breaker.record_failure():
+            metrics.inc('rate_limit_circuit_opened_total', **labels)
+            logger.error(f"Circuit opened for {self.service}.{self.operation} after "
+                         f"{self.breaker.failures} consecutive failures")
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, min(max_delay, base * 2^attempt)]
+        ceiling = min(self.settings['max_delay'], self.settings['base_delay'] * 2 ** attempt)
+        return self._random.uniform(0, ceiling)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'rate': round(self.bucket.rate, 3),
+            'max_rate': self.max_rate,
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+        }
+
+
+class RateLimiterRegistry:
+    """Lazily created limiters keyed by (service, operation)."""
+
+    def __init__(self, share: float = 1.0, pacing: bool = True, environ: Optional[Dict[str, str]] = None,
+                 **settings: Any):
+        """
+        Args:
+            share (float): Fraction of each quota this process may use
+                (e.g. 1/N for each of N batch worker processes)
+            pacing (bool): Pace calls to the quotas; False keeps only retries and breakers
+                (e.g. against the in-process fakes, which have no quotas)
+            environ (dict, optional): Environment read for AWS_RATE_LIMITS and
+                AWS_RATE_LIMIT_SHARE on first use (default: os.environ)
+            **settings: Overrides for DEFAULT_SETTINGS
+        """
+        self.share = share
+        self.pacing = pacing
+        self.settings = settings
+        self.rates: Dict[Tuple[str, str], float] = dict(DEFAULT_RATES)
+        self._environ = environ
+        self._environment_applied = False
+        self._limiters: Dict[Tuple[str, str], AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, service: str, operation: str) -> AdaptiveRateLimiter:
+        key = (service, operation)
+        limiter = self._limiters.get(key)
+        if limiter is not None:
+            return limiter
+        with self._lock:
+            self._apply_environment()
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                max_rate = self.rates.get(key, DEFAULT_RATE) * self.share if self.pacing else math.inf
+                settings = dict(DEFAULT_OPERATION_SETTINGS.get(key, {}), **self.settings)
+                limiter = self._limiters[key] = AdaptiveRateLimiter(service, operation, max_rate, **settings)
+            return limiter
+
+    def call(self, service: str, operation: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Shorthand for get(service, operation).call(func, *args, **kwargs)."""
+        return self.get(service, operation).call(func, *args, **kwargs)
+
+    def configure(self, share: Optional[float] = None, rates: Optional[Dict[Tuple[str, str], float]] = None,
+                  pacing: Optional[bool] = None, **settings: Any) -> None:
+        """Change quotas or settings, overriding the environment; existing limiters are dropped."""
+        with self._lock:
+            self._apply_environment()
+            if share is not None:
+                self.share = share
+            if rates:
+                self.rates.update(rates)
+            if pacing is not None:
+                self.pacing = pacing
+            self.settings.update(settings)
+            self._limiters.clear()
+
+    def _apply_environment(self) -> None:
+        # Read on first use rather than at import, so .env has been loaded by then
+        if self._environment_applied:
+            return
+        self._environment_applied = True
+        environ = os.environ if self._environ is None else self._environ
+        spec = environ.get('AWS_RATE_LIMITS', '').strip()
+        if spec.lower() == 'off':
+            self.pacing = False
+        elif spec:
+            self.rates.update(parse_rates(spec))
+        if environ.get('AWS_RATE_LIMIT_SHARE'):
+            self.share = float(environ['AWS_RATE_LIMIT_SHARE'])
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{service}.{operation}": limiter.stats()
+                for (service, operation), limiter in sorted(self._limiters.items())}
+
+    def reset(self) -> None:
+        """Forget every limiter (e.g. after fork)."""
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+
+def parse_rates(spec: str) -> Dict[Tuple[str, str], float]:
+    """
+    Parse 'service.Operation=rate,...' (rate in requests per second; 'inf' for unlimited).
+
+    Raises:
+        ValueError: For a malformed entry
+    """
+    rates = {}
+    for entry in spec.split(','):
+        if not entry.strip():
+            continue
+        name, separator, rate = entry.partition('=')
+        service, dot, operation = name.strip().rpartition('.')
+        if not separator or not dot or not service or not operation:
+            raise ValueError(f"Expected service.Operation=rate, got: {entry.strip()}")
+        value = float(rate)
+        if not value > 0:
+            raise ValueError(f"Rate must be positive: {entry.strip()}")
+        rates[(service, operation)] = value
+    return rates
+
+
+def _error_code(error: BaseException) -> str:
+    client_error, _ = _botocore_errors()
+    if isinstance(error, client_error):
+        return error.response.get('Error', {}).get('Code', 'ClientError')
+    return type(error).__name__
+
+
+_registry = RateLimiterRegistry()
+
+# Bucket locks held by another thread at fork time would deadlock the child
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_registry.reset)
+
+
+def get_rate_limiters() -> RateLimiterRegistry:
+    """Return the process-wide rate limiter registry."""
+    return _registry
+
+
+def call_with_limits(service: str, operation: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call an AWS operation through the process-wide limiter for (service, operation)."""
+    return _registry.call(service, operation, func, *args, **kwargs)
+
+
+def call_with_limits_weighted(service: str, operation: str, weight: float, func: Callable[..., Any],
+                              *args: Any, **kwargs: Any) -> Any:
+    """call_with_limits for a call that makes weight requests against the quota."""
+    return _registry.get(service, operation).call_weighted(weight, func, *args, **kwargs)
@@ -0,0 +1,210 @@
+"""
+Compact single-object result bundle.
+
+A bundle replaces the per-run transcript .txt, one .txt per translation and
+the pretty-printed JSON with one object, stored with Content-Encoding: gzip.
+
+Layout: a sequence of independent gzip members, which is itself a valid gzip
+stream.
+
+    member 0   header: compact JSON + "\\n" listing every section
+    member 1.. one per section: the transcript, each translation, and the
+               remaining results (metadata etc.) as compact JSON
+
+Each header entry gives the section's name, its compressed offset (counted
+from the end of the header member) and compressed length, and its
+uncompressed size. A client can read the header with a small ranged GET,
+then fetch and gunzip just the section it needs, e.g. one language. A full
+GET that honours Content-Encoding yields the header line followed by the
+sections in order, which the sizes delimit.
+"""
+
+import gzip
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+BUNDLE_FORMAT = 'htc-bundle'
+BUNDLE_VERSION = 1
+BUNDLE_EXTENSION = '.bundle'
+CONTENT_TYPE = 'application/octet-stream'
+CONTENT_ENCODING = 'gzip'
+
+TRANSCRIPT_SECTION = 'transcript'
+RESULTS_SECTION = 'results'
+TRANSLATION_PREFIX = 'translation:'
+
+# First ranged read when opening a bundle; enough for the header of dozens of languages
+HEADER_PROBE_BYTES = 4096
+
+_COMPACT = {'separators': (',', ':'), 'ensure_ascii': False, 'default': str}
+
+
+class BundleFormatError(ValueError):
+    """Raised for data that is not a readable result bundle."""
+
+
+def translation_section(language: str) -> str:
+    return f"{TRANSLATION_PREFIX}{language}"
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps bundles byte-identical for identical results
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def build_bundle(results: Dict[str, Any]) -> bytes:
+    """
+    Encode pipeline results as a bundle.
+
+    Args:
+        results (dict): Results with 'transcript', 'translations' and any other keys
+
+    Returns:
+        bytes: Bundle data, to be stored with Content-Encoding: gzip
+    """
+    sections: List[Tuple[str, str, bytes]] = [
+        (TRANSCRIPT_SECTION, 'text/plain', results.get('transcript', '').encode('utf-8'))
+    ]
+    for language, text in results.get('translations', {}).items():
+        sections.append((translation_section(language), 'text/plain', text.encode('utf-8')))
+    rest = {key: value for key, value in results.items() if key not in ('transcript', 'translations')}
+    sections.append((RESULTS_SECTION, 'application/json', json.dumps(rest, **_COMPACT).encode('utf-8')))
+
+    entries = []
+    members = []
+    offset = 0
+    for name, content_type, data in sections:
+        member = _gzip(data)
+        entries.append({'name': name, 'type': content_type, 'offset': offset,
+                        'length': len(member), 'size': len(data)})
+        members.append(member)
+        offset += len(member)
+
+    header = {'format': BUNDLE_FORMAT, 'version': BUNDLE_VERSION, 'sections': entries}
+    header_member = _gzip(json.dumps(header, **_COMPACT).encode('utf-8') + b'\n')
+    return header_member + b''.join(members)
+
+
+def parse_header(data: bytes) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+    Decode the header member from the start of a bundle.
+
+    Args:
+        data (bytes): The first bytes of the bundle (may be the whole bundle)
+
+    Returns:
+        (header, data_start) where data_start is the absolute offset of the
+        first section, or None if data ends before the header does
+
+    Raises:
+        BundleFormatError: If data is not a bundle
+    """
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    try:
+        text = decompressor.decompress(data)
+    except zlib.error as e:
+        raise BundleFormatError(f"Not a result bundle: {e}")
+    if not decompressor.eof:
+        return None
+
+    try:
+        header = json.loads(text)
+    except ValueError as e:
+        raise BundleFormatError(f"Corrupt bundle header: {e}")
+    if not isinstance(header, dict) or header.get('format') != BUNDLE_FORMAT:
+        raise BundleFormatError("Not a result bundle")
+    if header.get('version', 0) > BUNDLE_VERSION:
+        raise BundleFormatError(f"Unsupported bundle version: {header.get('version')}")
+    return header, len(data) - len(decompressor.unused_data)
+
+
+def _section_entry(header: Dict[str, Any], name: str) -> Dict[str, Any]:
+    for entry in header['sections']:
+        if entry['name'] == name:
+            return entry
+    raise KeyError(f"Bundle has no section '{name}'")
+
+
+def _decode_section(entry: Dict[str, Any], member: bytes) -> Any:
+    data = gzip.decompress(member)
+    if entry['type'] == 'application/json':
+        return json.loads(data)
+    return data.decode('utf-8')
+
+
+def read_bundle(data: bytes) -> Dict[str, Any]:
+    """Decode a whole bundle back into a results dict."""
+    parsed = parse_header(data)
+    if parsed is None:
+        raise BundleFormatError("Truncated bundle header")
+    header, start = parsed
+
+    results: Dict[str, Any] = {}
+    translations: Dict[str, str] = {}
+    for entry in header['sections']:
+        begin = start + entry['offset']
+        value = _decode_section(entry, data[begin:begin + entry['length']])
+        if entry['name'] == TRANSCRIPT_SECTION:
+            results['transcript'] = value
+        elif entry['name'] == RESULTS_SECTION:
+            results.update(value)
+        elif entry['name'].startswith(TRANSLATION_PREFIX):
+            translations[entry['name'][len(TRANSLATION_PREFIX):]] = value
+    results['translations'] = translations
+    return results
+
+
+class BundleReader:
+    """
+    Read sections of a stored bundle with ranged GETs.
+
+    Opening costs one small GET for the header; each section is one more GET
+    of just its compressed bytes.
+    """
+
+    def __init__(self, storage, s3_key: str):
+        """
+        Args:
+            storage (S3Storage): Storage holding the bundle
+            s3_key (str): Bundle object key
+        """
+        self.storage = storage
+        self.s3_key = s3_key
+        self._header: Optional[Dict[str, Any]] = None
+        self._data_start = 0
+
+    @property
+    def header(self) -> Dict[str, Any]:
+        if self._header is None:
+            probe = HEADER_PROBE_BYTES
+            while True:
+                data = self.storage.get_object_range(self.s3_key, 0, probe - 1)
+                parsed = parse_header(data)
+                if parsed is not None:
+                    break
+                if len(data) < probe:
+                    raise BundleFormatError(f"Truncated bundle header: {self.s3_key}")
+                probe *= 4
+            self._header, self._data_start = parsed
+        return self._header
+
+    def sections(self) -> List[str]:
+        return [entry['name'] for entry in self.header['sections']]
+
+    def languages(self) -> List[str]:
+        return [name[len(TRANSLATION_PREFIX):] for name in self.sections()
+                if name.startswith(TRANSLATION_PREFIX)]
+
+    def read_section(self, name: str) -> Any:
+        """Fetch and decode one section: str for text, parsed data for JSON."""
+        entry = _section_entry(self.header, name)
+        start = self._data_start + entry['offset']
+        member = self.storage.get_object_range(self.s3_key, start, start + entry['length'] - 1)
+        return _decode_section(entry, member)
+
+    def transcript(self) -> str:
+        return self.read_section(TRANSCRIPT_SECTION)
+
+    def translation(self, language: str) -> str:
+        return self.read_section(translation_section(language))
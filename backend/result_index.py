@@ -0,0 +1,179 @@
+"""
+Content-hash index of processed recordings.
+
+Recordings are identified by the SHA-256 of their bytes, so a retried upload
+or a copy under another name maps to the results already produced for it.
+Two index implementations share one interface (lookup / record):
+
+- LocalResultIndex keeps transcripts and translations in a SQLite file.
+- S3ResultIndex treats the content-addressed result bundle in S3 as the
+  index entry, so no extra objects are written. A lookup reads the bundle
+  header, transcript and results sections with ranged GETs; translations
+  are fetched one by one when used.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+from result_bundle import BUNDLE_EXTENSION, RESULTS_SECTION, BundleFormatError, BundleReader
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Hex SHA-256 of a file, read in fixed-size chunks into one reused buffer."""
+    digest = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as handle:
+        while True:
+            count = handle.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+    return digest.hexdigest()
+
+
+def bundle_key(content_hash: str) -> str:
+    """Content-addressed key of a recording's result bundle."""
+    return f"transcripts/{content_hash}{BUNDLE_EXTENSION}"
+
+
+def _entry(results: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'transcript': results['transcript'],
+        'translations': dict(results.get('translations', {})),
+        'detected_language': results.get('detected_language'),
+    }
+
+
+class LocalResultIndex:
+    """
+    SQLite-backed index from content hash to transcript and translations.
+    Safe to share between threads and, through WAL mode, between processes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite file, created if missing
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'content_hash TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)'
+        )
+        self._db.commit()
+
+    def lookup(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            Dict with 'transcript', 'translations' and 'detected_language', or None
+        """
+        with self._lock:
+            row = self._db.execute('SELECT value FROM results WHERE content_hash = ?',
+                                   (content_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, content_hash: str, results: Dict[str, Any]) -> None:
+        """Store results, keeping translations recorded by earlier runs."""
+        entry = _entry(results)
+        with self._lock:
+            row = self._db.execute('SELECT value FROM results WHERE content_hash = ?',
+                                   (content_hash,)).fetchone()
+            if row:
+                entry['translations'] = dict(json.loads(row[0])['translations'], **entry['translations'])
+            self._db.execute(
+                'INSERT OR REPLACE INTO results (content_hash, value, updated) VALUES (?, ?, ?)',
+                (content_hash, json.dumps(entry, separators=(',', ':'), ensure_ascii=False), time.time())
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class _BundleTranslations(Mapping):
+    """Translations of a stored bundle, each fetched with a ranged GET on first access."""
+
+    def __init__(self, reader: BundleReader):
+        self._reader = reader
+        self._languages = reader.languages()
+        self._texts: Dict[str, str] = {}
+
+    def __getitem__(self, language: str) -> str:
+        if language not in self._languages:
+            raise KeyError(language)
+        if language not in self._texts:
+            self._texts[language] = self._reader.translation(language)
+        return self._texts[language]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._languages)
+
+    def __len__(self) -> int:
+        return len(self._languages)
+
+
+class S3ResultIndex:
+    """
+    Index backed by the result bundles themselves: a recording is known when
+    transcripts/<sha256>.bundle exists.
+    """
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage (S3Storage): Storage holding the result bundles
+        """
+        self.storage = storage
+
+    def lookup(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            Dict with 'transcript', 'translations', 'detected_language' and
+            'results' (the bundle's whole results section), or None
+        """
+        from botocore.exceptions import ClientError
+
+        reader = BundleReader(self.storage, bundle_key(content_hash))
+        try:
+            transcript = reader.transcript()
+            results = reader.read_section(RESULTS_SECTION)
+            translations = _BundleTranslations(reader)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code in ('NoSuchKey', '404', 'NoSuchBucket'):
+                return None
+            if code in ('AccessDenied', '403'):
+                # S3 answers 403 for a missing key when the caller may not list the bucket
+                logger.warning(f"Access denied reading the bundle for {content_hash}; treating it as new")
+                return None
+            raise
+        except (BundleFormatError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable bundle for {content_hash}: {e}")
+            return None
+        return {
+            'transcript': transcript,
+            'translations': translations,
+            'detected_language': results.get('detected_language'),
+            'results': results,
+            'stored': True,
+        }
+
+    def record(self, content_hash: str, results: Dict[str, Any]) -> None:
+        """Nothing to do: the bundle uploaded by the pipeline is the index entry."""
@@ -3,56 +3,171 @@
 S3 file storage utility
 """
 
-import boto3
+import io
 import json
+import math
 import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from dotenv import load_dotenv
+from aws_clients import get_client
+from rate_limit import call_with_limits, call_with_limits_weighted
 from botocore.exceptions import ClientError
 
-load_dotenv('.env')
+# Connections kept open to S3; upload_many never runs more workers than this
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+
+# Multipart transfer defaults: parts of 8 MB, 10 in flight at once
+MB = 1024 * 1024
+DEFAULT_MULTIPART_THRESHOLD = 8 * MB
+DEFAULT_MULTIPART_CHUNKSIZE = 8 * MB
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_READ_CHUNK_SIZE = 1 * MB
+
+# ListObjectsV2 and DeleteObjects both cap out at 1,000 keys per request
+LIST_PAGE_SIZE = 1000
+DELETE_BATCH_SIZE = 1000
+DEFAULT_DELETE_WORKERS = 8
+
+
+class _MemoryViewReader(io.RawIOBase):
+    """Seekable read-only file object over a buffer, without copying it"""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast('B')
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        remaining = len(self._view) - self._position
+        count = min(len(target), remaining)
+        target[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+
+    def tell(self):
+        return self._position
 
 
 class S3Storage:
-    def __init__(self, bucket_name=None):
-        self.s3_client = boto3.client('s3')
+    def __init__(
+        self,
+        bucket_name=None,
+        max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+        multipart_threshold=DEFAULT_MULTIPART_THRESHOLD,
+        multipart_chunksize=DEFAULT_MULTIPART_CHUNKSIZE,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        s3_client=None,
+    ):
+        from boto3.s3.transfer import TransferConfig
+
+        # Shared client from the process-wide registry unless one is injected
+        self.s3_client = s3_client or get_client('s3', max_pool_connections=max_pool_connections)
         self.bucket_name = bucket_name or f"storage-{int(datetime.now().timestamp())}"
+        self.max_pool_connections = max_pool_connections
+        self._bucket_ready = False
+        self._bucket_lock = threading.Lock()
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+        )
 
     def create_bucket(self):
-        """Create S3 bucket if it doesn't exist"""
-        try:
-            self.s3_client.head_bucket(Bucket=self.bucket_name)
-        except ClientError:
+        """Create S3 bucket if it doesn't exist (checked once per instance)"""
+        if self._bucket_ready:
+            return
+
+        with self._bucket_lock:
+            if self._bucket_ready:
+                return
             try:
-                self.s3_client.create_bucket(Bucket=self.bucket_name)
+                self.s3_client.head_bucket(Bucket=self.bucket_name)
             except ClientError:
-                # If bucket name taken, use timestamped version
-                timestamp = int(datetime.now().timestamp())
-                self.bucket_name = f"storage-{timestamp}"
-                self.s3_client.create_bucket(Bucket=self.bucket_name)
+                try:
+                    self.s3_client.create_bucket(Bucket=self.bucket_name)
+                except ClientError:
+                    # If bucket name taken, use timestamped version
+                    timestamp = int(datetime.now().timestamp())
+                    self.bucket_name = f"storage-{timestamp}"
+                    self.s3_client.create_bucket(Bucket=self.bucket_name)
+            self._bucket_ready = True
+
+    def upload_file(self, source, s3_key=None, content_type=None, content_encoding=None):
+        """
+        Upload a file to S3, using multipart uploads for large content
 
-    def upload_file(self, local_file_path, s3_key=None):
-        """Upload a file to S3"""
-        if not os.path.exists(local_file_path):
-            raise FileNotFoundError(f"Local file not found: {local_file_path}")
+        Args:
+            source: Local path, binary file-like object, or bytes/bytearray/memoryview.
+                File objects and buffers are streamed without temp files.
+            s3_key (str): Object key (defaults to the file name for paths)
+            content_type (str): Optional Content-Type for the object
+            content_encoding (str): Optional Content-Encoding (e.g. 'gzip')
+        """
+        extra_args = {}
+        if content_type:
+            extra_args['ContentType'] = content_type
+        if content_encoding:
+            extra_args['ContentEncoding'] = content_encoding
+        extra_args = extra_args or None
 
-        if not s3_key:
-            s3_key = os.path.basename(local_file_path)
+        if isinstance(source, (str, os.PathLike)):
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Local file not found: {source}")
+            if not s3_key:
+                s3_key = os.path.basename(source)
+        elif not s3_key:
+            raise ValueError("s3_key is required when uploading a file object or buffer")
 
         self.create_bucket()
 
         try:
-            self.s3_client.upload_file(
-                local_file_path, self.bucket_name, s3_key)
+            if isinstance(source, (str, os.PathLike)):
+                call_with_limits_weighted(
+                    's3', 'PutObject', self._request_count(os.path.getsize(source)), self.s3_client.upload_file,
+                    os.fspath(source), self.bucket_name, s3_key,
+                    ExtraArgs=extra_args, Config=self.transfer_config)
+            elif isinstance(source, (bytes, bytearray, memoryview)):
+                # A fresh reader per attempt so retries resend from the start
+                call_with_limits_weighted(
+                    's3', 'PutObject', self._request_count(memoryview(source).nbytes),
+                    lambda: self.s3_client.upload_fileobj(
+                        _MemoryViewReader(source), self.bucket_name, s3_key,
+                        ExtraArgs=extra_args, Config=self.transfer_config))
+            else:
+                # Arbitrary streams cannot be replayed, so they are not retried here
+                self.s3_client.upload_fileobj(
+                    source, self.bucket_name, s3_key,
+                    ExtraArgs=extra_args, Config=self.transfer_config)
             return f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
         except ClientError as e:
             raise Exception(f"Upload failed: {e}")
 
+    def _request_count(self, size):
+        """PUT requests an upload of size bytes makes: one, or create + parts + complete when multipart"""
+        if size < self.transfer_config.multipart_threshold:
+            return 1
+        return math.ceil(size / self.transfer_config.multipart_chunksize) + 2
+
     def upload_text(self, text_content, s3_key):
         """Upload text content to S3"""
         self.create_bucket()
 
-        self.s3_client.put_object(
+        call_with_limits(
+            's3', 'PutObject', self.s3_client.put_object,
             Bucket=self.bucket_name,
             Key=s3_key,
             Body=text_content.encode('utf-8'),
@@ -65,9 +180,10 @@ class S3Storage:
         """Upload JSON data to S3"""
         self.create_bucket()
 
-        json_content = json.dumps(data, indent=2)
+        json_content = json.dumps(data, separators=(',', ':'))
 
-        self.s3_client.put_object(
+        call_with_limits(
+            's3', 'PutObject', self.s3_client.put_object,
             Bucket=self.bucket_name,
             Key=s3_key,
             Body=json_content.encode('utf-8'),
@@ -76,20 +192,112 @@ class S3Storage:
 
         return f"https://{self.bucket_name}.s3.amazonaws.com/{s3_key}"
 
+    def upload_many(self, items, max_workers=None):
+        """
+        Upload a batch of objects concurrently over the shared connection pool
+
+        Args:
+            items (list): Dicts with a 'key' and exactly one of 'text' (str),
+                'json' (JSON-serialisable data) or 'file' (anything upload_file accepts,
+                with optional 'content_type' and 'content_encoding')
+            max_workers (int): Concurrent uploads (default: connection pool size)
+
+        Returns:
+            list: Object URLs in the same order as items
+        """
+        if not items:
+            return []
+
+        self.create_bucket()
+
+        def upload(item):
+            if 'text' in item:
+                return self.upload_text(item['text'], item['key'])
+            if 'json' in item:
+                return self.upload_json(item['json'], item['key'])
+            if 'file' in item:
+                return self.upload_file(item['file'], item['key'],
+                                        item.get('content_type'), item.get('content_encoding'))
+            raise ValueError(f"Upload item for {item.get('key')} needs 'text', 'json' or 'file'")
+
+        workers = min(max_workers or self.max_pool_connections, self.max_pool_connections, len(items))
+        if workers <= 1:
+            return [upload(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-upload') as executor:
+            return list(executor.map(upload, items))
+
     def get_object(self, s3_key):
         """Retrieve content from S3"""
         try:
-            response = self.s3_client.get_object(
+            response = call_with_limits(
+                's3', 'GetObject', self.s3_client.get_object,
                 Bucket=self.bucket_name, Key=s3_key)
             return response['Body'].read().decode('utf-8')
         except ClientError:
             return None
 
-    def list_objects(self):
-        """List all objects in the bucket"""
+    def get_object_range(self, s3_key, start, end=None):
+        """
+        Fetch raw bytes start..end (inclusive) of an object with a ranged GET
+
+        end=None reads to the end of the object. Stored bytes are returned
+        as-is, even for objects with a Content-Encoding.
+        """
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = call_with_limits('s3', 'GetObject', self.s3_client.get_object,
+                                    Bucket=self.bucket_name, Key=s3_key, Range=byte_range)
+        return response['Body'].read()
+
+    def iter_object(self, s3_key, chunk_size=DEFAULT_READ_CHUNK_SIZE):
+        """
+        Stream an object's raw bytes in chunks of at most chunk_size
+
+        Suitable for binary content such as audio; memory use stays bounded
+        by the chunk size regardless of the object size.
+        """
+        response = call_with_limits('s3', 'GetObject', self.s3_client.get_object,
+                                    Bucket=self.bucket_name, Key=s3_key)
+        body = response['Body']
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    def download_fileobj(self, s3_key, fileobj):
+        """Download an object into a binary file object using parallel ranged GETs"""
+        self.s3_client.download_fileobj(
+            self.bucket_name, s3_key, fileobj, Config=self.transfer_config)
+
+    def download_file(self, s3_key, local_file_path):
+        """Download an object to a local path using parallel ranged GETs"""
+        self.s3_client.download_file(
+            self.bucket_name, s3_key, local_file_path, Config=self.transfer_config)
+
+    def iter_objects(self, prefix=None, page_size=LIST_PAGE_SIZE):
+        """
+        Lazily iterate over every object in the bucket, following pagination
+
+        Args:
+            prefix (str): Only yield keys starting with this prefix
+            page_size (int): Keys requested per ListObjectsV2 call (max 1000)
+
+        Yields:
+            dict: Object summaries as returned by ListObjectsV2
+        """
+        params = {'Bucket': self.bucket_name, 'PaginationConfig': {'PageSize': page_size}}
+        if prefix:
+            params['Prefix'] = prefix
+
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**params):
+            yield from page.get('Contents', [])
+
+    def list_objects(self, prefix=None):
+        """List all objects in the bucket (optionally under a prefix)"""
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            return response.get('Contents', [])
+            return list(self.iter_objects(prefix))
         except Exception:
             return []
 
@@ -97,12 +305,60 @@ class S3Storage:
         """Delete an object from S3"""
         self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
 
+    def delete_objects(self, keys, max_workers=DEFAULT_DELETE_WORKERS):
+        """
+        Delete many objects with DeleteObjects, 1,000 keys per request, concurrently
+
+        keys may be any iterable (e.g. a generator over iter_objects); it is
+        consumed lazily so only a few batches are held in memory at once.
+
+        Returns:
+            int: Number of objects deleted
+        """
+        deleted = 0
+        errors = []
+
+        def delete_batch(batch):
+            response = call_with_limits(
+                's3', 'DeleteObjects', self.s3_client.delete_objects,
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True},
+            )
+            return len(batch) - len(response.get('Errors', [])), response.get('Errors', [])
+
+        def collect(future):
+            nonlocal deleted
+            count, batch_errors = future.result()
+            deleted += count
+            errors.extend(batch_errors)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='s3-delete') as executor:
+            in_flight = set()
+            batch = []
+            for key in keys:
+                batch.append(key)
+                if len(batch) == DELETE_BATCH_SIZE:
+                    in_flight.add(executor.submit(delete_batch, batch))
+                    batch = []
+                    # Bound memory: wait for a slot before reading more keys
+                    if len(in_flight) >= max_workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+            if batch:
+                in_flight.add(executor.submit(delete_batch, batch))
+            for future in in_flight:
+                collect(future)
+
+        if errors:
+            sample = ', '.join(f"{e.get('Key')} ({e.get('Code')})" for e in errors[:5])
+            raise Exception(f"Failed to delete {len(errors)} objects: {sample}")
+        return deleted
+
     def delete_bucket(self):
         """Delete the entire bucket and all its contents"""
-        # Delete all objects first
-        objects = self.list_objects()
-        for obj in objects:
-            self.delete_object(obj['Key'])
+        # Delete all objects first, streaming keys from the listing into batched deletes
+        self.delete_objects(obj['Key'] for obj in self.iter_objects())
 
         # Delete bucket
         self.s3_client.delete_bucket(Bucket=self.bucket_name)
@@ -0,0 +1,519 @@
+"""
+Full-text search over stored transcripts and translations.
+
+An inverted index kept in a local SQLite file: every document (the
+transcript or one translation of a stored result) is analyzed with its
+language's analyzer, and each term maps to the documents containing it with
+the positions where it occurs. Positions are stored as delta-encoded varints,
+which keeps postings compact and makes phrase queries exact.
+
+The index is maintained incrementally: process_audio_file adds each result
+as it is stored, and build_from_storage indexes only the S3 objects under
+transcripts/ and translations/ that changed since the last build. Each run is
+indexed from one source: its result bundle, else its legacy JSON results,
+else its legacy .txt objects.
+
+Query syntax: words and "quoted phrases", all of which must match. Hits are
+ranked with BM25.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from language_detection import LocalLanguageDetector
+from result_bundle import (
+    BUNDLE_EXTENSION,
+    TRANSCRIPT_SECTION,
+    read_bundle,
+    translation_section,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIXES = ('transcripts/', 'translations/')
+DEFAULT_FETCH_WORKERS = 8
+DEFAULT_LIMIT = 20
+UNKNOWN_LANGUAGE = 'und'
+# Source version of objects indexed as they were stored; the next build adopts
+# the listed version instead of downloading them again
+INDEXED_VERSION = 'indexed'
+# Preferred source of a run's documents, best first
+_SOURCE_RANKS = {BUNDLE_EXTENSION: 0, '.json': 1, '.txt': 2}
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r'\w+')
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+# Han and kana, written without spaces, are indexed one character per token
+_UNSPACED = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_UNSPACED_SPLIT = re.compile(f'[{_UNSPACED}]|[^{_UNSPACED}]+')
+
+UNSPACED_LANGUAGES = {'zh', 'ja'}
+# Languages where accents are dropped so "medicación" matches "medicacion"
+ACCENT_FOLDED_LANGUAGES = {
+    'en', 'es', 'fr', 'de', 'it', 'pt', 'nl', 'sv', 'da', 'no', 'fi', 'pl', 'ro', 'tr', 'cy', 'is', 'ca',
+}
+# Languages whose regular plurals end in -s, folded onto the singular
+PLURAL_S_LANGUAGES = {'en', 'es', 'fr', 'pt', 'it', 'ca'}
+
+
+class Analyzer:
+    """Turns text into index terms: Unicode normalisation, case folding and per-language folding."""
+
+    def __init__(self, fold_accents: bool = False, split_characters: bool = False, fold_plurals: bool = False):
+        """
+        Args:
+            fold_accents (bool): Strip combining marks after decomposition
+            split_characters (bool): Emit each character of unspaced scripts as its own token
+            fold_plurals (bool): Drop a trailing plural -s from longer words
+        """
+        self.fold_accents = fold_accents
+        self.split_characters = split_characters
+        self.fold_plurals = fold_plurals
+
+    def _normalize(self, text: str) -> str:
+        text = unicodedata.normalize('NFKC', text).casefold()
+        if self.fold_accents:
+            decomposed = unicodedata.normalize('NFD', text)
+            text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        return text
+
+    def _fold(self, token: str) -> str:
+        if self.fold_plurals and len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            return token[:-1]
+        return token
+
+    def tokens(self, text: str) -> List[str]:
+        """Terms of text in order; a term's index in the list is its position."""
+        terms = []
+        for word in _WORD.findall(self._normalize(text)):
+            if self.split_characters:
+                terms.extend(self._fold(part) for part in _UNSPACED_SPLIT.findall(word))
+            else:
+                terms.append(self._fold(word))
+        return terms
+
+
+def get_analyzer(language: Optional[str]) -> Analyzer:
+    """Analyzer for a language code such as 'es' or 'zh-TW'."""
+    base = (language or UNKNOWN_LANGUAGE).split('-')[0].lower()
+    return Analyzer(
+        fold_accents=base in ACCENT_FOLDED_LANGUAGES,
+        # Unknown text may be in any script, so it gets the script-aware tokenizer too
+        split_characters=base in UNSPACED_LANGUAGES or base == UNKNOWN_LANGUAGE,
+        fold_plurals=base in PLURAL_S_LANGUAGES,
+    )
+
+
+def encode_positions(positions: Sequence[int]) -> bytes:
+    """Ascending positions as delta-encoded unsigned LEB128 varints."""
+    out = bytearray()
+    previous = 0
+    for position in positions:
+        delta = position - previous
+        previous = position
+        while delta >= 0x80:
+            out.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_positions(data: bytes) -> List[int]:
+    positions = []
+    value = shift = position = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        position += value
+        positions.append(position)
+        value = shift = 0
+    return positions
+
+
+def parse_query(query: str) -> List[str]:
+    """Split a query into clauses: each quoted phrase or bare word is one clause."""
+    clauses = []
+    for phrase, word in _QUERY_PART.findall(query):
+        clause = (phrase or word).strip()
+        if clause:
+            clauses.append(clause)
+    return clauses
+
+
+def documents_from_results(results: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """(section, language, text) for the transcript and each translation of a results dict."""
+    # Older streamed results stored the detector's raw dict (language_code)
+    detected = results.get('detected_language') or {}
+    language = detected.get('code') or detected.get('language_code') or UNKNOWN_LANGUAGE
+    documents = [(TRANSCRIPT_SECTION, language, results.get('transcript', ''))]
+    for language, text in results.get('translations', {}).items():
+        documents.append((translation_section(language), language, text))
+    return documents
+
+
+def _run_source(key: str) -> Optional[Tuple[str, int]]:
+    """(run name, source rank) of a stored object, or None if it is not indexable."""
+    directory, _, filename = key.rpartition('/')
+    name, extension = os.path.splitext(filename)
+    if extension not in _SOURCE_RANKS:
+        return None
+    if directory == 'translations' and extension == '.txt':
+        # translations/<name>_<lang>.txt
+        return f"transcripts/{name.rpartition('_')[0]}", _SOURCE_RANKS[extension]
+    return f"{directory}/{name}", _SOURCE_RANKS[extension]
+
+
+def _preferred_sources(keys: Iterable[str]) -> List[str]:
+    """Keys of the best available source of each run, so no run is indexed twice."""
+    sources = {key: _run_source(key) for key in keys}
+    best: Dict[str, int] = {}
+    for source in sources.values():
+        if source is not None:
+            name, rank = source
+            best[name] = min(rank, best.get(name, rank))
+    return [key for key, source in sources.items() if source is not None and best[source[0]] == source[1]]
+
+
+@dataclass
+class SearchHit:
+    """One matching document."""
+    key: str
+    section: str
+    language: str
+    score: float
+    matches: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'key': self.key, 'section': self.section, 'language': self.language,
+                'score': round(self.score, 4), 'matches': self.matches}
+
+
+class SearchIndex:
+    """
+    Positional inverted index in SQLite.
+    Safe to share between threads and, through WAL mode, between processes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): SQLite file, created if missing
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS documents ('
+            ' doc INTEGER PRIMARY KEY, key TEXT NOT NULL, section TEXT NOT NULL,'
+            ' language TEXT NOT NULL, length INTEGER NOT NULL, digest TEXT NOT NULL,'
+            ' UNIQUE (key, section));'
+            # Clustered on (language, term): one posting list is one contiguous range
+            'CREATE TABLE IF NOT EXISTS postings ('
+            ' language TEXT NOT NULL, term TEXT NOT NULL, doc INTEGER NOT NULL, positions BLOB NOT NULL,'
+            ' PRIMARY KEY (language, term, doc)) WITHOUT ROWID;'
+            'CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);'
+            'CREATE TABLE IF NOT EXISTS sources (key TEXT PRIMARY KEY, version TEXT NOT NULL);'
+        )
+        self._db.commit()
+
+    def _delete_document(self, doc: int) -> None:
+        self._db.execute('DELETE FROM postings WHERE doc = ?', (doc,))
+        self._db.execute('DELETE FROM documents WHERE doc = ?', (doc,))
+
+    def _add_document(self, key: str, section: str, language: str, text: str) -> bool:
+        digest = hashlib.sha256(f'{language}\n{text}'.encode('utf-8')).hexdigest()
+        row = self._db.execute('SELECT doc, digest FROM documents WHERE key = ? AND section = ?',
+                               (key, section)).fetchone()
+        if row and row[1] == digest:
+            return False
+        if row:
+            self._delete_document(row[0])
+
+        terms = get_analyzer(language).tokens(text)
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for position, term in enumerate(terms):
+            positions[term].append(position)
+        doc = self._db.execute(
+            'INSERT INTO documents (key, section, language, length, digest) VALUES (?, ?, ?, ?, ?)',
+            (key, section, language, len(terms), digest)
+        ).lastrowid
+        self._db.executemany(
+            'INSERT INTO postings (language, term, doc, positions) VALUES (?, ?, ?, ?)',
+            ((language, term, doc, encode_positions(term_positions)) for term, term_positions in positions.items())
+        )
+        return True
+
+    def _replace_key(self, key: str, documents: Iterable[Tuple[str, str, str]]) -> int:
+        """Make the documents of key exactly documents; returns how many were (re)indexed."""
+        documents = list(documents)
+        sections = {section for section, _, _ in documents}
+        for doc, section in self._db.execute('SELECT doc, section FROM documents WHERE key = ?', (key,)).fetchall():
+            if section not in sections:
+                self._delete_document(doc)
+        return sum(self._add_document(key, section, language, text) for section, language, text in documents)
+
+    def add_document(self, key: str, section: str, language: str, text: str) -> bool:
+        """
+        Index one document, replacing any earlier version with the same key and section.
+
+        Returns:
+            bool: False if the same text was already indexed
+        """
+        with self._lock, self._db:
+            return self._add_document(key, section, language, text)
+
+    def add_results(self, key: str, results: Dict[str, Any]) -> int:
+        """
+        Index the transcript and translations of results stored under key.
+        The key is recorded as a source, so build_from_storage neither downloads
+        it again nor keeps its documents once the object is deleted.
+
+        Returns:
+            int: Documents added or updated
+        """
+        with self._lock, self._db:
+            indexed = self._replace_key(key, documents_from_results(results))
+            self._db.execute('INSERT OR REPLACE INTO sources (key, version) VALUES (?, ?)',
+                             (key, INDEXED_VERSION))
+            return indexed
+
+    def remove(self, key: str) -> None:
+        """Drop every document of key."""
+        with self._lock, self._db:
+            self._replace_key(key, [])
+            self._db.execute('DELETE FROM sources WHERE key = ?', (key,))
+
+    @staticmethod
+    def _fetch(storage, key: str) -> Optional[List[Tuple[str, str, str]]]:
+        """Documents of one stored object, or None if it is not indexable."""
+        if key.endswith(BUNDLE_EXTENSION):
+            return documents_from_results(read_bundle(storage.get_object_range(key, 0)))
+        if not key.endswith(('.txt', '.json')):
+            return None
+        text = storage.get_object(key)
+        if text is None:
+            return None
+        if key.endswith('.json'):
+            return documents_from_results(json.loads(text))
+        if key.startswith('translations/'):
+            # translations/<name>_<lang>.txt
+            language = os.path.splitext(os.path.basename(key))[0].rpartition('_')[2]
+            return [(translation_section(language), language, text)]
+        # A bare transcript carries no language; use the local detector when it is sure
+        detected = LocalLanguageDetector().detect(text)
+        return [(TRANSCRIPT_SECTION, detected['language_code'] if detected else UNKNOWN_LANGUAGE, text)]
+
+    def build_from_storage(self, storage, prefixes: Sequence[str] = DEFAULT_PREFIXES,
+                           max_workers: int = DEFAULT_FETCH_WORKERS) -> Dict[str, int]:
+        """
+        Bring the index up to date with the objects under prefixes.
+
+        Only new or changed objects are downloaded (compared by ETag, or size
+        and modification time); documents of deleted objects are removed.
+        A run stored both as a bundle and as legacy objects is indexed from
+        the bundle only.
+
+        Args:
+            storage (S3Storage): Storage holding the results
+            prefixes (list): Key prefixes to index
+            max_workers (int): Concurrent downloads
+
+        Returns:
+            dict: Counts of 'listed', 'fetched', 'indexed' and 'removed'
+        """
+        with self._lock:
+            known = dict(self._db.execute('SELECT key, version FROM sources').fetchall())
+
+        listed = {}
+        for prefix in prefixes:
+            for obj in storage.iter_objects(prefix):
+                listed[obj['Key']] = obj.get('ETag') or f"{obj.get('Size')}:{obj.get('LastModified')}"
+        count = len(listed)
+        # Objects that duplicate a better source of the same run count as absent
+        listed = {key: listed[key] for key in _preferred_sources(listed)}
+        adopted = [key for key in listed if known.get(key) == INDEXED_VERSION]
+        pending = [key for key, version in listed.items() if known.get(key) not in (version, INDEXED_VERSION)]
+        stale = [key for key in known if key not in listed and key.startswith(tuple(prefixes))]
+
+        if adopted:
+            with self._lock, self._db:
+                self._db.executemany('UPDATE sources SET version = ? WHERE key = ?',
+                                     ((listed[key], key) for key in adopted))
+
+        stats = {'listed': count, 'fetched': 0, 'indexed': 0, 'removed': len(stale)}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='search-index') as executor:
+            fetched = executor.map(lambda key: (key, self._fetch(storage, key)), pending)
+            for key, documents in fetched:
+                stats['fetched'] += 1
+                with self._lock, self._db:
+                    if documents is not None:
+                        stats['indexed'] += self._replace_key(key, documents)
+                    self._db.execute('INSERT OR REPLACE INTO sources (key, version) VALUES (?, ?)',
+                                     (key, listed[key]))
+        for key in stale:
+            self.remove(key)
+
+        logger.info(f"Search index: {stats['fetched']} of {stats['listed']} objects fetched, "
+                    f"{stats['indexed']} documents indexed, {stats['removed']} objects removed")
+        return stats
+
+    def _postings(self, language: str, term: str) -> Dict[int, List[int]]:
+        rows = self._db.execute('SELECT doc, positions FROM postings WHERE language = ? AND term = ?',
+                                (language, term)).fetchall()
+        return {doc: decode_positions(positions) for doc, positions in rows}
+
+    def _clause_matches(self, language: str, terms: List[str],
+                        cache: Dict[str, Dict[int, List[int]]]) -> Dict[int, int]:
+        """Occurrences of a term sequence per document."""
+        lists = []
+        for term in terms:
+            if term not in cache:
+                cache[term] = self._postings(language, term)
+            lists.append(cache[term])
+        if len(lists) == 1:
+            return {doc: len(positions) for doc, positions in lists[0].items()}
+
+        # Phrase: documents with every term, then each start position checked at its offsets
+        docs = set.intersection(*(set(postings) for postings in lists))
+        matches = {}
+        for doc in docs:
+            following = [set(postings[doc]) for postings in lists[1:]]
+            count = sum(1 for start in lists[0][doc]
+                        if all(start + offset in positions for offset, positions in enumerate(following, 1)))
+            if count:
+                matches[doc] = count
+        return matches
+
+    def _search_language(self, language: str, clauses: List[str]) -> List[Tuple[int, float, int]]:
+        analyzer = get_analyzer(language)
+        term_lists = [terms for terms in (analyzer.tokens(clause) for clause in clauses) if terms]
+        if not term_lists:
+            return []
+        total, average_length = self._db.execute(
+            'SELECT COUNT(*), AVG(length) FROM documents WHERE language = ?', (language,)).fetchone()
+        if not total:
+            return []
+
+        cache: Dict[str, Dict[int, List[int]]] = {}
+        clause_matches = []
+        for terms in term_lists:
+            matches = self._clause_matches(language, terms, cache)
+            if not matches:
+                return []
+            clause_matches.append(matches)
+
+        docs = set.intersection(*(set(matches) for matches in clause_matches))
+        if not docs:
+            return []
+        placeholders = ','.join('?' * len(docs))
+        lengths = dict(self._db.execute(
+            f'SELECT doc, length FROM documents WHERE doc IN ({placeholders})', tuple(docs)).fetchall())
+
+        scored = []
+        for doc in docs:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / (average_length or 1))
+            score = 0.0
+            for matches in clause_matches:
+                frequency = matches[doc]
+                idf = math.log(1 + (total - len(matches) + 0.5) / (len(matches) + 0.5))
+                score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            scored.append((doc, score, sum(matches[doc] for matches in clause_matches)))
+        return scored
+
+    def search(self, query: str, language: Optional[str] = None, limit: int = DEFAULT_LIMIT) -> List[SearchHit]:
+        """
+        Find documents matching every word and "quoted phrase" of query.
+
+        Args:
+            query (str): Query text
+            language (str, optional): Only search documents in this language
+            limit (int): Maximum hits returned
+
+        Returns:
+            List of SearchHit, best first
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return []
+        with self._lock:
+            if language:
+                languages = [language]
+            else:
+                languages = [row[0] for row in self._db.execute('SELECT DISTINCT language FROM documents')]
+            scored = []
+            for candidate in languages:
+                scored.extend(self._search_language(candidate, clauses))
+            scored.sort(key=lambda item: item[1], reverse=True)
+            scored = scored[:limit]
+
+            hits = []
+            for doc, score, matches in scored:
+                key, section, doc_language = self._db.execute(
+                    'SELECT key, section, language FROM documents WHERE doc = ?', (doc,)).fetchone()
+                hits.append(SearchHit(key, section, doc_language, score, matches))
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'documents': self._db.execute('SELECT COUNT(*) FROM documents').fetchone()[0],
+                'keys': self._db.execute('SELECT COUNT(DISTINCT key) FROM documents').fetchone()[0],
+                'postings': self._db.execute('SELECT COUNT(*) FROM postings').fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    """Update the index from S3 and run a query"""
+    import argparse
+
+    from aws_clients import load_environment
+    from main import RESULTS_BUCKET
+    from s3_storage import S3Storage
+
+    # .env may set SEARCH_INDEX_PATH, which the argument defaults read
+    load_environment()
+
+    parser = argparse.ArgumentParser(description="Search stored transcripts and translations")
+    parser.add_argument("query", nargs="?", help='Words and "quoted phrases" to find')
+    parser.add_argument("--index-path", default=os.environ.get("SEARCH_INDEX_PATH", "search_index.db"),
+                        help="SQLite index file (default: $SEARCH_INDEX_PATH or search_index.db)")
+    parser.add_argument("--language", help="Only search documents in this language")
+    parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT, help="Maximum hits")
+    parser.add_argument("--no-sync", action="store_true", help="Search without updating from S3 first")
+    parser.add_argument("--bucket", default=RESULTS_BUCKET,
+                        help=f"Bucket holding the stored results (default: {RESULTS_BUCKET})")
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index_path)
+    if not args.no_sync:
+        print(json.dumps(index.build_from_storage(S3Storage(args.bucket))))
+    if args.query:
+        for hit in index.search(args.query, language=args.language, limit=args.limit):
+            print(json.dumps(hit.to_dict(), ensure_ascii=False))
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
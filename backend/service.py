@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Long-running service mode - HTTP job queue in front of process_audio_file
+
+Endpoints:
+    POST /jobs        Submit a job. Either raw audio bytes (Content-Type: audio/*) with
+                      ?translate=es,fr&save_to_s3=false in the query string, or,
+                      when the server was started with --audio-dir, a JSON body
+                      {"audio_file": "...", "translate": ["es"], "save_to_s3": true}
+                      naming a file inside that directory.
+                      Returns 202 with the job ID, or 503 when the queue is full
+                      (checked before the body is read). Content-Length is required.
+    GET  /jobs/<id>   Job status, and the results once finished
+    GET  /health      Queue depth and worker status
+    GET  /metrics     Prometheus-format stage and AWS call metrics
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from aws_clients import load_environment
+from metrics import get_metrics
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_MAX_FINISHED_JOBS = 1000
+MAX_BODY_BYTES = 512 * 1024 * 1024
+MAX_JSON_BODY_BYTES = 16 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+AUDIO_SUFFIXES = {
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/mp4": ".m4a",
+    "audio/x-m4a": ".m4a",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/flac": ".flac",
+    "audio/ogg": ".ogg",
+    "audio/webm": ".webm",
+}
+
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class JobManager:
+    """
+    Bounded job queue drained by a fixed pool of workers
+
+    Jobs run process_func in a thread pool so the event loop stays free to
+    accept submissions and answer status requests.
+    """
+
+    def __init__(
+        self,
+        process_func,
+        workers=DEFAULT_WORKERS,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        max_finished_jobs=DEFAULT_MAX_FINISHED_JOBS,
+    ):
+        self.process_func = process_func
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = OrderedDict()
+        self.running = 0
+        self.reserved = 0
+        self._queue = None
+        self._tasks = []
+        self._executor = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def reserve(self):
+        """
+        Hold a queue slot while a submission's body is received; release() it before submit()
+
+        Raises:
+            QueueFullError: If queued jobs and held slots fill the queue
+        """
+        self._check_capacity()
+        self.reserved += 1
+
+    def release(self):
+        self.reserved -= 1
+
+    def _check_capacity(self):
+        if self._queue.qsize() + self.reserved >= self.queue_size:
+            raise QueueFullError(f"Job queue is full ({self.queue_size} jobs)")
+
+    def submit(self, audio_file, options, cleanup=False):
+        """
+        Queue a job without blocking
+
+        Args:
+            audio_file (str): Path of the audio file to process
+            options (dict): Keyword arguments for process_func
+            cleanup (bool): Delete audio_file once the job finishes (uploaded bodies)
+
+        Returns:
+            dict: The new job record
+
+        Raises:
+            QueueFullError: If the queue is at capacity (backpressure)
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "audio_file": audio_file,
+            "options": options,
+            "submitted_at": time.time(),
+        }
+        self._check_capacity()
+        self._queue.put_nowait((job, cleanup))
+
+        self.jobs[job["id"]] = job
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "receiving": self.reserved,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+        }
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, cleanup = await self._queue.get()
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            self.running += 1
+            try:
+                call = functools.partial(self.process_func, job["audio_file"], **job["options"])
+                job["result"] = await loop.run_in_executor(self._executor, call)
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+            finally:
+                self.running -= 1
+                job["finished_at"] = time.time()
+                if cleanup:
+                    try:
+                        os.remove(job["audio_file"])
+                    except OSError:
+                        pass
+                self._queue.task_done()
+                self._forget_old_jobs()
+
+    def _forget_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+
+class JobServer:
+    """
+    Minimal asyncio HTTP/1.1 front end for a JobManager
+
+    JSON submissions may only name files inside audio_dir; without one,
+    clients must upload the audio bytes.
+    """
+
+    def __init__(self, manager, upload_dir=None, audio_dir=None):
+        self.manager = manager
+        self.upload_dir = upload_dir or tempfile.gettempdir()
+        self.audio_dir = os.path.realpath(audio_dir) if audio_dir else None
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start the workers and listen; port 0 picks a free port (see self.port)"""
+        await self.manager.start()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.manager.stop()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        headers = {}
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            status, body, extra_headers = await self._route(method, target, headers, reader)
+        except HTTPError as e:
+            status, body, extra_headers = e.status, {"error": e.message}, {}
+        except ValueError:
+            status, body, extra_headers = 400, {"error": "Malformed request"}, {}
+        except Exception as e:
+            status, body, extra_headers = 500, {"error": str(e)}, {}
+
+        if isinstance(body, str):
+            payload = body.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            payload = json.dumps(body, default=str).encode("utf-8")
+            content_type = "application/json"
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(payload)}",
+            "Connection: close",
+        ]
+        head.extend(f"{name}: {value}" for name, value in extra_headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, headers, reader):
+        url = urlsplit(target)
+        path = url.path.rstrip("/")
+
+        if path == "/health":
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, dict(self.manager.stats(), status="ok"), {}
+
+        if path == "/metrics":
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, self._metrics_text(), {}
+
+        if path == "/jobs":
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            return await self._submit(url, headers, reader)
+
+        if path.startswith("/jobs/"):
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            job = self.manager.get(path[len("/jobs/"):])
+            if job is None:
+                raise HTTPError(404, "Unknown job")
+            return 200, job, {}
+
+        raise HTTPError(404, "Not found")
+
+    def _metrics_text(self):
+        stats = self.manager.stats()
+        metrics = get_metrics()
+        lines = [
+            "# TYPE service_jobs_queued gauge",
+            f"service_jobs_queued {stats['queued']}",
+            "# TYPE service_jobs_running gauge",
+            f"service_jobs_running {stats['running']}",
+        ]
+        return "\n".join(lines) + "\n" + metrics.to_prometheus()
+
+    async def _submit(self, url, headers, reader):
+        if "content-length" not in headers:
+            raise HTTPError(411, "Content-Length is required")
+        length = int(headers["content-length"])
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Body exceeds {MAX_BODY_BYTES} bytes")
+
+        # Refuse before reading the body, so a full queue costs no upload
+        try:
+            self.manager.reserve()
+        except QueueFullError as e:
+            return 503, {"error": str(e)}, {"Retry-After": "5"}
+        try:
+            audio_file, options, cleanup = await self._read_submission(url, headers, reader, length)
+        finally:
+            self.manager.release()
+
+        # No await since release(), so the held slot is still free
+        job = self.manager.submit(audio_file, options, cleanup=cleanup)
+        return 202, {"id": job["id"], "status": job["status"]}, {"Location": f"/jobs/{job['id']}"}
+
+    async def _read_submission(self, url, headers, reader, length):
+        """Read an upload or JSON body; returns (audio_file, options, cleanup)"""
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+
+        if content_type.startswith("audio/"):
+            if not length:
+                raise HTTPError(400, "Audio body is empty")
+            query = parse_qs(url.query)
+            options = {
+                "translate_languages": _split_languages(query.get("translate", [""])[0]),
+                "save_to_s3": query.get("save_to_s3", ["true"])[0].lower() != "false",
+            }
+            return await self._receive_upload(reader, length, content_type), options, True
+
+        if length > MAX_JSON_BODY_BYTES:
+            raise HTTPError(413, f"JSON body exceeds {MAX_JSON_BODY_BYTES} bytes")
+        try:
+            request = json.loads(await reader.readexactly(length) if length else b"{}")
+        except json.JSONDecodeError:
+            raise HTTPError(400, "Body must be JSON or audio")
+        if not isinstance(request, dict):
+            raise HTTPError(400, "JSON body must be an object")
+        audio_file = self._allowed_path(request.get("audio_file"))
+        translate = request.get("translate")
+        options = {
+            "translate_languages": _split_languages(translate) if isinstance(translate, str) else translate,
+            "save_to_s3": bool(request.get("save_to_s3", True)),
+        }
+        return audio_file, options, False
+
+    def _allowed_path(self, audio_file):
+        """Resolve a submitted path, which must be an existing file inside audio_dir"""
+        if self.audio_dir is None:
+            raise HTTPError(403, "audio_file paths are disabled; upload the audio as the request body")
+        if not isinstance(audio_file, str) or not audio_file:
+            raise HTTPError(400, "audio_file is required")
+        # realpath resolves .. and symlinks, so the prefix check cannot be escaped
+        path = os.path.realpath(os.path.join(self.audio_dir, audio_file))
+        if not path.startswith(self.audio_dir + os.sep):
+            raise HTTPError(403, f"audio_file must be inside {self.audio_dir}")
+        if not os.path.isfile(path):
+            raise HTTPError(400, f"File not found: {audio_file}")
+        return path
+
+    async def _receive_upload(self, reader, length, content_type):
+        """Stream the request body to a temp file in fixed-size chunks"""
+        fd, path = tempfile.mkstemp(suffix=AUDIO_SUFFIXES.get(content_type, ".audio"), dir=self.upload_dir)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(READ_CHUNK_BYTES, remaining))
+                    if not chunk:
+                        raise HTTPError(400, "Request body ended early")
+                    handle.write(chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+
+def _split_languages(value):
+    languages = [code.strip() for code in (value or "").split(",") if code.strip()]
+    return languages or None
+
+
+async def run_service(host, port, workers, queue_size, process_func=None, audio_dir=None):
+    if process_func is None:
+        from main import process_audio_file
+
+        process_func = process_audio_file
+
+    server = JobServer(JobManager(process_func, workers=workers, queue_size=queue_size), audio_dir=audio_dir)
+    await server.start(host, port)
+    print(f"Serving on http://{host}:{server.port} with {workers} workers (queue size {queue_size})")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    """Service entry point with argument parsing"""
+    parser = argparse.ArgumentParser(description="Audio processing job service")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Jobs processed concurrently (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Queued jobs before new submissions get 503 (default: {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--audio-dir",
+        help="Allow JSON submissions to name audio files inside this directory (default: uploads only)",
+    )
+    args = parser.parse_args()
+    # Jobs read settings such as RESULT_INDEX_PATH from the environment
+    load_environment()
+
+    try:
+        asyncio.run(run_service(args.host, args.port, args.workers, args.queue_size, audio_dir=args.audio_dir))
+    except KeyboardInterrupt:
+        print("Service stopped")
+
+
+if __name__ == "__main__":
+    main()
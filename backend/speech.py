@@ -0,0 +1,454 @@
+"""
+Speech synthesis of translated text with Amazon Polly.
+
+Text is split into sentences (longer ones into pieces under Polly's
+per-request limit). Each piece is synthesized once per (text, voice,
+language) and kept in a content-addressed on-disk cache, so recurring
+phrases such as dosage instructions are never sent to Polly twice.
+The pieces of one text are synthesized concurrently and streamed, in order,
+into a single S3 object, so the full audio is never held in memory. Audio
+reaches the reader as Polly returns it, while it is written to the cache.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from aws_clients import get_client
+from chunking import chunk_text, split_sentences
+from rate_limit import call_with_limits
+
+logger = logging.getLogger(__name__)
+
+# SynthesizeSpeech accepts at most 3,000 billed characters of plain text
+POLLY_MAX_CHARS = 3000
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+STREAM_BUFFER_SIZE = 1024 * 1024
+# Chunks of one piece buffered ahead of the reader (bounds memory per piece in flight)
+PIECE_BUFFER_CHUNKS = 16
+
+CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'ogg_vorbis': 'audio/ogg',
+    'pcm': 'audio/pcm',
+}
+FILE_EXTENSIONS = {'mp3': 'mp3', 'ogg_vorbis': 'ogg', 'pcm': 'pcm'}
+
+# Default voice per target language: (VoiceId, Engine, LanguageCode for bilingual voices)
+DEFAULT_VOICES: Dict[str, Tuple[str, str, Optional[str]]] = {
+    'en': ('Joanna', 'neural', None),
+    'es': ('Lupe', 'neural', None),
+    'fr': ('Lea', 'neural', None),
+    'de': ('Vicki', 'neural', None),
+    'it': ('Bianca', 'neural', None),
+    'pt': ('Camila', 'neural', None),
+    'nl': ('Laura', 'neural', None),
+    'pl': ('Ola', 'neural', None),
+    'sv': ('Elin', 'neural', None),
+    'da': ('Sofie', 'neural', None),
+    'fi': ('Suvi', 'neural', None),
+    'no': ('Ida', 'neural', None),
+    'tr': ('Burcu', 'neural', None),
+    'ar': ('Hala', 'neural', 'ar-AE'),
+    'hi': ('Kajal', 'neural', 'hi-IN'),
+    'zh': ('Zhiyu', 'neural', None),
+    'ja': ('Takumi', 'neural', None),
+    'ko': ('Seoyeon', 'neural', None),
+    'ru': ('Tatyana', 'standard', None),
+    'ro': ('Carmen', 'standard', None),
+    'cy': ('Gwyneth', 'standard', None),
+    'is': ('Dora', 'standard', None),
+}
+
+
+class SpeechCache:
+    """
+    Content-addressed directory of synthesized audio pieces.
+
+    Files are written to a temporary name and renamed into place, so
+    concurrent writers and readers never see partial audio.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        """
+        Args:
+            directory (str, optional): Cache directory (default: $SPEECH_CACHE_DIR
+                or speech_cache in the system temp directory)
+            max_bytes (int): Size above which the least recently used files are removed
+        """
+        self.directory = directory or os.environ.get('SPEECH_CACHE_DIR') or \
+            os.path.join(tempfile.gettempdir(), 'speech_cache')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0}
+        # Size of the cache as last measured plus what this process wrote since;
+        # None until first measured. Other processes' writes are picked up by trim().
+        self._bytes: Optional[int] = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(text: str, voice: str, language: str, engine: str = 'neural',
+                 output_format: str = 'mp3') -> str:
+        """Stable key for one piece of audio."""
+        payload = json.dumps([text, voice, language, engine, output_format], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Path of the cached audio for key, or None."""
+        path = self.path(key)
+        try:
+            # Refresh the modification time so trim() evicts least recently used first
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._counters['misses'] += 1
+            return None
+        with self._lock:
+            self._counters['hits'] += 1
+        return path
+
+    def put_stream(self, key: str, chunks: Iterable[bytes]) -> str:
+        """Write a stream of audio chunks under key; returns the final path."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            written = 0
+            with open(temp_path, 'wb') as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+                    written += len(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes += written
+        return path
+
+    def trim_if_full(self) -> int:
+        """Trim only when the tracked size exceeds max_bytes; returns files removed."""
+        with self._lock:
+            size = self._bytes
+        if size is not None and size <= self.max_bytes:
+            return 0
+        return self.trim()
+
+    def trim(self) -> int:
+        """Delete least recently used files until the cache fits max_bytes; returns files removed."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        with self._lock:
+            self._bytes = total
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+
+_default_caches: Dict[str, SpeechCache] = {}
+_default_caches_lock = threading.Lock()
+
+
+def get_default_speech_cache(directory: Optional[str] = None) -> SpeechCache:
+    """
+    Return the process-wide cache for a directory, created on first use.
+
+    Synthesizers share it, so the cache size measured by the first trim is
+    tracked across runs instead of re-walking the directory every time.
+
+    Args:
+        directory (str, optional): Cache directory (default: as for SpeechCache)
+    """
+    directory = directory or os.environ.get('SPEECH_CACHE_DIR') or \
+        os.path.join(tempfile.gettempdir(), 'speech_cache')
+    with _default_caches_lock:
+        cache = _default_caches.get(directory)
+        if cache is None:
+            cache = _default_caches[directory] = SpeechCache(directory)
+        return cache
+
+
+class _PieceSink:
+    """
+    Hands the audio chunks of one piece to the reader while they are synthesized.
+
+    The producer finishes with None. A reader that received no chunks (a cache
+    hit, or a repeated piece) reads the cached file instead.
+    """
+
+    def __init__(self, closed: threading.Event):
+        self.chunks: 'queue.Queue[Optional[bytes]]' = queue.Queue(maxsize=PIECE_BUFFER_CHUNKS)
+        self._closed = closed
+
+    def put(self, chunk: Optional[bytes]) -> None:
+        # A closed reader stops consuming; give up instead of blocking the worker forever
+        while not self._closed.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+class _ConcatenatedReader(io.RawIOBase):
+    """Read-only stream over the pieces of one text, in order, as they are synthesized."""
+
+    def __init__(self, pieces: List[Tuple[Any, Optional[_PieceSink]]], executor: ThreadPoolExecutor,
+                 closed: threading.Event):
+        self._pieces = iter(pieces)
+        self._executor = executor
+        self._closed = closed
+        self._current = None
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while True:
+            if self._pending:
+                count = min(len(target), len(self._pending))
+                target[:count] = self._pending[:count]
+                self._pending = self._pending[count:]
+                return count
+            if self._current is None:
+                piece = next(self._pieces, None)
+                if piece is None:
+                    return 0
+                self._current = self._open(*piece)
+            if isinstance(self._current, io.IOBase):
+                count = self._current.readinto(target)
+                if count:
+                    return count
+                self._current.close()
+                self._current = None
+                continue
+            self._pending = next(self._current, b'')
+            if not self._pending:
+                self._current = None
+
+    def _open(self, future, sink):
+        """A file for a finished piece, or an iterator over the chunks of one being synthesized."""
+        if sink is None:
+            return open(future.result(), 'rb')
+        chunk = sink.chunks.get()
+        if chunk is None:
+            return open(future.result(), 'rb')
+        return self._follow(future, sink, chunk)
+
+    @staticmethod
+    def _follow(future, sink, chunk):
+        while chunk is not None:
+            yield chunk
+            chunk = sink.chunks.get()
+        # Raises if synthesis failed after some audio was already streamed
+        future.result()
+
+    def close(self):
+        self._closed.set()
+        if isinstance(self._current, io.IOBase):
+            self._current.close()
+        self._current = None
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        super().close()
+
+
+class SpeechSynthesizer:
+    """
+    Parallel, cached text-to-speech with Amazon Polly.
+    """
+
+    def __init__(self, region_name: str = 'us-east-1', cache: Optional[SpeechCache] = None,
+                 voices: Optional[Dict[str, Tuple[str, str, Optional[str]]]] = None,
+                 output_format: str = 'mp3', max_chars: int = POLLY_MAX_CHARS,
+                 max_workers: int = DEFAULT_MAX_WORKERS, polly_client=None):
+        """
+        Args:
+            region_name (str): AWS region name
+            cache (SpeechCache, optional): Audio cache (default: the shared get_default_speech_cache())
+            voices (dict, optional): Overrides for DEFAULT_VOICES
+            output_format (str): 'mp3', 'ogg_vorbis' or 'pcm'
+            max_chars (int): Character budget per SynthesizeSpeech request
+            max_workers (int): Pieces of one text synthesized concurrently
+            polly_client: Optional injected client; by default the shared client from the registry
+        """
+        if output_format not in CONTENT_TYPES:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.cache = cache or get_default_speech_cache()
+        self.voices = dict(DEFAULT_VOICES, **(voices or {}))
+        self.output_format = output_format
+        self.max_chars = min(max_chars, POLLY_MAX_CHARS)
+        self.max_workers = max_workers
+        self.polly_client = polly_client or get_client('polly', region_name)
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.output_format]
+
+    @property
+    def file_extension(self) -> str:
+        return FILE_EXTENSIONS[self.output_format]
+
+    def voice_for(self, language: str) -> Tuple[str, str, Optional[str]]:
+        """Voice, engine and optional language code for a language (e.g. 'es' or 'pt-PT')."""
+        voice = self.voices.get(language) or self.voices.get(language.split('-')[0])
+        if voice is None:
+            raise ValueError(f"No Polly voice configured for language: {language}")
+        return voice
+
+    def split(self, text: str) -> List[str]:
+        """
+        Sentences of text, with any sentence over max_chars split further.
+
+        Sentence granularity keeps recurring phrases cacheable on their own.
+        """
+        pieces = []
+        for sentence in split_sentences(text):
+            if len(sentence.text) <= self.max_chars:
+                pieces.append(sentence.text)
+            else:
+                # A byte budget equal to the character limit can never exceed it
+                pieces.extend(chunk.text for chunk in chunk_text(sentence.text, self.max_chars))
+        return pieces
+
+    def _synthesize_piece(self, text: str, language: str, sink: Optional[_PieceSink] = None) -> str:
+        """
+        Path of the cached audio for one piece, synthesizing it on a cache miss.
+        Synthesized audio is also handed to sink as it arrives.
+        """
+        try:
+            return self._synthesize_into(text, language, sink)
+        finally:
+            if sink is not None:
+                sink.put(None)
+
+    def _synthesize_into(self, text: str, language: str, sink: Optional[_PieceSink]) -> str:
+        voice, engine, language_code = self.voice_for(language)
+        key = SpeechCache.make_key(text, voice, language, engine, self.output_format)
+        path = self.cache.get(key)
+        if path is not None:
+            return path
+
+        params = {
+            'Text': text,
+            'TextType': 'text',
+            'VoiceId': voice,
+            'Engine': engine,
+            'OutputFormat': self.output_format,
+        }
+        if language_code:
+            params['LanguageCode'] = language_code
+        response = call_with_limits('polly', 'SynthesizeSpeech', self.polly_client.synthesize_speech, **params)
+
+        stream = response['AudioStream']
+
+        def chunks():
+            for chunk in stream.iter_chunks(READ_CHUNK_SIZE):
+                if sink is not None:
+                    sink.put(chunk)
+                yield chunk
+
+        try:
+            return self.cache.put_stream(key, chunks())
+        finally:
+            stream.close()
+
+    def stream(self, text: str, language: str) -> io.BufferedReader:
+        """
+        Synthesize text and return a readable stream of the audio.
+
+        Pieces are synthesized concurrently into the cache while the stream is
+        read in order; a piece being synthesized is read as Polly returns it.
+        Close the stream when done.
+        """
+        pieces = self.split(text)
+        if not pieces:
+            raise ValueError("Nothing to synthesize")
+        self.voice_for(language)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pieces))),
+                                      thread_name_prefix='speech')
+        closed = threading.Event()
+        # Identical sentences within one text are synthesized once; repeats read the cached file
+        unique = {}
+        readers = []
+        for piece in pieces:
+            if piece in unique:
+                readers.append((unique[piece], None))
+                continue
+            sink = _PieceSink(closed)
+            unique[piece] = executor.submit(self._synthesize_piece, piece, language, sink)
+            readers.append((unique[piece], sink))
+        logger.info(f"Synthesizing {len(pieces)} pieces ({len(unique)} unique) in {language}")
+        return io.BufferedReader(_ConcatenatedReader(readers, executor, closed), STREAM_BUFFER_SIZE)
+
+    def synthesize_to_s3(self, text: str, language: str, storage, s3_key: str) -> str:
+        """
+        Synthesize text straight into an S3 object.
+
+        Args:
+            text (str): Text to speak
+            language (str): Language code of the text
+            storage (S3Storage): Destination storage
+            s3_key (str): Object key
+
+        Returns:
+            str: Object URL
+        """
+        with self.stream(text, language) as audio:
+            url = storage.upload_file(audio, s3_key, content_type=self.content_type)
+        self.cache.trim_if_full()
+        return url
+
+    def synthesize_to_file(self, text: str, language: str, path: str) -> str:
+        """Synthesize text into a local file; returns the path."""
+        with self.stream(text, language) as audio, open(path, 'wb') as handle:
+            while True:
+                chunk = audio.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                handle.write(chunk)
+        self.cache.trim_if_full()
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - how long the CLI takes before it does any work
+
+Measures, each in fresh interpreters:
+    - the cumulative import time of main, from python -X importtime
+    - wall time of `main.py --list-languages` and `main.py --help` over a bare interpreter
+    - that no heavy dependency (boto3, botocore, dotenv, numpy) is imported by `import main`
+
+Exits with status 1 when a budget is exceeded or a heavy module is imported,
+so it can run as a CI gate.
+
+Examples:
+    python startup_benchmark.py
+    python startup_benchmark.py --runs 20 --import-budget-ms 80 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_BUDGET_MS = 120.0
+COMMAND_BUDGET_MS = 200.0
+HEAVY_MODULES = ("boto3", "botocore", "s3transfer", "dotenv", "numpy")
+COMMANDS = {
+    "list_languages": ["main.py", "--list-languages"],
+    "help": ["main.py", "--help"],
+}
+
+
+def _python(args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=HERE, capture_output=True, text=True, check=True
+    )
+
+
+def import_profile(module):
+    """Cumulative import time of module in microseconds, and every import's (self, cumulative, name)"""
+    stderr = _python(["-X", "importtime", "-c", f"import {module}"]).stderr
+    entries = []
+    total = None
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entry = (int(self_us), int(cumulative_us), name.rstrip())
+        entries.append(entry)
+        # The top-level import is the one with a single space of indentation
+        if entry[2] == f" {module}":
+            total = entry[1]
+    return total, entries
+
+
+def heavy_imports(module):
+    """HEAVY_MODULES present in sys.modules after importing module"""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    output = _python(["-c", code]).stdout.strip()
+    return output.split(",") if output else []
+
+
+def wall_time(args, runs):
+    """Median wall seconds of running the interpreter with args"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _python(args)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    """Startup benchmark entry point with argument parsing"""
+    parser = argparse.ArgumentParser(description="CLI startup time benchmark with enforced budgets")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement")
+    parser.add_argument(
+        "--import-budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Maximum median import time of main"
+    )
+    parser.add_argument(
+        "--command-budget-ms",
+        type=float,
+        default=COMMAND_BUDGET_MS,
+        help="Maximum median wall time of each CLI command over a bare interpreter",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list in the report")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    import_us = []
+    entries = []
+    for _ in range(args.runs):
+        total, entries = import_profile("main")
+        import_us.append(total)
+    import_ms = statistics.median(import_us) / 1000
+
+    baseline = wall_time(["-c", "pass"], args.runs)
+    commands = {
+        name: round((wall_time(command, args.runs) - baseline) * 1000, 2) for name, command in COMMANDS.items()
+    }
+    heavy = heavy_imports("main")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import main took {import_ms:.1f}ms (budget {args.import_budget_ms:g}ms)")
+    for name, elapsed_ms in commands.items():
+        if elapsed_ms > args.command_budget_ms:
+            failures.append(f"{name} took {elapsed_ms:.1f}ms over baseline (budget {args.command_budget_ms:g}ms)")
+    if heavy:
+        failures.append(f"import main loaded {', '.join(heavy)}")
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "import_main_ms": round(import_ms, 2),
+        "interpreter_baseline_ms": round(baseline * 1000, 2),
+        "commands_over_baseline_ms": commands,
+        "heavy_modules_imported": heavy,
+        "slowest_imports": [
+            {"module": name.strip(), "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for self_us, cumulative_us, name in sorted(entries, key=lambda entry: entry[0], reverse=True)[: args.top]
+        ],
+        "budgets_ms": {"import_main": args.import_budget_ms, "command": args.command_budget_ms},
+        "failures": failures,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+    print(
+        f"import main: {import_ms:.1f}ms, "
+        + ", ".join(f"{name}: {elapsed_ms:.1f}ms" for name, elapsed_ms in commands.items()),
+        file=sys.stderr,
+    )
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
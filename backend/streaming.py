@@ -0,0 +1,280 @@
+"""
+Incremental (real-time) pipeline: transcript segments are translated as soon
+as they are finalized instead of after the whole recording ends.
+
+A segment source is any iterable of TranscriptSegment objects. A
+transcription service provides one through a transcribe_stream(path)
+generator. fake_segment_source produces the same stream locally from
+plain text for testing.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from translation import DEFAULT_MAX_WORKERS, source_language_from
+
+logger = logging.getLogger(__name__)
+
+# SourceLanguageCode that makes Translate detect the language itself
+AUTO_SOURCE_LANGUAGE = 'auto'
+
+
+@dataclass
+class TranscriptSegment:
+    """A partial or final piece of a live transcript."""
+    text: str
+    start_time: float = 0.0
+    end_time: float = 0.0
+    is_final: bool = True
+    segment_id: Optional[str] = None
+    speaker: Optional[str] = None
+    received_at: float = field(default_factory=time.monotonic)
+
+
+def segments_from_service(service, audio_file_path: str) -> Iterator[TranscriptSegment]:
+    """
+    Yield transcript segments for a file from a transcription service.
+
+    Services with a transcribe_stream(path) generator are streamed; others
+    fall back to a single final segment holding the full transcript, with
+    no timestamps or speaker label.
+    """
+    if hasattr(service, 'transcribe_stream'):
+        for segment in service.transcribe_stream(audio_file_path):
+            if not isinstance(segment, TranscriptSegment):
+                segment = TranscriptSegment(**segment)
+            yield segment
+    else:
+        yield TranscriptSegment(text=service.transcribe(audio_file_path))
+
+
+def fake_segment_source(text: str, words_per_segment: int = 8, seconds_per_word: float = 0.3,
+                        delay: float = 0.0, partials: bool = True) -> Iterator[TranscriptSegment]:
+    """
+    Replay text as a live transcript: growing partial results, then a final
+    segment every words_per_segment words.
+
+    Args:
+        text (str): Transcript to replay
+        words_per_segment (int): Words per finalized segment
+        seconds_per_word (float): Simulated speech rate for segment timestamps
+        delay (float): Real seconds to sleep per word (0 for instant replay)
+        partials (bool): Emit partial results before each final segment
+    """
+    words = text.split()
+    for index, start in enumerate(range(0, len(words), words_per_segment)):
+        chunk = words[start:start + words_per_segment]
+        segment_id = f"seg-{index}"
+        for count in range(1, len(chunk) + 1):
+            if delay:
+                time.sleep(delay)
+            if partials and count < len(chunk):
+                yield TranscriptSegment(
+                    text=' '.join(chunk[:count]),
+                    start_time=start * seconds_per_word,
+                    end_time=(start + count) * seconds_per_word,
+                    is_final=False,
+                    segment_id=segment_id
+                )
+        yield TranscriptSegment(
+            text=' '.join(chunk),
+            start_time=start * seconds_per_word,
+            end_time=(start + len(chunk)) * seconds_per_word,
+            is_final=True,
+            segment_id=segment_id
+        )
+
+
+class StreamingSession:
+    """
+    Ordered, incrementally built results of a streaming run.
+    """
+
+    def __init__(self, target_languages: List[str]):
+        self.target_languages = list(dict.fromkeys(target_languages or []))
+        self.segments: List[TranscriptSegment] = []
+        self.translations: Dict[str, List[Optional[str]]] = {lang: [] for lang in self.target_languages}
+        self.errors: Dict[str, List[Dict[str, Any]]] = {}
+        self.detected_language: Optional[Dict[str, Any]] = None
+        self.detection_error: Optional[str] = None
+
+    def add_segment(self, segment: TranscriptSegment) -> int:
+        self.segments.append(segment)
+        for lang in self.target_languages:
+            self.translations[lang].append(None)
+        return len(self.segments) - 1
+
+    def set_translation(self, index: int, language: str, text: str) -> None:
+        self.translations[language][index] = text
+
+    def add_error(self, index: int, language: str, error: str) -> None:
+        self.errors.setdefault(language, []).append({'segment': index, 'error': error})
+
+    @property
+    def transcript(self) -> str:
+        return ' '.join(segment.text for segment in self.segments)
+
+    def to_results(self) -> Dict[str, Any]:
+        """
+        Snapshot in the same shape as process_audio_file results, plus per-segment
+        detail, and 'detection_error' when the source language could not be detected.
+        """
+        detected = self.detected_language
+        results = {
+            'transcript': self.transcript,
+            'translations': {
+                lang: ' '.join(text for text in texts if text is not None)
+                for lang, texts in self.translations.items()
+                if any(text is not None for text in texts)
+            },
+            'detected_language': {'code': detected['language_code'], 'confidence': detected['confidence']}
+            if detected else None,
+            'segments': [
+                {
+                    'segment_id': segment.segment_id,
+                    'start_time': segment.start_time,
+                    'end_time': segment.end_time,
+                    'speaker': segment.speaker,
+                    'text': segment.text,
+                    'translations': {
+                        lang: self.translations[lang][index]
+                        for lang in self.target_languages
+                        if self.translations[lang][index] is not None
+                    }
+                }
+                for index, segment in enumerate(self.segments)
+            ],
+            'errors': self.errors,
+        }
+        if self.detection_error is not None:
+            results['detection_error'] = self.detection_error
+        return results
+
+
+def stream_translations(segments: Iterable[TranscriptSegment], translator, target_languages: List[str],
+                        source_language: Optional[str] = None,
+                        max_workers: int = DEFAULT_MAX_WORKERS,
+                        session: Optional[StreamingSession] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Translate finalized segments as they arrive, yielding events in real time.
+
+    The segment source is read on a background thread and translations run
+    on a thread pool, so a slow source never delays delivering a finished
+    translation (and vice versa).
+
+    Events:
+        {'type': 'partial', 'segment': TranscriptSegment}
+        {'type': 'final', 'index': int, 'segment': TranscriptSegment}
+        {'type': 'translation', 'index': int, 'language': str, 'text': str, 'latency': float}
+        {'type': 'error', 'index': int, 'language': str, 'error': str}
+
+    Args:
+        segments: Iterable of TranscriptSegment (e.g. segments_from_service)
+        translator (AWSTranslationService): Translator used for every segment
+        target_languages (List[str]): Languages to translate into
+        source_language (str, optional): Known source language; detected from
+            the first final segment if None and reused for the rest. If detection
+            fails, Translate detects the language of each segment ('auto')
+        max_workers (int): Maximum concurrent segment translations
+        session (StreamingSession, optional): Session to append results to
+    """
+    session = session or StreamingSession(target_languages)
+    events: 'queue.Queue' = queue.Queue()
+
+    def pump():
+        try:
+            for segment in segments:
+                events.put(('segment', segment))
+        except Exception as e:
+            events.put(('source_error', e))
+        else:
+            events.put(('end', None))
+
+    threading.Thread(target=pump, name='segment-source', daemon=True).start()
+
+    pending = 0
+    ended = False
+    with ThreadPoolExecutor(max_workers=max(1, max_workers or 1), thread_name_prefix='stream-translate') as executor:
+        while not (ended and pending == 0):
+            kind, payload = events.get()
+
+            if kind == 'segment':
+                segment = payload
+                if not segment.is_final:
+                    yield {'type': 'partial', 'segment': segment}
+                    continue
+                index = session.add_segment(segment)
+                yield {'type': 'final', 'index': index, 'segment': segment}
+                if not segment.text.strip() or not session.target_languages:
+                    continue
+
+                if source_language is None:
+                    try:
+                        session.detected_language = translator.detect_language(segment.text)
+                        source_language = source_language_from(session.detected_language)
+                    except Exception as e:
+                        # Losing the stream over detection would lose its transcript too
+                        logger.error(f"Language detection failed, letting Translate detect it: {str(e)}")
+                        session.detection_error = str(e)
+                        source_language = AUTO_SOURCE_LANGUAGE
+
+                for lang in session.target_languages:
+                    pending += 1
+                    future = executor.submit(translator.translate_text, segment.text, lang, source_language)
+                    future.add_done_callback(
+                        lambda f, index=index, lang=lang, segment=segment:
+                            events.put(('translation', (index, lang, segment, f)))
+                    )
+
+            elif kind == 'translation':
+                pending -= 1
+                index, lang, segment, future = payload
+                try:
+                    text = future.result()['translated_text']
+                except Exception as e:
+                    logger.error(f"Failed to translate segment {index} to {lang}: {str(e)}")
+                    session.add_error(index, lang, str(e))
+                    yield {'type': 'error', 'index': index, 'language': lang, 'error': str(e)}
+                    continue
+                session.set_translation(index, lang, text)
+                yield {
+                    'type': 'translation',
+                    'index': index,
+                    'language': lang,
+                    'text': text,
+                    'latency': time.monotonic() - segment.received_at
+                }
+
+            elif kind == 'end':
+                ended = True
+
+            elif kind == 'source_error':
+                raise payload
+
+
+def process_segments(segments: Iterable[TranscriptSegment], translator, target_languages: List[str],
+                     on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     **kwargs: Any) -> Dict[str, Any]:
+    """
+    Run stream_translations to completion and return the session results.
+
+    Args:
+        segments: Iterable of TranscriptSegment
+        translator (AWSTranslationService): Translator used for every segment
+        target_languages (List[str]): Languages to translate into
+        on_event (callable, optional): Called with every event as it happens
+        **kwargs: Passed to stream_translations
+
+    Returns:
+        Session results (see StreamingSession.to_results)
+    """
+    session = StreamingSession(target_languages)
+    for event in stream_translations(segments, translator, target_languages, session=session, **kwargs):
+        if on_event is not None:
+            on_event(event)
+    return session.to_results()
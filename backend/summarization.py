@@ -0,0 +1,179 @@
+"""
+Map-reduce summarization of long transcripts with Amazon Bedrock.
+
+A consultation can be far longer than one prompt, so the transcript is cut
+into sentence-aligned chunks under a token budget and each chunk is
+summarized in parallel (map). The partial summaries are then grouped under
+the same budget and summarized again, level by level, until one summary
+remains (reduce).
+
+Every model call is cached on a hash of its prompt. Chunks are packed from
+the start of the transcript, so when a session grows only the last chunk
+and the reduce steps above it change; everything else is a cache hit.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from aws_clients import get_client
+from chunking import chunk_text
+from rate_limit import call_with_limits
+from translation_cache import TranslationCache, get_default_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ID = 'anthropic.claude-3-haiku-20240307-v1:0'
+# Rough UTF-8 bytes per token for budgeting without a tokenizer
+BYTES_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 3000
+DEFAULT_SUMMARY_TOKENS = 400
+DEFAULT_MAX_WORKERS = 4
+
+MAP_PROMPT = (
+    "Below is one part of a transcript of a conversation between a patient and a healthcare "
+    "provider. Summarize this part in a few sentences: symptoms, findings, medications "
+    "and dosages, instructions and follow-up. Keep the language of the transcript. Reply with the "
+    "summary only.\n\n<transcript>\n{text}\n</transcript>"
+)
+REDUCE_PROMPT = (
+    "Below are summaries of consecutive parts of a conversation between a patient and a healthcare "
+    "provider. Combine them into one concise summary in the same language, keeping every symptom, "
+    "medication, dosage, instruction and follow-up. Reply with the summary only.\n\n"
+    "<summaries>\n{text}\n</summaries>"
+)
+FINAL_PROMPT = (
+    "Below is a transcript of a conversation between a patient and a healthcare provider. "
+    "Summarize it concisely: symptoms, findings, medications and dosages, instructions and "
+    "follow-up. Keep the language of the transcript. Reply with the summary only.\n\n"
+    "<transcript>\n{text}\n</transcript>"
+)
+
+
+class BedrockModel:
+    """Text completion with an Anthropic model through Bedrock InvokeModel."""
+
+    def __init__(self, model_id: Optional[str] = None, region_name: str = 'us-east-1', bedrock_client=None):
+        """
+        Args:
+            model_id (str, optional): Bedrock model ID (default: $BEDROCK_MODEL_ID or DEFAULT_MODEL_ID)
+            region_name (str): AWS region name
+            bedrock_client: Optional injected client; by default the shared client from the registry
+        """
+        self.model_id = model_id or os.environ.get('BEDROCK_MODEL_ID') or DEFAULT_MODEL_ID
+        self.bedrock_client = bedrock_client or get_client('bedrock-runtime', region_name)
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        body = {
+            'anthropic_version': 'bedrock-2023-05-31',
+            'max_tokens': max_tokens,
+            'temperature': 0,
+            'messages': [{'role': 'user', 'content': prompt}],
+        }
+        response = call_with_limits(
+            'bedrock-runtime', 'InvokeModel', self.bedrock_client.invoke_model,
+            modelId=self.model_id, body=json.dumps(body), contentType='application/json',
+            accept='application/json'
+        )
+        payload = json.loads(response['body'].read())
+        return ''.join(part.get('text', '') for part in payload.get('content', [])).strip()
+
+
+class TranscriptSummarizer:
+    """
+    Hierarchical, cached summaries of transcripts of any length.
+    """
+
+    def __init__(self, model=None, cache: Optional[TranslationCache] = None,
+                 chunk_tokens: int = DEFAULT_CHUNK_TOKENS, summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            model: Object with complete(prompt, max_tokens) -> str (default: BedrockModel())
+            cache (TranslationCache, optional): Cache for model outputs (default: the process-wide cache)
+            chunk_tokens (int): Token budget of the text in one prompt
+            summary_tokens (int): Maximum tokens of each summary
+            max_workers (int): Concurrent model calls
+        """
+        if summary_tokens * 2 > chunk_tokens:
+            raise ValueError("chunk_tokens must fit at least two summaries")
+        self.model = model or BedrockModel()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.chunk_tokens = chunk_tokens
+        self.summary_tokens = summary_tokens
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    def _complete(self, prompt: str, counters: Dict[str, int]) -> str:
+        model_id = getattr(self.model, 'model_id', type(self.model).__name__)
+        key = TranslationCache.make_key(prompt, kind='summary', extra=(model_id, str(self.summary_tokens)))
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                counters['cache_hits'] += 1
+            return cached['summary']
+
+        summary = self.model.complete(prompt, self.summary_tokens)
+        with self._lock:
+            counters['model_calls'] += 1
+        self.cache.set(key, {'summary': summary})
+        return summary
+
+    def _run(self, prompts: List[str], counters: Dict[str, int]) -> List[str]:
+        if len(prompts) == 1 or self.max_workers <= 1:
+            return [self._complete(prompt, counters) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(prompts)),
+                                thread_name_prefix='summarize') as executor:
+            return list(executor.map(lambda prompt: self._complete(prompt, counters), prompts))
+
+    def _groups(self, summaries: List[str]) -> List[str]:
+        """Pack consecutive summaries into texts under the chunk budget, at least two per group."""
+        budget = self.chunk_tokens * BYTES_PER_TOKEN
+        groups: List[List[str]] = []
+        size = 0
+        for summary in summaries:
+            length = len(summary.encode('utf-8')) + 2
+            if groups and (len(groups[-1]) < 2 or size + length <= budget):
+                groups[-1].append(summary)
+                size += length
+            else:
+                groups.append([summary])
+                size = length
+        if len(groups) > 1 and len(groups[-1]) == 1:
+            # A lone trailing summary would be re-summarized on its own; fold it into the previous group
+            groups[-2].extend(groups.pop())
+        return ['\n\n'.join(group) for group in groups]
+
+    def summarize(self, transcript: str) -> Dict[str, Any]:
+        """
+        Summarize a transcript.
+
+        Args:
+            transcript (str): Full transcript text
+
+        Returns:
+            dict: 'summary', plus 'chunks', 'levels', 'model_calls' and 'cache_hits'
+        """
+        counters = {'model_calls': 0, 'cache_hits': 0}
+        chunks = chunk_text(transcript, self.chunk_tokens * BYTES_PER_TOKEN) if transcript.strip() else []
+        if not chunks:
+            return {'summary': '', 'chunks': 0, 'levels': 0, **counters}
+
+        if len(chunks) == 1:
+            summary = self._complete(FINAL_PROMPT.format(text=chunks[0].text), counters)
+            return {'summary': summary, 'chunks': 1, 'levels': 1, **counters}
+
+        # The map prompt does not mention the chunk count, so chunks keep their cache keys as a session grows
+        summaries = self._run([MAP_PROMPT.format(text=chunk.text) for chunk in chunks], counters)
+        levels = 1
+        while len(summaries) > 1:
+            summaries = self._run([REDUCE_PROMPT.format(text=group) for group in self._groups(summaries)],
+                                  counters)
+            levels += 1
+
+        logger.info(f"Summarized {len(chunks)} chunks in {levels} levels "
+                    f"({counters['model_calls']} model calls, {counters['cache_hits']} cached)")
+        return {'summary': summaries[0], 'chunks': len(chunks), 'levels': levels, **counters}
@@ -0,0 +1,89 @@
+import json
+
+from aws_fakes import FakeTranscriptionService
+from batch import CheckpointJournal, _process_one, collect_audio_files, is_batch_source, run_batch
+from metrics import MetricsRegistry, get_metrics
+
+
+class FlakyTranscriptionService(FakeTranscriptionService):
+    """Fails for the paths in failing."""
+
+    def __init__(self, failing=()):
+        super().__init__('Please describe your symptoms.')
+        self.failing = set(failing)
+        self.transcribed = []
+
+    def transcribe(self, audio_file_path):
+        self.transcribed.append(audio_file_path)
+        if audio_file_path in self.failing:
+            raise RuntimeError('Transcription failed')
+        return super().transcribe(audio_file_path)
+
+
+def make_files(directory, names):
+    paths = []
+    for name in names:
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'RIFF')
+        paths.append(str(path))
+    return paths
+
+
+def test_collect_audio_files(tmp_path):
+    make_files(tmp_path, ['b.wav', 'a.mp3', 'notes.txt', 'sub/c.m4a'])
+    expected = [str(tmp_path / name) for name in ['a.mp3', 'b.wav', 'sub/c.m4a']]
+    assert collect_audio_files(str(tmp_path)) == expected
+
+    manifest = tmp_path / 'files.lst'
+    manifest.write_text('# visits\nb.wav\n\nsub/c.m4a\nb.wav\n')
+    assert is_batch_source(str(manifest))
+    assert collect_audio_files(str(manifest)) == expected[1:]
+
+    assert is_batch_source(str(tmp_path / '*.wav'))
+    assert collect_audio_files(str(tmp_path / '*.wav')) == [expected[1]]
+
+
+def test_journal_ignores_a_torn_last_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    path.write_text(json.dumps({'file': 'a.wav', 'status': 'done'}) + '\n'
+                    + json.dumps({'file': 'b.wav', 'status': 'failed'}) + '\n{"file": "c.wa')
+    journal = CheckpointJournal(str(path))
+    assert journal.is_done('a.wav')
+    assert not journal.is_done('b.wav') and not journal.is_done('c.wav')
+    journal.close()
+
+
+def test_resume_skips_finished_files_and_retries_failures(tmp_path, capsys):
+    files = make_files(tmp_path, ['a.wav', 'b.wav', 'c.wav'])
+    checkpoint = str(tmp_path / 'checkpoint.jsonl')
+    options = {'save_to_s3': False, 'reuse_results': False, 'checkpoint_path': checkpoint}
+
+    service = FlakyTranscriptionService(failing=[files[1]])
+    summary = run_batch(files, workers=1, transcription_service=service, **options)
+    assert (summary['files_succeeded'], summary['files_failed']) == (2, 1)
+
+    service = FlakyTranscriptionService()
+    summary = run_batch(files, workers=1, transcription_service=service, **options)
+    assert service.transcribed == [files[1]]
+    assert (summary['files_skipped'], summary['files_succeeded']) == (2, 1)
+
+    records = [json.loads(line) for line in open(checkpoint)]
+    assert [record['status'] for record in records] == ['done', 'failed', 'done', 'done']
+
+
+def test_worker_metrics_are_drained_for_the_parent(tmp_path):
+    path = make_files(tmp_path, ['a.wav'])[0]
+    options = {'save_to_s3': False, 'reuse_results': False, 'transcription_service': FlakyTranscriptionService()}
+    get_metrics().reset()
+    outcome = _process_one(path, options, drain_metrics=True)
+    assert outcome['ok']
+    assert get_metrics().snapshot() == {}
+
+    parent = MetricsRegistry()
+    parent.observe('pipeline_run_seconds', 0.2)
+    parent.merge(outcome['metrics'])
+    parent.merge(outcome['metrics'])
+    runs = parent.snapshot()['pipeline_run_seconds']['']
+    assert runs['count'] == 3
+    assert 'stage="transcribe"' in parent.to_prometheus()
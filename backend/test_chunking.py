@@ -0,0 +1,67 @@
+import pytest
+
+from aws_fakes import FakeComprehendClient, FakeTranslateClient, disable_rate_limit_pacing
+from chunking import chunk_text, join_chunks, split_sentences
+from translation import AWSTranslationService
+
+
+def test_split_sentences_keeps_offsets():
+    text = '  First one.  Second?\nThird!  病人需要药。今天  '
+    sentences = split_sentences(text)
+    assert [s.text for s in sentences] == ['First one.', 'Second?', 'Third!', '病人需要药。', '今天']
+    assert all(text[s.start:s.end] == s.text for s in sentences)
+
+
+@pytest.mark.parametrize('max_bytes', [4, 10, 25, 100])
+def test_chunks_respect_the_byte_budget(max_bytes):
+    text = ('Short one. ' + 'A much longer sentence with many words in it. ' * 3
+            + 'Ünïcödé tëxt hérè. 病人今天需要吃药')
+    chunks = chunk_text(text, max_bytes)
+    assert all(chunk.byte_length <= max_bytes for chunk in chunks)
+    assert all(text[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+    assert ''.join(''.join(chunk.text.split()) for chunk in chunks) == ''.join(text.split())
+
+
+def test_chunks_pack_whole_sentences():
+    chunks = chunk_text('One. Two. Three. Four.', 10)
+    assert [chunk.text for chunk in chunks] == ['One. Two.', 'Three.', 'Four.']
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text('') == []
+    assert chunk_text(' \n ') == []
+
+
+def test_budget_must_fit_a_character():
+    with pytest.raises(ValueError):
+        chunk_text('text', 3)
+
+
+def test_join_keeps_paragraph_breaks():
+    text = 'First paragraph.\n\nSecond paragraph.'
+    chunks = chunk_text(text, 20)
+    assert join_chunks(text, chunks, [chunk.text.upper() for chunk in chunks]) == text.upper()
+
+
+def translator(**kwargs):
+    disable_rate_limit_pacing()
+    return AWSTranslationService(translate_client=FakeTranslateClient(),
+                                 comprehend_client=FakeComprehendClient(), **kwargs)
+
+
+def test_long_text_is_translated_in_chunks():
+    text = 'The patient needs medication today. ' * 100
+    result = translator(max_chunk_bytes=500).translate_text(text, 'es', 'en')
+    assert len(result['chunks']) == 8
+    assert result['translated_text'].count('[es]') == 8
+
+
+@pytest.mark.parametrize('chunk_workers', [0, None, 1])
+def test_worker_count_is_clamped(chunk_workers):
+    text = 'The patient needs medication today. ' * 100
+    result = translator(max_chunk_bytes=500, chunk_workers=chunk_workers).translate_text(text, 'es', 'en')
+    assert len(result['chunks']) == 8
+
+
+def test_blank_text_is_skipped():
+    assert translator().translate_text('   ', 'es')['skipped']
@@ -0,0 +1,77 @@
+import pytest
+
+from conversation import ConversationSession, Turn, merge_turns, parse_participants, turns_from_segments
+from streaming import TranscriptSegment
+
+PARTICIPANTS = parse_participants(['doctor=en', 'patient=es', 'interpreter=fr'])
+
+
+class StubTranslator:
+    """Detects the language from a tag in the text and records translation requests."""
+
+    def __init__(self):
+        self.requests = []
+
+    def batch_detect_language(self, texts):
+        return [{'language_code': text.split(':')[0] if ':' in text else 'und', 'confidence': 0.99}
+                for text in texts]
+
+    def translate_text(self, text, target_language, source_language):
+        self.requests.append((source_language, target_language))
+        return {'translated_text': f'[{target_language}] {text}'}
+
+
+def segment(speaker, text, start):
+    return TranscriptSegment(text=text, start_time=start, end_time=start + 1.0, speaker=speaker)
+
+
+def test_turns_are_translated_for_the_other_participants_only():
+    translator = StubTranslator()
+    turns = turns_from_segments([
+        segment('spk_0', 'en: Good morning.', 0.0),
+        segment('spk_1', 'es: Me duele la cabeza.', 2.0),
+        segment('spk_1', 'es: Desde ayer.', 3.0),
+    ], PARTICIPANTS)
+    assert [turn.speaker for turn in turns] == ['doctor', 'patient']
+
+    results = ConversationSession(PARTICIPANTS, translator).run(turns)
+    assert sorted(translator.requests) == [('en', 'es'), ('en', 'fr'), ('es', 'en'), ('es', 'fr')]
+    assert results['translations']['en'].splitlines()[0] == 'doctor: en: Good morning.'
+
+
+def test_undetected_turn_falls_back_to_the_speaker_language():
+    translator = StubTranslator()
+    turns = [Turn('patient', 'Sí.')]
+    ConversationSession(PARTICIPANTS, translator).run(turns)
+    assert turns[0].language == 'es'
+    assert sorted(turns[0].translations) == ['en', 'fr']
+
+
+def test_unlabelled_transcript_needs_a_single_participant():
+    segments = [TranscriptSegment(text='Good morning. Me duele la cabeza.')]
+    with pytest.raises(ValueError):
+        turns_from_segments(segments, PARTICIPANTS)
+    assert len(turns_from_segments(segments, PARTICIPANTS[:1])) == 1
+
+
+def test_per_speaker_recordings_are_interleaved():
+    doctor = turns_from_segments([segment(None, 'Good morning.', 0.0), segment(None, 'Take these.', 4.0),
+                                  segment(None, 'With food.', 5.0)], PARTICIPANTS, speaker='doctor')
+    patient = turns_from_segments([segment(None, 'Me duele.', 2.0)], PARTICIPANTS, speaker='patient')
+    merged = merge_turns([doctor, patient])
+    assert [(turn.speaker, turn.text) for turn in merged] == [
+        ('doctor', 'Good morning.'), ('patient', 'Me duele.'), ('doctor', 'Take these. With food.')]
+
+
+def test_untimed_recordings_cannot_be_interleaved():
+    doctor = turns_from_segments([TranscriptSegment(text='Good morning.')], PARTICIPANTS, speaker='doctor')
+    patient = turns_from_segments([TranscriptSegment(text='Hola.')], PARTICIPANTS, speaker='patient')
+    with pytest.raises(ValueError):
+        merge_turns([doctor, patient])
+    assert merge_turns([doctor, []]) == doctor
+
+
+@pytest.mark.parametrize('specs', [['doctor'], ['doctor=en', 'doctor=es'], ['=en']])
+def test_parse_participants_rejects_bad_specs(specs):
+    with pytest.raises(ValueError):
+        parse_participants(specs)
@@ -0,0 +1,58 @@
+import pytest
+
+from language_detection import LocalLanguageDetector
+
+
+@pytest.fixture
+def detector():
+    return LocalLanguageDetector()
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Good morning, I have had a headache since yesterday and a slight fever. What should I do about my medicine?',
+     'en'),
+    ("Bon dia, em fa mal el cap des d'ahir i tinc una mica de febre. Què he de fer amb els medicaments?", 'ca'),
+    ('Goedemorgen, ik heb sinds gisteren hoofdpijn en een beetje koorts. Wat moet ik met mijn medicijnen doen?',
+     'nl'),
+    ('Guten Morgen, ich habe seit gestern Kopfschmerzen und etwas Fieber. Was soll ich mit meinen Medikamenten machen?',
+     'de'),
+    ('Buenos días, me duele la cabeza desde ayer y tengo un poco de fiebre. ¿Qué debo hacer con mis medicamentos?',
+     'es'),
+    ('Mia figlia tossisce da tutta la settimana e non riesce a dormire la notte. Dobbiamo andare in ospedale?', 'it'),
+    ('Добрий день, як ви себе почуваєте?', 'uk'),
+    ('Сәлеметсіз бе, менің басым ауырады', 'kk'),
+    ('Здравствуйте, как вы себя чувствуете?', 'ru'),
+    ('Добар дан, како сте? Ћао', 'sr'),
+    ('آپ کیسے ہیں؟ میں ٹھیک ہوں', 'ur'),
+])
+def test_score_recognizes_language(detector, text, expected):
+    assert detector.score(text)[0] == expected
+
+
+@pytest.mark.parametrize('text', [
+    # Czech has no profile; the nearest profiled language must not be claimed
+    'Dobrý den, bolí mě hlava od včerejška a mám horečku. Co mám dělat s léky?',
+    # Unprofiled relatives of German, Dutch, Spanish and Italian
+    'God morgen, jeg har hatt hodepine siden i går og litt feber. Hva skal jeg gjøre med medisinene mine?',
+    'Datteren min har hostet hele uken og kan ikke sove om natten. Skal vi dra til sykehuset?',
+    "Goeie môre, ek het sedert gister hoofpyn en 'n bietjie koors. Wat moet ek met my medisyne doen?",
+    'My dogter hoes al die hele week en kan nie snags slaap nie. Moet ons hospitaal toe gaan?',
+    'Bună dimineața, mă doare capul de ieri și am puțină febră. Ce trebuie să fac cu medicamentele mele?',
+    'Fiica mea tuseste toata saptamana si nu poate dormi noaptea. Trebuie sa mergem la spital?',
+    'Bos días, dóeme a cabeza desde onte e teño un pouco de febre. Que debo facer cos meus medicamentos?',
+    'Gudde Moien, ech hunn zënter gëschter Kappwéi. Wat soll ech mat menge Medikamenter maachen?',
+    # Only letters Ukrainian shares with other Cyrillic languages
+    'Привіт, він тут',
+    # Kazakh without its distinctive letters
+    'Мені басым ауырады білесіз',
+    # Too short for trigrams
+    'Hola, ¿cómo estás?',
+    '12345 !!!',
+])
+def test_score_leaves_uncertain_text_to_comprehend(detector, text):
+    assert detector.score(text) == (None, 0.0)
+    assert detector.detect(text) is None
+
+
+def test_uppercase_distinctive_letter_counts(detector):
+    assert detector.score('ЋАО, КАКО СТЕ?')[0] == 'sr'
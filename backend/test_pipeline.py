@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+import main
+from aws_fakes import FakeTranscriptionService
+from pipeline import StageError, StageGraph
+from translation_cache import TranslationCache
+
+
+def test_stages_receive_their_dependencies():
+    graph = StageGraph()
+    graph.add('a', lambda inputs: 1)
+    graph.add('b', lambda inputs: inputs['a'] + 1, ['a'])
+    graph.add('c', lambda inputs: inputs['a'] * 10, ['a'])
+    graph.add('d', lambda inputs: (inputs['b'], inputs['c']), ['b', 'c'])
+    assert graph.run() == {'a': 1, 'b': 2, 'c': 10, 'd': (2, 10)}
+    assert set(graph.timings) == {'a', 'b', 'c', 'd'}
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(3, timeout=2)
+    graph = StageGraph()
+    for name in 'abc':
+        graph.add(name, lambda inputs: barrier.wait())
+    start = time.perf_counter()
+    graph.run(max_workers=3)
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.parametrize('max_workers', [0, None, 1])
+def test_single_worker_runs_every_stage(max_workers):
+    graph = StageGraph()
+    graph.add('a', lambda inputs: 'a')
+    graph.add('b', lambda inputs: inputs['a'] + 'b', ['a'])
+    assert graph.run(max_workers=max_workers)['b'] == 'ab'
+
+
+def test_failure_names_the_stage_and_skips_dependents():
+    ran = []
+    graph = StageGraph()
+    graph.add('a', lambda inputs: 1 / 0)
+    graph.add('b', lambda inputs: ran.append('b'), ['a'])
+    with pytest.raises(StageError) as error:
+        graph.run()
+    assert error.value.stage == 'a'
+    assert isinstance(error.value.error, ZeroDivisionError)
+    assert ran == []
+
+
+def test_invalid_graphs_are_rejected():
+    graph = StageGraph().add('a', lambda inputs: 1)
+    with pytest.raises(ValueError):
+        graph.add('a', lambda inputs: 2)
+    with pytest.raises(ValueError):
+        StageGraph().add('a', lambda inputs: 1, ['missing']).run()
+    with pytest.raises(ValueError):
+        StageGraph().add('a', lambda inputs: 1, ['b']).add('b', lambda inputs: 1, ['a']).run()
+
+
+def test_transcript_survives_a_translator_that_cannot_be_created(monkeypatch, tmp_path, capsys):
+    def unavailable(**kwargs):
+        raise RuntimeError('No credentials')
+
+    monkeypatch.setattr(main, 'AWSTranslationService', unavailable)
+    audio = tmp_path / 'visit.wav'
+    audio.write_bytes(b'RIFF')
+    results = main.process_audio_file(str(audio), save_to_s3=False, translate_languages=['es'],
+                                      cache=TranslationCache(), reuse_results=False,
+                                      transcription_service=FakeTranscriptionService('Hello there.'))
+    assert results['transcript'] == 'Hello there.'
+    assert results['translations'] == {}
+    assert results['metadata']['service_errors'] == {'translation': 'No credentials'}
+    assert 'Translation error: No credentials' in capsys.readouterr().out
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+from aws_clients import LIMITED_SERVICES, NO_RETRIES, ClientRegistry
+from aws_fakes import FakeS3Client, _client_error
+from rate_limit import AdaptiveRateLimiter, RateLimiterRegistry, TokenBucket, parse_rates
+from s3_storage import S3Storage
+
+
+def failing(errors):
+    """Callable that raises each of errors in turn, then returns 'ok'."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return 'ok'
+    return func, calls
+
+
+def throttle():
+    return _client_error('TranslateText', 'ThrottlingException', 'Rate exceeded', 400)
+
+
+def test_throttles_are_retried_and_slow_the_rate():
+    limiter = AdaptiveRateLimiter('translate', 'TranslateText', 20.0, base_delay=0.0)
+    func, calls = failing([throttle(), throttle()])
+    assert limiter.call(func) == 'ok'
+    assert len(calls) == 3
+    assert limiter.rate < 20.0
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    limiter = AdaptiveRateLimiter('translate', 'TranslateText', 20.0, base_delay=0.0)
+    func, calls = failing([_client_error('TranslateText', 'ValidationException', 'Bad input', 400)])
+    with pytest.raises(Exception):
+        limiter.call(func)
+    assert len(calls) == 1
+
+
+def test_s3_operations_leave_retries_to_botocore():
+    registry = RateLimiterRegistry(environ={})
+    limiter = registry.get('s3', 'PutObject')
+    func, calls = failing([_client_error('PutObject', 'InternalError', 'Simulated failure', 500)])
+    with pytest.raises(Exception):
+        limiter.call(func)
+    assert len(calls) == 1
+    assert registry.get('translate', 'TranslateText').settings['max_attempts'] > 1
+
+
+def test_limited_services_have_botocore_retries_off():
+    registry = ClientRegistry()
+    client = registry.get_client('translate', 'us-east-1')
+    assert 'translate' in LIMITED_SERVICES
+    assert client.meta.config.retries['total_max_attempts'] == NO_RETRIES['total_max_attempts']
+    assert registry.get_client('s3', 'us-east-1').meta.config.retries != NO_RETRIES
+
+
+def test_pacing_off_never_waits():
+    limiter = RateLimiterRegistry(pacing=False, environ={}).get('polly', 'SynthesizeSpeech')
+    assert math.isinf(limiter.rate)
+    assert all(limiter.bucket.acquire() == 0 for _ in range(100))
+
+
+def test_environment_configures_rates():
+    registry = RateLimiterRegistry(environ={'AWS_RATE_LIMITS': 'translate.TranslateText=5',
+                                            'AWS_RATE_LIMIT_SHARE': '0.5'})
+    assert registry.get('translate', 'TranslateText').max_rate == 2.5
+    assert not math.isinf(registry.get('polly', 'SynthesizeSpeech').rate)
+
+    registry = RateLimiterRegistry(environ={'AWS_RATE_LIMITS': 'off'})
+    assert math.isinf(registry.get('translate', 'TranslateText').rate)
+
+
+def test_configure_overrides_environment():
+    registry = RateLimiterRegistry(environ={'AWS_RATE_LIMITS': 'off'})
+    registry.configure(pacing=True)
+    assert registry.get('translate', 'TranslateText').max_rate == 20.0
+
+
+@pytest.mark.parametrize('spec', ['translate=5', 'translate.TranslateText', '.X=1', 'a.B=0', 'a.B=fast'])
+def test_parse_rates_rejects_malformed_entries(spec):
+    with pytest.raises(ValueError):
+        parse_rates(spec)
+
+
+def test_parse_rates():
+    assert parse_rates('s3.PutObject=100, bedrock-runtime.InvokeModel=inf,') == {
+        ('s3', 'PutObject'): 100.0, ('bedrock-runtime', 'InvokeModel'): math.inf}
+
+
+def test_weighted_acquire_charges_every_request():
+    bucket = TokenBucket(100.0)
+    assert bucket.acquire(100) == 0
+    assert bucket.acquire(10) == pytest.approx(0.1, abs=0.05)
+
+
+def test_multipart_upload_counts_each_part():
+    storage = S3Storage('b', s3_client=FakeS3Client(), multipart_threshold=8 * 1024 * 1024,
+                        multipart_chunksize=8 * 1024 * 1024)
+    assert storage._request_count(1024) == 1
+    assert storage._request_count(20 * 1024 * 1024) == 3 + 2
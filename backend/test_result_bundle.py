@@ -0,0 +1,50 @@
+import pytest
+
+from aws_fakes import FakeS3Client, disable_rate_limit_pacing
+from result_bundle import (
+    CONTENT_ENCODING,
+    CONTENT_TYPE,
+    BundleFormatError,
+    BundleReader,
+    build_bundle,
+    read_bundle,
+)
+from s3_storage import S3Storage
+
+RESULTS = {
+    'transcript': 'The patient needs medication today. ' * 200,
+    'translations': {'es': 'El paciente necesita medicación hoy. ' * 200, 'zh': '病人今天需要吃药。'},
+    'detected_language': {'code': 'en', 'confidence': 0.99},
+    'metadata': {'word_count': 1000, 'original_file': 'visit.wav'},
+}
+
+
+@pytest.fixture
+def storage():
+    disable_rate_limit_pacing()
+    return S3Storage('bundles', s3_client=FakeS3Client())
+
+
+def test_round_trip():
+    assert read_bundle(build_bundle(RESULTS)) == RESULTS
+
+
+def test_round_trip_without_translations():
+    assert read_bundle(build_bundle({'transcript': ''})) == {'transcript': '', 'translations': {}}
+
+
+def test_truncated_bundle_is_rejected():
+    with pytest.raises(BundleFormatError):
+        read_bundle(build_bundle(RESULTS)[:10])
+
+
+def test_reader_fetches_single_sections(storage):
+    storage.upload_file(build_bundle(RESULTS), 'transcripts/visit.bundle',
+                        content_type=CONTENT_TYPE, content_encoding=CONTENT_ENCODING)
+    reader = BundleReader(storage, 'transcripts/visit.bundle')
+    assert reader.languages() == ['es', 'zh']
+    assert reader.translation('zh') == RESULTS['translations']['zh']
+    assert reader.transcript() == RESULTS['transcript']
+    assert reader.read_section('results')['metadata'] == RESULTS['metadata']
+    with pytest.raises(KeyError):
+        reader.translation('fr')
@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+import main
+from aws_fakes import (FakeBedrockRuntimeClient, FakeComprehendClient, FakePollyClient, FakeS3Client,
+                       FakeTranscriptionService, FakeTranslateClient, disable_rate_limit_pacing)
+from result_bundle import read_bundle
+from result_index import LocalResultIndex, S3ResultIndex, bundle_key, file_sha256
+from s3_storage import S3Storage
+from speech import SpeechCache, SpeechSynthesizer
+from summarization import BedrockModel, TranscriptSummarizer
+from translation import AWSTranslationService
+from translation_cache import TranslationCache
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / 'visit.wav'
+    path.write_bytes(b'RIFF' + bytes(range(256)) * 10)
+    return str(path)
+
+
+@pytest.fixture
+def storage():
+    disable_rate_limit_pacing()
+    return S3Storage('results', s3_client=FakeS3Client())
+
+
+def run(audio, storage, languages, tmp_path, **options):
+    cache = TranslationCache()
+    service = FakeTranscriptionService('Take one tablet twice a day. Come back next week.')
+    translator = AWSTranslationService(cache=cache, translate_client=FakeTranslateClient(),
+                                       comprehend_client=FakeComprehendClient())
+    results = main.process_audio_file(audio, translate_languages=languages, storage=storage, cache=cache,
+                                      transcription_service=service, translator=translator, **options)
+    return results, service
+
+
+def stored_bundle(storage, audio):
+    return read_bundle(storage.get_object_range(bundle_key(file_sha256(audio)), 0))
+
+
+def test_file_sha256(audio):
+    assert file_sha256(audio, chunk_size=100) == hashlib.sha256(open(audio, 'rb').read()).hexdigest()
+
+
+def test_local_index_keeps_earlier_translations(tmp_path):
+    index = LocalResultIndex(str(tmp_path / 'index.sqlite'))
+    assert index.lookup('abc') is None
+    index.record('abc', {'transcript': 't', 'translations': {'es': 'uno'}})
+    index.record('abc', {'transcript': 't', 'translations': {'fr': 'un'}, 'detected_language': None})
+    assert index.lookup('abc')['translations'] == {'es': 'uno', 'fr': 'un'}
+
+
+def test_identical_audio_reuses_the_transcript(audio, storage, tmp_path):
+    first, _ = run(audio, storage, ['es'], tmp_path)
+    second, service = run(audio, storage, ['es'], tmp_path)
+    assert service.faults.calls['StartTranscriptionJob'] == 0
+    assert second['metadata']['reused_results']
+    assert second['translations'] == first['translations']
+    assert first['storage']['bundle_url'] == second['storage']['bundle_url']
+    entry = S3ResultIndex(storage).lookup(file_sha256(audio))
+    assert entry['results']['metadata']['content_hash'] == file_sha256(audio)
+
+
+@pytest.mark.parametrize('local_index', [False, True])
+def test_new_languages_keep_everything_stored_before(audio, storage, tmp_path, local_index):
+    options = {'index_path': str(tmp_path / 'index.sqlite')} if local_index else {}
+    synthesizer = SpeechSynthesizer(cache=SpeechCache(str(tmp_path / 'speech')), polly_client=FakePollyClient())
+    summarizer = TranscriptSummarizer(model=BedrockModel(bedrock_client=FakeBedrockRuntimeClient()),
+                                      cache=TranslationCache())
+    first, _ = run(audio, storage, ['es'], tmp_path, synthesize_speech=True, synthesizer=synthesizer,
+                   summarize=True, summarizer=summarizer, **options)
+    run(audio, storage, ['fr'], tmp_path, **options)
+
+    bundle = stored_bundle(storage, audio)
+    assert set(bundle['translations']) == {'es', 'fr'}
+    assert bundle['summary'] == first['summary']
+    assert bundle['speech'] == first['speech']
+    assert bundle['metadata']['translation_languages'] == ['fr']
+    assert bundle['metadata']['reused_results']
@@ -0,0 +1,101 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from aws_fakes import FakeS3Client, FaultInjector, disable_rate_limit_pacing
+from s3_storage import DELETE_BATCH_SIZE, S3Storage
+
+
+class RecordingS3Client(FakeS3Client):
+    """Records the size of every DeleteObjects batch; optionally reports keys as failed."""
+
+    def __init__(self, failing=()):
+        super().__init__(FaultInjector())
+        self.batches = []
+        self.failing = set(failing)
+
+    def delete_objects(self, Bucket, Delete, **kwargs):
+        keys = [item['Key'] for item in Delete['Objects']]
+        self.batches.append(len(keys))
+        super().delete_objects(Bucket, {'Objects': [{'Key': key} for key in keys if key not in self.failing]})
+        return {'Errors': [{'Key': key, 'Code': 'AccessDenied'} for key in keys if key in self.failing]}
+
+
+def fill(client, count, prefix='transcripts/'):
+    client.create_bucket(Bucket='b')
+    for i in range(count):
+        client.put_object(Bucket='b', Key=f'{prefix}{i:05d}.txt', Body=b'x')
+
+
+@pytest.fixture
+def client():
+    disable_rate_limit_pacing()
+    return RecordingS3Client()
+
+
+def test_listing_follows_every_page(client):
+    fill(client, 2500)
+    fill(client, 3, prefix='speech/')
+    storage = S3Storage('b', s3_client=client)
+    keys = [obj['Key'] for obj in storage.iter_objects('transcripts/', page_size=1000)]
+    assert len(keys) == 2500 and keys == sorted(keys)
+    assert client.faults.calls['ListObjectsV2'] == 3
+    assert len(storage.list_objects()) == 2503
+
+
+def test_deletes_are_batched(client):
+    fill(client, 2 * DELETE_BATCH_SIZE + 1)
+    storage = S3Storage('b', s3_client=client)
+    assert storage.delete_objects(obj['Key'] for obj in storage.iter_objects()) == 2 * DELETE_BATCH_SIZE + 1
+    assert sorted(client.batches) == [1, DELETE_BATCH_SIZE, DELETE_BATCH_SIZE]
+    assert client.buckets['b'] == {}
+
+
+def test_failed_deletes_are_reported(client):
+    fill(client, 5)
+    client.failing = {'transcripts/00001.txt'}
+    storage = S3Storage('b', s3_client=client)
+    with pytest.raises(Exception, match='Failed to delete 1 objects'):
+        storage.delete_objects(obj['Key'] for obj in storage.iter_objects())
+    assert list(client.buckets['b']) == ['transcripts/00001.txt']
+
+
+def test_delete_bucket_empties_it_first(client):
+    fill(client, 1500)
+    S3Storage('b', s3_client=client).delete_bucket()
+    assert 'b' not in client.buckets
+
+
+def test_upload_many_and_reads(client):
+    storage = S3Storage('b', s3_client=client)
+    urls = storage.upload_many([
+        {'key': 'a.txt', 'text': 'héllo'},
+        {'key': 'b.json', 'json': {'n': 1}},
+        {'key': 'c.bin', 'file': bytes(range(256)) * 100},
+    ])
+    assert [url.rsplit('/', 1)[1] for url in urls] == ['a.txt', 'b.json', 'c.bin']
+    assert storage.get_object('a.txt') == 'héllo'
+    assert storage.get_object('missing.txt') is None
+    assert storage.get_object_range('c.bin', 10, 12) == bytes([10, 11, 12])
+    assert b''.join(storage.iter_object('c.bin', chunk_size=1000)) == bytes(range(256)) * 100
+
+    with pytest.raises(ValueError):
+        storage.upload_many([{'key': 'd'}])
+
+
+def test_injected_throttles_are_retried_like_botocore():
+    disable_rate_limit_pacing()
+    client = FakeS3Client(FaultInjector(throttle_rate=0.3, seed=3), retry_delay=0)
+    client.buckets['b'] = {}
+    storage = S3Storage('b', s3_client=client)
+    storage.upload_many([{'key': f'{i}.txt', 'text': 'x'} for i in range(20)])
+    assert len(client.buckets['b']) == 20
+    assert client.faults.faults['ThrottlingException'] > 0
+
+    client = FakeS3Client(max_attempts=2, retry_delay=0)
+    client.buckets['b'] = {}
+    storage = S3Storage('b', s3_client=client)
+    storage.create_bucket()
+    client.faults.throttle_rate = 1.0
+    with pytest.raises(ClientError):
+        storage.upload_many([{'key': 'a.txt', 'text': 'x'}])
+    assert client.faults.calls['PutObject'] == 2
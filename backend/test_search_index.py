@@ -0,0 +1,88 @@
+import pytest
+
+import main
+import search_index
+from aws_fakes import FakeS3Client, FaultInjector, disable_rate_limit_pacing
+from s3_storage import S3Storage
+from search_index import SearchIndex, documents_from_results
+
+RESULTS = {
+    'transcript': 'The patients need medication today',
+    'translations': {'es': 'Los pacientes necesitan medicación hoy'},
+    'detected_language': {'code': 'en'},
+}
+
+
+@pytest.fixture
+def faults():
+    return FaultInjector()
+
+
+@pytest.fixture
+def storage(faults):
+    disable_rate_limit_pacing()
+    return S3Storage('results', s3_client=FakeS3Client(faults))
+
+
+def keys(hits):
+    return sorted(hit.key for hit in hits)
+
+
+def test_legacy_objects_are_not_indexed_twice(storage, tmp_path):
+    main.save_results(dict(RESULTS), 'visit.wav', storage, legacy_objects=True)
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    index.build_from_storage(storage)
+
+    hits = index.search('patients')
+    assert len(hits) == 1 and hits[0].key.endswith('.bundle')
+    assert len(index.search('pacientes')) == 1
+
+
+def test_results_added_at_upload_are_not_fetched_again(storage, faults, tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    results = main.save_results(dict(RESULTS), 'visit.wav', storage, search_index=index)
+    faults.calls.clear()
+
+    stats = index.build_from_storage(storage)
+    assert stats['fetched'] == 0
+    assert 'GetObject' not in faults.calls
+
+    # Deleting the object removes its documents
+    storage.s3_client.delete_object(Bucket='results', Key=results['storage']['bundle_url'].split('.com/')[1])
+    assert index.build_from_storage(storage)['removed'] == 1
+    assert index.search('patients') == []
+
+
+def test_legacy_objects_are_indexed_without_a_bundle(storage, tmp_path):
+    storage.upload_text('Die Patienten brauchen heute ihre Medikamente und warten im Krankenhaus auf den Arzt',
+                        'transcripts/old.txt')
+    storage.upload_text('The patients need their medicine today', 'translations/old_en.txt')
+    index = SearchIndex(str(tmp_path / 'search.db'))
+    index.build_from_storage(storage)
+
+    assert keys(index.search('patients')) == ['translations/old_en.txt']
+    assert [hit.language for hit in index.search('patienten')] == ['de']
+
+
+@pytest.mark.parametrize('detected', [{'code': 'es', 'confidence': 0.9}, {'language_code': 'es', 'confidence': 0.9}])
+def test_transcript_language_from_either_detection_shape(detected):
+    documents = documents_from_results({'transcript': 'hola', 'translations': {'en': 'hi'},
+                                        'detected_language': detected})
+    assert [(language, text) for _, language, text in documents] == [('es', 'hola'), ('en', 'hi')]
+
+
+def test_cli_syncs_from_the_results_bucket(monkeypatch, tmp_path):
+    buckets = []
+
+    class RecordingStorage(S3Storage):
+        def __init__(self, bucket_name):
+            buckets.append(bucket_name)
+            client = FakeS3Client()
+            client.buckets[bucket_name] = {}
+            super().__init__(bucket_name, s3_client=client)
+
+    monkeypatch.setattr('s3_storage.S3Storage', RecordingStorage)
+    for argv in [[], ['--bucket', 'other-bucket']]:
+        monkeypatch.setattr('sys.argv', ['search_index.py', '--index-path', str(tmp_path / 'index.db'), *argv])
+        search_index.main()
+    assert buckets == [main.RESULTS_BUCKET, 'other-bucket']
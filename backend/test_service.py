@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import threading
+
+from service import JobManager, JobServer
+
+
+class BlockingProcessor:
+    """process_func that holds each job until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.paths = []
+
+    def __call__(self, audio_file, **options):
+        self.paths.append(audio_file)
+        self.release.wait(5)
+        return {'transcript': 'ok', 'existed': os.path.exists(audio_file)}
+
+
+async def request(port, head, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(head.encode('latin-1') + b'\r\n\r\n' + body)
+    writer.write_eof()
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    status_line, _, rest = response.partition(b'\r\n')
+    return int(status_line.split()[1]), json.loads(rest.split(b'\r\n\r\n', 1)[1])
+
+
+def upload_head(length):
+    return f'POST /jobs?translate=es HTTP/1.1\r\nContent-Type: audio/wav\r\nContent-Length: {length}'
+
+
+def json_head(length):
+    return f'POST /jobs HTTP/1.1\r\nContent-Type: application/json\r\nContent-Length: {length}'
+
+
+def serve(test, processor=None, queue_size=5, **server_options):
+    """Run test(server) against a started JobServer."""
+    async def main():
+        server = await JobServer(JobManager(processor or BlockingProcessor(), workers=1, queue_size=queue_size),
+                                 **server_options).start(port=0)
+        try:
+            return await test(server)
+        finally:
+            server.manager.process_func.release.set()
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_full_queue_refuses_before_reading_the_body(tmp_path):
+    async def test(server):
+        assert (await request(server.port, upload_head(4), b'RIFF'))[0] == 202
+        await asyncio.sleep(0.1)  # the only worker picks it up
+        assert (await request(server.port, upload_head(4), b'RIFF'))[0] == 202
+
+        # A huge body is announced but never sent: the answer must not wait for it
+        status, body = await request(server.port, upload_head(400 * 1024 * 1024))
+        assert status == 503 and 'full' in body['error']
+        assert server.manager.reserved == 0
+        # Only the running and the queued job's uploads reached the disk
+        assert len(os.listdir(tmp_path)) == 2
+    serve(test, queue_size=1, upload_dir=str(tmp_path))
+
+
+def test_failed_upload_releases_its_slot(tmp_path):
+    async def test(server):
+        status, _ = await request(server.port, upload_head(100), b'short')
+        assert status == 400
+        assert server.manager.reserved == 0
+        assert (await request(server.port, upload_head(4), b'RIFF'))[0] == 202
+    serve(test, queue_size=1, upload_dir=str(tmp_path))
+
+
+def test_length_and_empty_bodies_are_rejected():
+    async def test(server):
+        assert (await request(server.port, 'POST /jobs HTTP/1.1\r\nContent-Type: audio/wav'))[0] == 411
+        assert (await request(server.port, upload_head(0)))[0] == 400
+        assert (await request(server.port, json_head(20000), b'{}'))[0] == 413
+        assert server.manager.stats()['queued'] == 0
+    serve(test)
+
+
+def test_uploads_are_processed_and_removed(tmp_path):
+    processor = BlockingProcessor()
+    processor.release.set()
+
+    async def test(server):
+        status, body = await request(server.port, upload_head(4), b'RIFF')
+        assert status == 202
+        for _ in range(50):
+            status, job = await request(server.port, f'GET /jobs/{body["id"]} HTTP/1.1')
+            if job['status'] == 'done':
+                break
+            await asyncio.sleep(0.02)
+        assert job['result']['existed'] and job['options']['translate_languages'] == ['es']
+    serve(test, processor=processor, upload_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_json_paths_are_confined_to_the_audio_dir(tmp_path):
+    audio_dir = tmp_path / 'audio'
+    audio_dir.mkdir()
+    (audio_dir / 'visit.wav').write_bytes(b'RIFF')
+    (tmp_path / 'secret.wav').write_bytes(b'RIFF')
+    os.symlink(tmp_path / 'secret.wav', audio_dir / 'link.wav')
+
+    async def test(server):
+        async def submit(audio_file):
+            body = json.dumps({'audio_file': audio_file}).encode()
+            return (await request(server.port, json_head(len(body)), body))[0]
+
+        assert await submit('visit.wav') == 202
+        assert await submit('../secret.wav') == 403
+        assert await submit(str(tmp_path / 'secret.wav')) == 403
+        assert await submit('link.wav') == 403
+        assert await submit('missing.wav') == 400
+    serve(test, audio_dir=str(audio_dir))
+
+
+def test_json_paths_are_disabled_without_an_audio_dir():
+    async def test(server):
+        body = b'{"audio_file": "/etc/passwd"}'
+        assert (await request(server.port, json_head(len(body)), body))[0] == 403
+    serve(test)
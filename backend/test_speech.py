@@ -0,0 +1,47 @@
+import os
+
+import speech
+from aws_fakes import FakePollyClient, disable_rate_limit_pacing
+from speech import SpeechCache, SpeechSynthesizer, get_default_speech_cache
+
+
+def make_synthesizer(directory, **kwargs):
+    disable_rate_limit_pacing()
+    return SpeechSynthesizer(cache=get_default_speech_cache(str(directory)), polly_client=FakePollyClient(),
+                             **kwargs)
+
+
+def test_pieces_are_joined_in_order_and_cached(tmp_path):
+    text = 'Take one tablet. Drink water. Rest today.'
+    synthesizer = make_synthesizer(tmp_path / 'cache', max_chars=20)
+    path = synthesizer.synthesize_to_file(text, 'en', str(tmp_path / 'a.mp3'))
+    assert open(path, encoding='utf-8').read() == \
+        '[Joanna] Take one tablet.\n[Joanna] Drink water.\n[Joanna] Rest today.\n'
+    assert synthesizer.polly_client.faults.calls['SynthesizeSpeech'] == 3
+
+    again = make_synthesizer(tmp_path / 'cache', max_chars=20)
+    again.synthesize_to_file(text, 'en', str(tmp_path / 'b.mp3'))
+    assert again.polly_client.faults.calls['SynthesizeSpeech'] == 0
+    assert open(tmp_path / 'b.mp3', 'rb').read() == open(path, 'rb').read()
+
+
+def test_synthesizers_share_the_cache_size(tmp_path, monkeypatch):
+    walks = []
+    real_walk = os.walk
+    monkeypatch.setattr(speech.os, 'walk', lambda top: walks.append(top) or real_walk(top))
+    for i in range(3):
+        make_synthesizer(tmp_path / 'cache').synthesize_to_file(f'Visit {i}.', 'es', str(tmp_path / f'{i}.mp3'))
+    assert len(walks) == 1
+    assert get_default_speech_cache(str(tmp_path / 'cache')) is get_default_speech_cache(str(tmp_path / 'cache'))
+    assert get_default_speech_cache(str(tmp_path / 'other')) is not get_default_speech_cache(str(tmp_path / 'cache'))
+
+
+def test_trim_evicts_least_recently_used(tmp_path):
+    cache = SpeechCache(str(tmp_path), max_bytes=10)
+    for index, key in enumerate(['aa1', 'bb2', 'cc3']):
+        os.utime(cache.put_stream(key, [b'12345']), (index, index))
+    os.utime(cache.path('aa1'), (5, 5))
+    assert cache.trim() == 1
+    assert cache.get('bb2') is None and cache.get('aa1') and cache.get('cc3')
+    assert cache.trim_if_full() == 0
+    assert cache.stats() == {'hits': 2, 'misses': 1}
@@ -0,0 +1,83 @@
+import pytest
+
+import main
+from aws_fakes import FakeComprehendClient, FakeTranslateClient, disable_rate_limit_pacing, sample_transcript
+from streaming import AUTO_SOURCE_LANGUAGE, TranscriptSegment, fake_segment_source, process_segments
+from translation import AWSTranslationService
+from translation_cache import TranslationCache
+
+
+class RecordingTranslateClient(FakeTranslateClient):
+    def __init__(self):
+        super().__init__()
+        self.sources = set()
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode, **kwargs):
+        self.sources.add(SourceLanguageCode)
+        return super().translate_text(Text, SourceLanguageCode, TargetLanguageCode, **kwargs)
+
+
+class DetectionFails(AWSTranslationService):
+    def detect_language(self, text):
+        raise RuntimeError('Comprehend unavailable')
+
+
+@pytest.fixture
+def translator():
+    disable_rate_limit_pacing()
+    return AWSTranslationService(cache=TranslationCache(), translate_client=FakeTranslateClient(),
+                                 comprehend_client=FakeComprehendClient())
+
+
+def test_segments_are_translated_in_order(translator):
+    text = sample_transcript(60)
+    events = []
+    results = process_segments(fake_segment_source(text, words_per_segment=8), translator, ['es', 'fr'],
+                               on_event=events.append)
+
+    assert results['transcript'] == ' '.join(text.split())
+    assert len(results['segments']) == len(text.split()) // 8 + (len(text.split()) % 8 > 0)
+    assert all(sorted(segment['translations']) == ['es', 'fr'] for segment in results['segments'])
+    assert results['translations']['es'].startswith('[es] ')
+    assert {event['type'] for event in events} == {'partial', 'final', 'translation'}
+    assert results['detected_language']['code'] == 'en'
+    assert set(results['detected_language']) == {'code', 'confidence'}
+
+
+def test_detection_failure_keeps_the_stream():
+    disable_rate_limit_pacing()
+    client = RecordingTranslateClient()
+    translator = DetectionFails(translate_client=client, comprehend_client=FakeComprehendClient())
+    results = process_segments(fake_segment_source(sample_transcript(30)), translator, ['es'])
+
+    assert results['detection_error'] == 'Comprehend unavailable'
+    assert results['detected_language'] is None
+    assert all(segment['translations']['es'] for segment in results['segments'])
+    assert client.sources == {AUTO_SOURCE_LANGUAGE}
+
+
+def test_zero_concurrency_is_clamped(translator):
+    results = process_segments(fake_segment_source(sample_transcript(20)), translator, ['es'], max_workers=0)
+    assert results['translations']['es']
+
+
+def test_source_errors_propagate(translator):
+    def broken():
+        yield TranscriptSegment(text='Hello there.')
+        raise ConnectionError('stream dropped')
+
+    with pytest.raises(ConnectionError):
+        process_segments(broken(), translator, ['es'])
+
+
+def test_stream_survives_a_translator_that_cannot_be_created(monkeypatch, capsys):
+    def unavailable(**kwargs):
+        raise RuntimeError('No credentials')
+
+    monkeypatch.setattr(main, 'AWSTranslationService', unavailable)
+    results = main.process_audio_stream('visit.wav', save_to_s3=False, translate_languages=['es'],
+                                        cache=TranslationCache(), segments=fake_segment_source('Hello there.'))
+    assert results['transcript'] == 'Hello there.'
+    assert results['translations'] == {}
+    assert results['metadata']['service_errors'] == {'translation': 'No credentials'}
+    assert 'Translation error: No credentials' in capsys.readouterr().out
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+from summarization import BYTES_PER_TOKEN, TranscriptSummarizer
+from translation_cache import TranslationCache
+
+TRANSCRIPT = ' '.join(f"Sentence number {i} about the patient's headache and ibuprofen dose." for i in range(200))
+
+
+class WordyModel:
+    """Returns summaries as long as max_tokens allows, the worst case for the reduce loop."""
+    model_id = 'wordy'
+
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, prompt, max_tokens):
+        self.calls += 1
+        return ('summary ' * max_tokens)[:max_tokens * BYTES_PER_TOKEN]
+
+
+def summarizer(model, cache=None, summary_tokens=40):
+    return TranscriptSummarizer(model=model, cache=cache or TranslationCache(), chunk_tokens=100,
+                                summary_tokens=summary_tokens, max_workers=1)
+
+
+@pytest.mark.parametrize('summary_tokens', [10, 40, 50])
+def test_reduce_loop_terminates(summary_tokens):
+    model = WordyModel()
+    result = summarizer(model, summary_tokens=summary_tokens).summarize(TRANSCRIPT)
+    assert result['chunks'] > 1
+    # Each level at least halves the summaries
+    assert result['levels'] <= 1 + math.ceil(math.log2(result['chunks']))
+    assert result['model_calls'] == model.calls
+    assert result['model_calls'] + result['cache_hits'] < 2 * result['chunks']
+
+
+def test_short_and_empty_transcripts():
+    model = WordyModel()
+    assert summarizer(model).summarize('  ')['levels'] == 0
+    assert summarizer(model).summarize('Short visit.')['model_calls'] == 1
+
+
+def test_cache_is_keyed_by_model_and_budget():
+    cache = TranslationCache()
+    first = summarizer(WordyModel(), cache).summarize(TRANSCRIPT)
+    again = summarizer(WordyModel(), cache).summarize(TRANSCRIPT)
+    assert again['model_calls'] == 0 and again['cache_hits'] == first['model_calls'] + first['cache_hits']
+
+    other = WordyModel()
+    other.model_id = 'other'
+    assert summarizer(other, cache).summarize(TRANSCRIPT)['model_calls'] == first['model_calls']
+    assert summarizer(WordyModel(), cache, summary_tokens=30).summarize(TRANSCRIPT)['model_calls'] > 0
+
+
+def test_chunk_budget_must_fit_two_summaries():
+    with pytest.raises(ValueError):
+        TranscriptSummarizer(model=WordyModel(), chunk_tokens=100, summary_tokens=60)
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from translation_cache import TranslationCache
+
+
+def key(i):
+    return TranslationCache.make_key(f'text {i}', 'en', 'es')
+
+
+def test_make_key_separates_operations():
+    keys = {
+        TranslationCache.make_key('hello', 'en', 'es'),
+        TranslationCache.make_key('hello', 'en', 'fr'),
+        TranslationCache.make_key('hello', kind='detect'),
+        TranslationCache.make_key('hello', kind='summary', extra=('model', '400')),
+        TranslationCache.make_key('hello', kind='summary', extra=('model', '300')),
+    }
+    assert len(keys) == 5
+
+
+def test_memory_tier_is_lru_by_entries():
+    cache = TranslationCache(max_entries=2)
+    cache.set(key(1), {'v': 1})
+    cache.set(key(2), {'v': 2})
+    assert cache.get(key(1)) == {'v': 1}
+    cache.set(key(3), {'v': 3})
+    assert cache.get(key(2)) is None
+    assert cache.get(key(1)) == {'v': 1}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_tier_counts_utf8_bytes():
+    cache = TranslationCache()
+    cache.set(key(1), {'v': '病人'})
+    assert cache.stats()['bytes'] == len('{"v":"病人"}'.encode('utf-8'))
+
+
+def test_returned_values_are_copies():
+    cache = TranslationCache()
+    cache.set(key(1), {'v': [1]})
+    cache.get(key(1))['v'].append(2)
+    assert cache.get(key(1)) == {'v': [1]}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = TranslationCache(sqlite_path=path)
+    cache.set(key(1), {'v': 1})
+    cache.close()
+
+    cache = TranslationCache(sqlite_path=path)
+    assert cache.get(key(1)) == {'v': 1}
+    assert cache.stats()['disk_hits'] == 1
+
+
+def test_disk_eviction_drops_least_recently_used(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = TranslationCache(sqlite_path=path, max_disk_entries=10)
+    for i in range(10):
+        cache.set(key(i), {'v': i})
+    cache.close()
+
+    # A fresh instance reads key 0 from disk, making it the most recent there
+    cache = TranslationCache(sqlite_path=path, max_disk_entries=10)
+    assert cache.get(key(0)) == {'v': 0}
+    cache.set(key(10), {'v': 10})
+    cache.close()
+
+    rows = {row[0] for row in sqlite3.connect(path).execute('SELECT key FROM cache')}
+    assert len(rows) == 10
+    assert key(0) in rows and key(1) not in rows
+
+
+def test_disk_hits_do_not_commit_each_lookup(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = TranslationCache(sqlite_path=path)
+    cache.set(key(1), {'v': 1})
+    cache.close()
+
+    cache = TranslationCache(max_entries=1, sqlite_path=path)
+    before = cache._db.total_changes
+    assert cache.get(key(1)) == {'v': 1}
+    assert cache._db.total_changes == before
+    cache.close()
+
+
+@pytest.mark.parametrize('max_disk_entries', [0, 1, 5])
+def test_small_disk_limits(tmp_path, max_disk_entries):
+    cache = TranslationCache(sqlite_path=str(tmp_path / 'cache.db'), max_disk_entries=max_disk_entries)
+    for i in range(20):
+        cache.set(key(i), {'v': i})
+    count = cache._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+    assert count <= max_disk_entries + 1
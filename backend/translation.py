@@ -1,31 +1,97 @@
-import boto3
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from botocore.exceptions import ClientError
+from aws_clients import get_client
+from chunking import DEFAULT_CHUNK_BYTES, chunk_text, join_chunks
+from language_detection import LocalLanguageDetector
+from rate_limit import call_with_limits
+from translation_cache import TranslationCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default number of target languages translated concurrently.
+# boto3 clients are thread-safe, so one client is shared by all workers.
+DEFAULT_MAX_WORKERS = 8
+
+# Comprehend BatchDetectDominantLanguage limits: 25 documents of 5,000 bytes each.
+# The first 5,000 bytes are plenty to identify a transcript's language.
+COMPREHEND_BATCH_SIZE = 25
+DETECTION_SAMPLE_BYTES = 5000
+
+# Common AWS Translate supported languages (static, so listing them needs no AWS client)
+SUPPORTED_LANGUAGES = [
+    'af', 'sq', 'am', 'ar', 'hy', 'az', 'bn', 'bs', 'bg', 'ca', 'zh', 'zh-TW',
+    'hr', 'cs', 'da', 'prs', 'nl', 'en', 'et', 'fa', 'tl', 'fi', 'fr', 'fr-CA',
+    'ka', 'de', 'el', 'gu', 'ht', 'ha', 'he', 'hi', 'hu', 'is', 'id', 'ga',
+    'it', 'ja', 'kn', 'kk', 'ko', 'lv', 'lt', 'mk', 'ms', 'ml', 'mt', 'mr',
+    'mn', 'no', 'ps', 'pl', 'pt', 'pt-PT', 'pa', 'ro', 'ru', 'sr', 'si',
+    'sk', 'sl', 'so', 'es', 'es-MX', 'sw', 'sv', 'ta', 'te', 'th', 'tr',
+    'uk', 'ur', 'uz', 'vi', 'cy'
+]
+
+
+def source_language_from(detection_result: Dict[str, Any]) -> str:
+    """
+    Turn a detection result into a source language code for Translate,
+    defaulting to English when detection failed.
+    """
+    source_language = detection_result['language_code']
+    if source_language == 'und':
+        logger.warning("Language detection failed, defaulting to English")
+        source_language = 'en'
+    return source_language
+
+
+def _detection_sample(text: str) -> str:
+    encoded = text.encode('utf-8')
+    if len(encoded) <= DETECTION_SAMPLE_BYTES:
+        return text
+    return encoded[:DETECTION_SAMPLE_BYTES].decode('utf-8', errors='ignore')
+
+
+def _detection_result(languages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not languages:
+        return {'language_code': 'und', 'confidence': 0.0, 'all_languages': []}
+    return {
+        'language_code': languages[0]['LanguageCode'],
+        'confidence': languages[0]['Score'],
+        'all_languages': languages
+    }
+
 class AWSTranslationService:
     """
     A service class for AWS Translate and Comprehend operations.
     Provides automatic language detection and multi-language translation.
     """
     
-    def __init__(self, region_name: str = 'us-east-1'):
+    def __init__(self, region_name: str = 'us-east-1', cache: Optional[TranslationCache] = None,
+                 max_chunk_bytes: int = DEFAULT_CHUNK_BYTES, chunk_workers: int = DEFAULT_MAX_WORKERS,
+                 local_detection: bool = True, translate_client=None, comprehend_client=None):
         """
         Initialize AWS clients for Translate and Comprehend services.
         
         Args:
             region_name (str): AWS region name
+            cache (TranslationCache, optional): Cache for translation and detection results
+            max_chunk_bytes (int): UTF-8 byte budget per TranslateText request;
+                longer text is split on sentence boundaries
+            chunk_workers (int): Maximum chunks of one text translated concurrently
+            local_detection (bool): Try the local n-gram detector before calling Comprehend
+            translate_client, comprehend_client: Optional injected clients; by default
+                the shared clients from the process-wide registry are used
         """
         self.region_name = region_name
+        self.cache = cache
+        self.max_chunk_bytes = max_chunk_bytes
+        self.chunk_workers = chunk_workers
+        self.local_detector = LocalLanguageDetector() if local_detection else None
         
         try:
-            # Initialize AWS clients
-            self.translate_client = boto3.client('translate', region_name=region_name)
-            self.comprehend_client = boto3.client('comprehend', region_name=region_name)
+            # Reuse process-wide clients (and their connection pools)
+            self.translate_client = translate_client or get_client('translate', region_name)
+            self.comprehend_client = comprehend_client or get_client('comprehend', region_name)
             logger.info(f"AWS Translation Service initialized in region: {region_name}")
             
         except Exception as e:
@@ -34,7 +100,10 @@ class AWSTranslationService:
     
     def detect_language(self, text: str) -> Dict[str, Any]:
         """
-        Detect the language of the input text using AWS Comprehend.
+        Detect the language of the input text.
+        
+        The local n-gram detector answers when it is confident; otherwise
+        AWS Comprehend is called on a sample of the text.
         
         Args:
             text (str): Input text for language detection
@@ -42,30 +111,111 @@ class AWSTranslationService:
         Returns:
             Dict containing detected language code and confidence score
         """
-        try:
-            response = self.comprehend_client.detect_dominant_language(Text=text)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = TranslationCache.make_key(text, kind='detect')
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        sample = _detection_sample(text)
+        result = self._detect_locally(sample)
+        if result is None:
+            result = self._detect_with_comprehend(sample)
+        
+        if cache_key is not None and result['language_code'] != 'und':
+            self.cache.set(cache_key, result)
+        return result
+    
+    def batch_detect_language(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Detect the language of several texts, e.g. the transcripts of a batch run.
+        
+        Cached and locally detectable texts are resolved without AWS; the rest
+        go to Comprehend BatchDetectDominantLanguage, 25 documents per call.
+        
+        Args:
+            texts (List[str]): Input texts
             
-            if response['Languages']:
-                detected_lang = response['Languages'][0]
-                result = {
-                    'language_code': detected_lang['LanguageCode'],
-                    'confidence': detected_lang['Score'],
-                    'all_languages': response['Languages']
-                }
-                
-                logger.info(f"Detected language: {result['language_code']} "
-                          f"(confidence: {result['confidence']:.2f})")
-                return result
+        Returns:
+            Detection results in the same order as texts
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        pending = []
+        
+        for index, text in enumerate(texts):
+            if self.cache is not None:
+                cached = self.cache.get(TranslationCache.make_key(text, kind='detect'))
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            sample = _detection_sample(text)
+            local = self._detect_locally(sample)
+            if local is not None:
+                results[index] = local
             else:
-                logger.warning("No language detected")
-                return {'language_code': 'und', 'confidence': 0.0, 'all_languages': []}
-                
+                pending.append((index, sample))
+        
+        from botocore.exceptions import ClientError
+
+        for start in range(0, len(pending), COMPREHEND_BATCH_SIZE):
+            batch = pending[start:start + COMPREHEND_BATCH_SIZE]
+            try:
+                response = call_with_limits(
+                    'comprehend', 'BatchDetectDominantLanguage',
+                    self.comprehend_client.batch_detect_dominant_language,
+                    TextList=[sample for _, sample in batch]
+                )
+            except ClientError as e:
+                logger.error(f"AWS Comprehend batch error: {str(e)}")
+                raise
+            
+            for item in response.get('ResultList', []):
+                index = batch[item['Index']][0]
+                results[index] = _detection_result(item.get('Languages', []))
+            for item in response.get('ErrorList', []):
+                logger.warning(f"Language detection failed for document {batch[item['Index']][0]}: "
+                               f"{item.get('ErrorMessage')}")
+        
+        for index, text in enumerate(texts):
+            if results[index] is None:
+                results[index] = _detection_result([])
+            elif self.cache is not None and results[index]['language_code'] != 'und':
+                self.cache.set(TranslationCache.make_key(text, kind='detect'), results[index])
+        
+        logger.info(f"Detected languages for {len(texts)} texts "
+                    f"({len(pending)} sent to Comprehend)")
+        return results
+    
+    def _detect_locally(self, text: str) -> Optional[Dict[str, Any]]:
+        if self.local_detector is None:
+            return None
+        result = self.local_detector.detect(text)
+        if result is not None:
+            logger.info(f"Detected language locally: {result['language_code']} "
+                        f"(confidence: {result['confidence']:.2f})")
+        return result
+    
+    def _detect_with_comprehend(self, text: str) -> Dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        try:
+            response = call_with_limits('comprehend', 'DetectDominantLanguage',
+                                        self.comprehend_client.detect_dominant_language, Text=text)
         except ClientError as e:
             logger.error(f"AWS Comprehend error: {str(e)}")
             raise
         except Exception as e:
             logger.error(f"Language detection failed: {str(e)}")
             raise
+        
+        result = _detection_result(response['Languages'])
+        if result['language_code'] == 'und':
+            logger.warning("No language detected")
+        else:
+            logger.info(f"Detected language: {result['language_code']} "
+                        f"(confidence: {result['confidence']:.2f})")
+        return result
     
     def translate_text(self, text: str, target_language: str, source_language: str = None) -> Dict[str, Any]:
         """
@@ -79,16 +229,21 @@ class AWSTranslationService:
         Returns:
             Dict containing translated text and metadata
         """
+        # botocore is imported where AWS is called, not at startup
+        from botocore.exceptions import ClientError
+
+        if not text.strip():
+            return {
+                'translated_text': text,
+                'source_language': source_language,
+                'target_language': target_language,
+                'skipped': True
+            }
+
         try:
             # Auto-detect source language if not provided
             if source_language is None:
-                detection_result = self.detect_language(text)
-                source_language = detection_result['language_code']
-                
-                # Handle case where language detection fails
-                if source_language == 'und':
-                    logger.warning("Language detection failed, defaulting to English")
-                    source_language = 'en'
+                source_language = source_language_from(self.detect_language(text))
             
             # Skip translation if source and target are the same
             if source_language == target_language:
@@ -100,20 +255,12 @@ class AWSTranslationService:
                     'skipped': True
                 }
             
-            # Perform translation
-            response = self.translate_client.translate_text(
-                Text=text,
-                SourceLanguageCode=source_language,
-                TargetLanguageCode=target_language
-            )
-            
-            result = {
-                'translated_text': response['TranslatedText'],
-                'source_language': response['SourceLanguageCode'],
-                'target_language': response['TargetLanguageCode'],
-                'skipped': False
-            }
+            # Long transcripts exceed the request size limit: translate
+            # sentence-aligned chunks in parallel and stitch them back together
+            if len(text.encode('utf-8')) > self.max_chunk_bytes:
+                return self._translate_chunked(text, target_language, source_language)
             
+            result = self._translate_request(text, target_language, source_language)
             logger.info(f"Translation completed: {source_language} -> {target_language}")
             return result
             
@@ -128,47 +275,143 @@ class AWSTranslationService:
             logger.error(f"Translation failed: {str(e)}")
             raise
     
+    def _translate_request(self, text: str, target_language: str,
+                           source_language: str) -> Dict[str, Any]:
+        """
+        Translate text that fits in a single TranslateText request, using the cache if set.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = TranslationCache.make_key(text, source_language, target_language)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Translation cache hit: {source_language} -> {target_language}")
+                return cached
+        
+        # Shared per-operation rate limit; throttles and 5xx errors are retried with backoff
+        response = call_with_limits(
+            'translate', 'TranslateText',
+            self.translate_client.translate_text,
+            Text=text,
+            SourceLanguageCode=source_language,
+            TargetLanguageCode=target_language
+        )
+        
+        result = {
+            'translated_text': response['TranslatedText'],
+            'source_language': response['SourceLanguageCode'],
+            'target_language': response['TargetLanguageCode'],
+            'skipped': False
+        }
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+    
+    def _translate_chunked(self, text: str, target_language: str,
+                           source_language: str) -> Dict[str, Any]:
+        """
+        Translate text in sentence-aligned chunks, concurrently, preserving order.
+        
+        Returns:
+            Translation result with a 'chunks' list mapping each translated
+            chunk back to its source offsets
+        """
+        chunks = chunk_text(text, self.max_chunk_bytes)
+        if not chunks:
+            return {
+                'translated_text': text,
+                'source_language': source_language,
+                'target_language': target_language,
+                'skipped': True,
+                'chunks': []
+            }
+        logger.info(f"Translating {len(chunks)} chunks: {source_language} -> {target_language}")
+        
+        workers = max(1, min(self.chunk_workers or 1, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix='translate-chunk') as executor:
+            results = list(executor.map(
+                lambda chunk: self._translate_request(chunk.text, target_language, source_language),
+                chunks
+            ))
+        
+        translated = [result['translated_text'] for result in results]
+        logger.info(f"Translation completed: {source_language} -> {target_language}")
+        return {
+            'translated_text': join_chunks(text, chunks, translated),
+            'source_language': source_language,
+            'target_language': target_language,
+            'skipped': False,
+            'chunks': [
+                {
+                    'source_start': chunk.start,
+                    'source_end': chunk.end,
+                    'translated_text': translated_text
+                }
+                for chunk, translated_text in zip(chunks, translated)
+            ]
+        }
+    
     def translate_to_multiple_languages(self, text: str, target_languages: List[str], 
-                                      source_language: str = None) -> Dict[str, Dict[str, Any]]:
+                                      source_language: str = None,
+                                      max_workers: Optional[int] = DEFAULT_MAX_WORKERS) -> Dict[str, Dict[str, Any]]:
         """
         Translate text to multiple target languages.
         
+        Languages are translated concurrently on a thread pool so total latency
+        is roughly one Translate round-trip instead of one per language.
+        
         Args:
             text (str): Text to translate
             target_languages (List[str]): List of target language codes
             source_language (str, optional): Source language code. If None, auto-detected.
+            max_workers (int, optional): Maximum concurrent translations.
+                None or 1 translates the languages one after another.
             
         Returns:
-            Dict mapping target language codes to translation results
+            Dict mapping target language codes to translation results,
+            in the same order as target_languages
         """
-        translations = {}
-        
-        # Detect source language once if not provided
+        # Detect source language once if not provided; every language below reuses it
         if source_language is None:
-            detection_result = self.detect_language(text)
-            source_language = detection_result['language_code']
-            
-            if source_language == 'und':
-                logger.warning("Language detection failed, defaulting to English")
-                source_language = 'en'
+            source_language = source_language_from(self.detect_language(text))
+        
+        # Drop duplicate targets but keep the caller's order
+        target_languages = list(dict.fromkeys(target_languages))
         
         logger.info(f"Starting multi-language translation from {source_language} to {len(target_languages)} languages")
         
-        for target_lang in target_languages:
-            try:
-                translation_result = self.translate_text(text, target_lang, source_language)
-                translations[target_lang] = translation_result
-                
-            except Exception as e:
-                logger.error(f"Failed to translate to {target_lang}: {str(e)}")
-                translations[target_lang] = {
-                    'error': str(e),
-                    'source_language': source_language,
-                    'target_language': target_lang,
-                    'skipped': False
-                }
+        workers = min(max_workers or 1, len(target_languages))
+        if workers <= 1:
+            results = [self._translate_isolated(text, target_lang, source_language)
+                       for target_lang in target_languages]
+        else:
+            with ThreadPoolExecutor(max_workers=workers,
+                                    thread_name_prefix='translate') as executor:
+                results = list(executor.map(
+                    lambda target_lang: self._translate_isolated(text, target_lang, source_language),
+                    target_languages
+                ))
         
-        return translations
+        return dict(zip(target_languages, results))
+    
+    def _translate_isolated(self, text: str, target_language: str,
+                            source_language: str) -> Dict[str, Any]:
+        """
+        Translate to a single language, turning any failure into an error result
+        so one language cannot affect the others.
+        """
+        try:
+            return self.translate_text(text, target_language, source_language)
+        except Exception as e:
+            logger.error(f"Failed to translate to {target_language}: {str(e)}")
+            return {
+                'error': str(e),
+                'source_language': source_language,
+                'target_language': target_language,
+                'skipped': False
+            }
     
     def get_supported_languages(self) -> Dict[str, List[str]]:
         """
@@ -179,20 +422,9 @@ class AWSTranslationService:
         Returns:
             Dict containing lists of supported source and target languages
         """
-        # Common AWS Translate supported languages
-        supported_languages = [
-            'af', 'sq', 'am', 'ar', 'hy', 'az', 'bn', 'bs', 'bg', 'ca', 'zh', 'zh-TW',
-            'hr', 'cs', 'da', 'prs', 'nl', 'en', 'et', 'fa', 'tl', 'fi', 'fr', 'fr-CA',
-            'ka', 'de', 'el', 'gu', 'ht', 'ha', 'he', 'hi', 'hu', 'is', 'id', 'ga',
-            'it', 'ja', 'kn', 'kk', 'ko', 'lv', 'lt', 'mk', 'ms', 'ml', 'mt', 'mr',
-            'mn', 'no', 'ps', 'pl', 'pt', 'pt-PT', 'pa', 'ro', 'ru', 'sr', 'si',
-            'sk', 'sl', 'so', 'es', 'es-MX', 'sw', 'sv', 'ta', 'te', 'th', 'tr',
-            'uk', 'ur', 'uz', 'vi', 'cy'
-        ]
-        
         return {
-            'source_languages': supported_languages,
-            'target_languages': supported_languages
+            'source_languages': list(SUPPORTED_LANGUAGES),
+            'target_languages': list(SUPPORTED_LANGUAGES)
         }
 
 def main():
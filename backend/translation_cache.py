@@ -0,0 +1,236 @@
+"""
+Content-addressed cache for translation and language detection results.
+
+Entries are keyed on a hash of the text plus the source and target language,
+so repeated phrases and re-processed recordings never hit AWS twice.
+An in-memory LRU tier sits in front of an optional SQLite tier that survives
+restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_ENTRIES = 1000000
+# Counting the rows of the disk tier is a table scan, so the limit is enforced every N writes
+DISK_EVICTION_INTERVAL = 1000
+# Disk hits refresh their access time in batches of up to N keys rather than with a commit each
+RECENCY_FLUSH_INTERVAL = 256
+
+
+def _size(payload: str) -> int:
+    return len(payload.encode('utf-8'))
+
+
+class TranslationCache:
+    """
+    Two-tier (memory LRU + optional SQLite) cache for JSON-serialisable results.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 sqlite_path: Optional[str] = None,
+                 max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept in memory
+            max_bytes (int): Maximum total UTF-8 size of the in-memory entries
+            sqlite_path (str, optional): Path of the on-disk tier. None keeps the cache in memory only.
+            max_disk_entries (int): Maximum number of entries kept on disk, enforced
+                periodically so the tier may briefly exceed it by up to a tenth
+
+        Access times on disk are approximate: disk hits are recorded in memory and
+        written with the next set(), every RECENCY_FLUSH_INTERVAL hits, or on close().
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+
+        self._entries: 'OrderedDict[str, str]' = OrderedDict()
+        self._bytes = 0
+        self._disk_writes = 0
+        self._touched: Dict[str, float] = {}
+        self._eviction_interval = max(1, min(DISK_EVICTION_INTERVAL, max_disk_entries // 10))
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'disk_hits': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+
+        self._db = None
+        if sqlite_path:
+            directory = os.path.dirname(os.path.abspath(sqlite_path))
+            os.makedirs(directory, exist_ok=True)
+            # Batch workers in separate processes may share one cache file
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=30)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            self._db.commit()
+
+    @staticmethod
+    def make_key(text: str, source_language: Optional[str] = None,
+                 target_language: Optional[str] = None, kind: str = 'translate',
+                 extra: Sequence[str] = ()) -> str:
+        """
+        Build a cache key from the text hash and the language pair.
+
+        Args:
+            text (str): Source text
+            source_language (str, optional): Source language code
+            target_language (str, optional): Target language code
+            kind (str): Namespace for the cached operation (e.g. 'translate', 'detect')
+            extra (sequence of str): Further inputs the cached value depends on
+                (e.g. a model ID), for operations that are not translations
+
+        Returns:
+            Hex digest identifying the entry
+        """
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        raw = '\0'.join([kind, source_language or '', target_language or '', *extra, text_hash])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an entry, promoting on-disk hits into memory.
+
+        Returns:
+            A fresh copy of the cached value, or None on a miss
+        """
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return json.loads(payload)
+
+            if self._db is not None:
+                row = self._db.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    self._touched[key] = time.time()
+                    if len(self._touched) >= RECENCY_FLUSH_INTERVAL:
+                        self._flush_recency()
+                        self._db.commit()
+                    self._counters['hits'] += 1
+                    self._counters['disk_hits'] += 1
+                    self._store_memory(key, row[0])
+                    return json.loads(row[0])
+
+            self._counters['misses'] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a JSON-serialisable value in every tier."""
+        payload = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._store_memory(key, payload)
+            if self._db is not None:
+                self._touched.pop(key, None)
+                self._flush_recency()
+                self._db.execute(
+                    'INSERT OR REPLACE INTO cache (key, value, accessed) VALUES (?, ?, ?)',
+                    (key, payload, time.time())
+                )
+                self._disk_writes += 1
+                if self._disk_writes % self._eviction_interval == 0:
+                    self._evict_disk()
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._touched.clear()
+                self._db.execute('DELETE FROM cache')
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+            return stats
+
+    def close(self) -> None:
+        """Close the on-disk tier."""
+        with self._lock:
+            if self._db is not None:
+                self._flush_recency()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def _store_memory(self, key: str, payload: str) -> None:
+        size = _size(payload)
+        if size > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= _size(previous)
+
+        self._entries[key] = payload
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= _size(evicted)
+            self._counters['evictions'] += 1
+
+    def _flush_recency(self) -> None:
+        # The caller commits
+        if self._touched:
+            self._db.executemany('UPDATE cache SET accessed = ? WHERE key = ?',
+                                 [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+
+    def _evict_disk(self) -> None:
+        count = self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed ASC LIMIT ?)',
+                (excess,)
+            )
+            self._counters['disk_evictions'] += excess
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> TranslationCache:
+    """
+    Return the process-wide cache, created on first use.
+
+    The on-disk tier is enabled by setting TRANSLATION_CACHE_PATH.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = TranslationCache(
+                max_entries=int(os.environ.get('TRANSLATION_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+                sqlite_path=os.environ.get('TRANSLATION_CACHE_PATH') or None,
+            )
+        return _default_cache